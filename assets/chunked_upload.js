@@ -0,0 +1,89 @@
+/*
+ * Chunked upload for large CSV files.
+ *
+ * The file picked via #chunked-upload-button is sent to /upload/chunked in
+ * slices of data-chunk-bytes, so neither the browser nor the server holds
+ * it as one base64 string. When the server has queued the ingest job, the
+ * hidden #chunked-upload-done button is clicked and a clientside callback
+ * hands the job to the regular job polling.
+ */
+(function () {
+    var state = {result: null};
+
+    function setStatus(text) {
+        var status = document.getElementById('chunked-upload-status');
+        if (status) {
+            status.textContent = text;
+        }
+    }
+
+    function finish(result) {
+        state.result = result;
+        setStatus(result.error ? '' : 'Processing...');
+        var done = document.getElementById('chunked-upload-done');
+        if (done) {
+            done.click();
+        }
+    }
+
+    function post(url, body, contentType) {
+        return fetch(url, {
+            method: 'POST',
+            headers: {'Content-Type': contentType},
+            body: body
+        }).then(function (response) {
+            return response.json().then(function (data) {
+                if (!response.ok) {
+                    throw new Error(data.error || response.statusText);
+                }
+                return data;
+            });
+        });
+    }
+
+    async function upload(file, chunkBytes) {
+        try {
+            var started = await post('/upload/chunked',
+                                     JSON.stringify({filename: file.name, size: file.size}),
+                                     'application/json');
+            var base = '/upload/chunked/' + started.id;
+            var total = Math.max(1, Math.ceil(file.size / chunkBytes));
+            for (var i = 0; i < total; i++) {
+                var chunk = file.slice(i * chunkBytes, (i + 1) * chunkBytes);
+                await post(base + '/' + i, chunk, 'application/octet-stream');
+                setStatus('Uploading ' + Math.round(100 * (i + 1) / total) + '%');
+            }
+            finish(await post(base + '/complete', '{}', 'application/json'));
+        } catch (err) {
+            finish({error: err.message});
+        }
+    }
+
+    // The file input lives outside the React tree so re-renders cannot drop it
+    document.addEventListener('click', function (event) {
+        var button = event.target && event.target.closest('#chunked-upload-button');
+        if (!button) {
+            return;
+        }
+        var chunkBytes = parseInt(button.getAttribute('data-chunk-bytes'), 10) || 8 * 1024 * 1024;
+        var input = document.createElement('input');
+        input.type = 'file';
+        input.accept = '.csv';
+        input.addEventListener('change', function () {
+            if (input.files && input.files[0]) {
+                upload(input.files[0], chunkBytes);
+            }
+        });
+        input.click();
+    });
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        upload: {
+            result: function () {
+                var result = state.result;
+                state.result = null;
+                return result || window.dash_clientside.no_update;
+            }
+        }
+    });
+})();
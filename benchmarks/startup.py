@@ -0,0 +1,154 @@
+"""
+Startup latency benchmark for the dashboard.
+
+Measures, in fresh processes with an empty dataset store:
+  - import: time to ``import dashboard`` (module import + app factory)
+  - first paint: serving the shell page plus every initial callback the
+    browser fires on load, run sequentially on one worker
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import dashboard; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def run_child(args):
+    """Run a Python snippet/script in a clean process and return its stdout."""
+    with tempfile.TemporaryDirectory() as store_dir:
+        env = dict(os.environ, STORE_DIR=store_dir, PYTHONPATH=ROOT)
+        result = subprocess.run(
+            [sys.executable] + args,
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def parse_outputs(output):
+    """Split a Dash output spec ('a.b' or '..a.b...c.d..') into id/property dicts."""
+    multi = output.startswith('..')
+    specs = output[2:-2].split('...') if multi else [output]
+    parsed = []
+    for spec in specs:
+        component_id, prop = spec.rsplit('.', 1)
+        parsed.append({'id': component_id, 'property': prop.split('@')[0]})
+    return parsed if multi else parsed[0]
+
+
+def collect_props(node, props):
+    """Map string component ids to their props in a serialized layout."""
+    if isinstance(node, list):
+        for child in node:
+            collect_props(child, props)
+    elif isinstance(node, dict) and 'props' in node:
+        component_props = node['props']
+        if isinstance(component_props.get('id'), str):
+            props[component_props['id']] = component_props
+        for value in component_props.values():
+            collect_props(value, props)
+    return props
+
+
+def first_paint():
+    """Time the shell and initial callbacks against the Flask test client."""
+    start = time.perf_counter()
+    import dashboard
+
+    imported = time.perf_counter()
+
+    client = dashboard.server.test_client()
+    client.get('/')
+    layout = client.get('/_dash-layout').get_json()
+    dependencies = client.get('/_dash-dependencies').get_json()
+    shell = time.perf_counter()
+
+    props = collect_props(layout, {})
+    timings = {}
+    for dep in dependencies:
+        if dep.get('prevent_initial_call'):
+            continue
+        ids = [spec['id'] for spec in dep['inputs'] + dep['state']]
+        if not all(isinstance(i, str) and i in props for i in ids):
+            continue
+        body = {
+            'output': dep['output'],
+            'outputs': parse_outputs(dep['output']),
+            'inputs': [
+                dict(spec, value=props[spec['id']].get(spec['property']))
+                for spec in dep['inputs']
+            ],
+            'state': [
+                dict(spec, value=props[spec['id']].get(spec['property']))
+                for spec in dep['state']
+            ],
+            'changedPropIds': [],
+        }
+        t = time.perf_counter()
+        response = client.post('/_dash-update-component', json=body)
+        if response.status_code not in (200, 204):
+            raise RuntimeError(f"{dep['output']} failed with {response.status_code}")
+        timings[dep['output']] = time.perf_counter() - t
+
+    return {
+        'import_s': imported - start,
+        'shell_s': shell - imported,
+        'callbacks_s': sum(timings.values()),
+        'first_paint_s': time.perf_counter() - imported,
+        'slowest': sorted(timings.items(), key=lambda item: -item[1])[:3],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--runs', type=int, default=5, help="Fresh processes per measurement"
+    )
+    parser.add_argument('--output', help="Write the summary as JSON to this file")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(first_paint()))
+        return
+
+    imports = [float(run_child(['-c', IMPORT_SNIPPET])) for _ in range(args.runs)]
+    paints = [
+        json.loads(run_child([os.path.abspath(__file__), '--child']))
+        for _ in range(args.runs)
+    ]
+
+    summary = {
+        'runs': args.runs,
+        'import_s': {'median': statistics.median(imports), 'min': min(imports)},
+        'first_paint_s': {
+            'median': statistics.median(p['first_paint_s'] for p in paints),
+            'min': min(p['first_paint_s'] for p in paints),
+        },
+        'shell_s': statistics.median(p['shell_s'] for p in paints),
+        'slowest_callbacks': paints[-1]['slowest'],
+    }
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,626 @@
+"""
+Benchmark suite for the loader, metrics and chart pipeline.
+
+Runs every stage on synthetic price matrices (rows x assets, seeded random
+walks) and on the bundled data/myport2.csv, and reports for each:
+  - time: median and min over --repeat runs
+  - peak_mb: peak traced allocation of one extra run (tracemalloc)
+  - bytes: size of the serialized result (figure JSON, callback response)
+
+Stages: PortfolioDataLoader.load_data (cold CSV, memory-mapped copy and
+upload), validate_csv and calculate_returns; the statistics kernels;
+PortfolioMetrics.create_all_metric_cards; every PortfolioCharts builder;
+and the update_dashboard callback end to end (weight change, with and
+without the simulation switched on, and dataset switch, including every
+dependent callback) through the Flask test client.
+
+Results are compared against a stored baseline; the exit code is 1 when a
+case is slower, larger or more memory hungry than the baseline allows.
+
+The baseline is the reference a change is judged against, so existing
+entries change only in a commit of their own that says why, never along
+with the change being measured. --update records cases that have no entry
+yet (and the named ones, when given) and leaves every other entry as it is;
+--save-baseline rewrites the whole file.
+
+Usage:
+    python benchmarks/suite.py [--synthetic 2500x5 10000x50] [--repeat 5]
+                               [--baseline benchmarks/baseline.json]
+                               [--save-baseline | --update [CASE ...]]
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('STORE_DIR', tempfile.mkdtemp(prefix='markolabs-bench-'))
+
+from startup import collect_props, parse_outputs  # noqa: E402
+
+BUNDLED = os.path.join(ROOT, 'data', 'myport2.csv')
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+DEFAULT_SYNTHETIC = ['2500x5', '10000x50']
+
+# Compared metrics, and differences below which a change is noise whatever
+# its relative size. Time is compared on the fastest run, the least noisy.
+ABSOLUTE_FLOOR = {'min_s': 0.005, 'peak_mb': 1.0, 'bytes': 1024}
+
+
+def synthetic_csv(path, rows, assets, seed=0):
+    """Write a seeded geometric random walk price CSV in the upload format."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2000-01-03', periods=rows)
+    log_returns = rng.normal(0.0003, 0.015, size=(rows, assets))
+    prices = 100 * np.exp(np.cumsum(log_returns, axis=0))
+    df = pd.DataFrame(prices, columns=[f'A{i:03d}' for i in range(assets)])
+    df.insert(0, 'Date', dates.strftime('%Y%m%d'))
+    df.to_csv(path, index=False, float_format='%.4f')
+    return path
+
+
+def measure(fn, repeat, setup=None, size=None):
+    """
+    Time ``fn(*setup())`` ``repeat`` times, then trace one run's peak memory.
+
+    A failing case is recorded with its error instead of stopping the suite.
+    """
+    try:
+        return _measure(fn, repeat, setup, size)
+    except Exception as e:
+        return {'error': f'{type(e).__name__}: {e}'}
+
+
+def _measure(fn, repeat, setup, size):
+    times = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+
+    args = setup() if setup else ()
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    record = {
+        'median_s': statistics.median(times),
+        'min_s': min(times),
+        'peak_mb': peak / 2**20,
+    }
+    if size is not None:
+        record['bytes'] = size(result)
+    return record
+
+
+def figure_bytes(figure):
+    return len(figure.to_json())
+
+
+def component_bytes(components):
+    import plotly
+
+    return len(json.dumps(components, cls=plotly.utils.PlotlyJSONEncoder))
+
+
+def loader_cases(csv_path, repeat):
+    from src.data.columnar import columnar_path
+    from src.data.loader import PortfolioDataLoader
+
+    filename = os.path.basename(csv_path)
+    with open(csv_path, 'rb') as f:
+        raw = f.read()
+    contents = 'data:text/csv;base64,' + base64.b64encode(raw).decode()
+
+    def cold():
+        shutil.rmtree(columnar_path(csv_path), ignore_errors=True)
+        return (PortfolioDataLoader(csv_path),)
+
+    def uploaded():
+        loader = PortfolioDataLoader()
+        loader.load_bytes(raw)
+        return (loader,)
+
+    cases = {
+        'load_data (csv)': measure(lambda loader: loader.load_data(), repeat, cold),
+        'load_data (mapped)': measure(
+            lambda loader: loader.load_data(),
+            repeat,
+            lambda: (PortfolioDataLoader(csv_path),),
+        ),
+        'load_data (upload)': measure(
+            lambda: PortfolioDataLoader().load_data(contents, filename), repeat
+        ),
+        'validate_csv': measure(
+            lambda: PortfolioDataLoader().validate_csv(contents, filename), repeat
+        ),
+        'calculate_returns': measure(
+            lambda loader: loader.calculate_returns(), repeat, uploaded
+        ),
+    }
+    return cases
+
+
+def component_cases(loader, repeat):
+    from src.analytics.attribution import (
+        drawdown_attribution,
+        return_attribution,
+        risk_attribution,
+    )
+    from src.analytics.correlation import RollingCorrelation, correlation, ledoit_wolf
+    from src.analytics.kernel import RunningStats, compute_portfolio_stats
+    from src.analytics.periods import FREQUENCIES, build_grid, compound, period_stats
+    from src.analytics.rolling import rolling_stats
+    from src.analytics.simulation import MonteCarloSimulator
+    from src.components.charts import PortfolioCharts
+    from src.components.metrics import PortfolioMetrics
+    from src.config import (
+        BATCH_MAX_BYTES,
+        CHART_MAX_POINTS,
+        COLORS,
+        DEFAULT_ROLLING_WINDOW,
+        FRONTIER_POINTS,
+        GRID_PORTFOLIOS,
+        SIMULATION_PATHS,
+    )
+    from src.data.pipeline import ReturnsPipeline
+    from src.jobs.tasks import candidate_stats, frontier_stats
+
+    pipeline = loader.pipeline
+    port_ret = pipeline.portfolio_returns(loader.weights)
+    benchmark = pipeline.asset_returns(pipeline.asset_names[0])
+    charts = PortfolioCharts(COLORS, max_points=CHART_MAX_POINTS)
+    metrics = PortfolioMetrics(COLORS)
+
+    stats = compute_portfolio_stats(port_ret)
+    rolling = rolling_stats(port_ret, DEFAULT_ROLLING_WINDOW, benchmark)
+    grid = candidate_stats(pipeline, GRID_PORTFOLIOS, BATCH_MAX_BYTES)
+    frontier, _ = frontier_stats(pipeline, FRONTIER_POINTS, BATCH_MAX_BYTES)
+    simulator = MonteCarloSimulator(
+        pipeline, SIMULATION_PATHS, max_bytes=BATCH_MAX_BYTES
+    )
+    simulation = simulator.simulate(loader.weights)
+    monthly = loader.period_returns('M')
+    history = loader.return_history()
+    correlations = correlation(pipeline, loader.return_history)
+    risk = risk_attribution(pipeline, loader.weights)
+    drawdowns = drawdown_attribution(pipeline, loader.weights)
+    contributions = return_attribution(pipeline, loader.weights, 'M')
+
+    def fresh_pipeline():
+        # Attribution is memoized per pipeline; time it on an empty cache
+        return (ReturnsPipeline(loader.returns),)
+
+    def period_tables():
+        return [
+            compound(pipeline.matrix, build_grid(pipeline.index, freq))
+            for freq in FREQUENCIES
+        ]
+
+    return {
+        'compute_portfolio_stats': measure(
+            lambda: compute_portfolio_stats(port_ret), repeat
+        ),
+        'RunningStats.from_returns': measure(
+            lambda: RunningStats.from_returns(port_ret), repeat
+        ),
+        'rolling_stats': measure(
+            lambda: rolling_stats(port_ret, DEFAULT_ROLLING_WINDOW, benchmark), repeat
+        ),
+        'candidate_stats': measure(
+            lambda: candidate_stats(pipeline, GRID_PORTFOLIOS, BATCH_MAX_BYTES), repeat
+        ),
+        'period tables (W/M/Q/Y)': measure(period_tables, repeat),
+        'period_stats (M)': measure(lambda: period_stats(monthly, 'M'), repeat),
+        'RollingCorrelation (full history)': measure(
+            lambda: RollingCorrelation(history), repeat
+        ),
+        'RollingCorrelation (252 days)': measure(
+            lambda: RollingCorrelation(history, 252), repeat
+        ),
+        'ledoit_wolf': measure(lambda: ledoit_wolf(pipeline.matrix), repeat),
+        'risk_attribution': measure(
+            lambda p: risk_attribution(p, loader.weights), repeat, setup=fresh_pipeline
+        ),
+        'return_attribution (M)': measure(
+            lambda p: return_attribution(p, loader.weights, 'M'),
+            repeat,
+            setup=fresh_pipeline,
+        ),
+        'drawdown_attribution': measure(
+            lambda p: drawdown_attribution(p, loader.weights),
+            repeat,
+            setup=fresh_pipeline,
+        ),
+        'MonteCarloSimulator.simulate': measure(
+            lambda: simulator.simulate(loader.weights), repeat
+        ),
+        'create_all_metric_cards': measure(
+            lambda: metrics.create_all_metric_cards(port_ret),
+            repeat,
+            size=component_bytes,
+        ),
+        'create_cumulative_returns_chart': measure(
+            lambda: charts.create_cumulative_returns_chart(port_ret),
+            repeat,
+            size=figure_bytes,
+        ),
+        'create_rolling_stats_chart': measure(
+            lambda: charts.create_rolling_stats_chart(rolling),
+            repeat,
+            size=figure_bytes,
+        ),
+        'create_drawdown_chart': measure(
+            lambda: charts.create_drawdown_chart(port_ret), repeat, size=figure_bytes
+        ),
+        'create_risk_metrics_chart': measure(
+            lambda: charts.create_risk_metrics_chart(stats), repeat, size=figure_bytes
+        ),
+        'create_portfolio_scatter_chart': measure(
+            lambda: charts.create_portfolio_scatter_chart(grid, stats, frontier),
+            repeat,
+            size=figure_bytes,
+        ),
+        'create_monthly_returns_heatmap': measure(
+            lambda: charts.create_monthly_returns_heatmap(monthly['Portfolio']),
+            repeat,
+            size=figure_bytes,
+        ),
+        'create_simulation_fan_chart': measure(
+            lambda: charts.create_simulation_fan_chart(simulation),
+            repeat,
+            size=figure_bytes,
+        ),
+        'create_simulation_risk_chart': measure(
+            lambda: charts.create_simulation_risk_chart(simulation),
+            repeat,
+            size=figure_bytes,
+        ),
+        'create_correlation_heatmap': measure(
+            lambda: charts.create_correlation_heatmap(correlations),
+            repeat,
+            size=figure_bytes,
+        ),
+        'create_risk_contribution_chart': measure(
+            lambda: charts.create_risk_contribution_chart(risk),
+            repeat,
+            size=figure_bytes,
+        ),
+        'create_return_attribution_chart': measure(
+            lambda: charts.create_return_attribution_chart(contributions, 'Monthly'),
+            repeat,
+            size=figure_bytes,
+        ),
+        'create_drawdown_attribution_chart': measure(
+            lambda: charts.create_drawdown_attribution_chart(drawdowns),
+            repeat,
+            size=figure_bytes,
+        ),
+    }
+
+
+class DashClient:
+    """Posts callbacks the way the browser would, with values taken from ``props``."""
+
+    def __init__(self, dashboard):
+        self.client = dashboard.server.test_client()
+        self.client.get('/')
+        self.props = collect_props(self.client.get('/_dash-layout').get_json(), {})
+        self.dependencies = self.client.get('/_dash-dependencies').get_json()
+        self.patterns = {}
+        self.failures = set()
+
+    def set(self, component_id, prop, value):
+        self.props.setdefault(component_id, {})[prop] = value
+
+    def dependents(self, component_id, prop):
+        return [
+            dep
+            for dep in self.dependencies
+            if any(
+                spec['id'] == component_id and spec['property'] == prop
+                for spec in dep['inputs']
+            )
+        ]
+
+    def _value(self, spec):
+        if spec['id'].startswith('{'):
+            # Pattern-matching (ALL) id, serialized as JSON in the dependencies
+            pattern = json.loads(spec['id'])
+            values = self.patterns.get(pattern.get('type'), [])
+            return [
+                {'id': dict(pattern, index=i), 'property': spec['property'], 'value': v}
+                for i, v in enumerate(values)
+            ]
+        return dict(spec, value=self.props.get(spec['id'], {}).get(spec['property']))
+
+    def post(self, dep, changed):
+        """Fire one callback; returns (response size, {output id: value})."""
+        response = self.client.post(
+            '/_dash-update-component',
+            json={
+                'output': dep['output'],
+                'outputs': parse_outputs(dep['output']),
+                'inputs': [self._value(spec) for spec in dep['inputs']],
+                'state': [self._value(spec) for spec in dep['state']],
+                'changedPropIds': changed,
+            },
+        )
+        if response.status_code == 204:
+            return 0, {}
+        if response.status_code != 200:
+            self.failures.add(dep['output'])
+            return 0, {}
+        return len(response.data), response.get_json().get('response', {})
+
+
+def end_to_end_cases(loader, dataset_key, repeat, seed=0):
+    import dashboard
+
+    dashboard.dataset_store.put(dataset_key, loader, spill=False)
+    client = DashClient(dashboard)
+    client.set('dataset-store', 'data', dataset_key)
+    update = next(dep for dep in client.dependents('update-portfolio', 'n_clicks'))
+    downstream = [
+        dep
+        for dep in client.dependents('weights-store', 'data')
+        if '.figure' in dep['output'] or 'metric-value' in dep['output']
+    ]
+    rng = np.random.default_rng(seed)
+
+    def change_weights():
+        client.patterns['weight-input'] = [
+            round(float(w), 6) for w in rng.dirichlet(np.ones(len(loader.asset_names)))
+        ]
+        client.patterns['weight-input'][-1] = round(
+            1 - sum(client.patterns['weight-input'][:-1]), 6
+        )
+        total, response = client.post(update, ['update-portfolio.n_clicks'])
+        weights = response.get('weights-store', {}).get('data')
+        if weights is None:
+            raise RuntimeError(f"update_dashboard rejected the weights: {response}")
+        client.set('weights-store', 'data', weights)
+        for dep in downstream:
+            total += client.post(dep, ['weights-store.data'])[0]
+        return total
+
+    def change_weights_simulating():
+        # The same weight change with the (on-demand) simulation charts switched on
+        client.set('simulation-run', 'value', True)
+        try:
+            return change_weights()
+        finally:
+            client.set('simulation-run', 'value', False)
+
+    def switch_dataset():
+        loader.pipeline.clear()
+        dashboard.payload_cache.clear()
+        client.set('weights-store', 'data', None)
+        return sum(
+            client.post(dep, ['dataset-store.data'])[0]
+            for dep in client.dependents('dataset-store', 'data')
+        )
+
+    def repeat_view():
+        # Another visitor opening the same dataset: served from the payload cache
+        client.set('weights-store', 'data', None)
+        return sum(
+            client.post(dep, ['dataset-store.data'])[0]
+            for dep in client.dependents('dataset-store', 'data')
+        )
+
+    cases = {}
+    for case, fn in (
+        ('update_dashboard (weights)', change_weights),
+        ('update_dashboard (weights, simulating)', change_weights_simulating),
+        ('update_dashboard (dataset)', switch_dataset),
+        ('update_dashboard (repeat view)', repeat_view),
+    ):
+        client.failures.clear()
+        cases[case] = measure(fn, repeat, size=lambda total: total)
+        if client.failures:
+            cases[case]['failed_callbacks'] = sorted(client.failures)
+    return cases
+
+
+def run_suite(datasets, repeat):
+    from src.data.loader import PortfolioDataLoader
+
+    results = {}
+    for name, csv_path in datasets:
+        print(f"Benchmarking {name}...", file=sys.stderr)
+        cases = loader_cases(csv_path, repeat)
+        loader = PortfolioDataLoader(csv_path)
+        loader.calculate_returns()
+        cases.update(component_cases(loader, repeat))
+        cases.update(end_to_end_cases(loader, f'bench-{name}', repeat))
+        results[name] = cases
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return (table lines, regressions) of ``results`` against ``baseline``."""
+    lines = [
+        f"{'dataset / case':<52} {'min time':>10} {'change':>8}"
+        f" {'peak MB':>9} {'bytes':>10}"
+    ]
+    regressions = []
+    for dataset, cases in results.items():
+        for case, record in cases.items():
+            base = baseline.get(dataset, {}).get(case, {})
+            name = f"{dataset} / {case}"
+            if 'error' in record:
+                lines.append(f"{name:<52} ERROR {record['error']}")
+                if base and 'error' not in base:
+                    regressions.append((dataset, case, ['error']))
+                continue
+            flags = []
+            if record.get('failed_callbacks') and not base.get('failed_callbacks'):
+                flags.append(
+                    'failed callbacks: ' + ', '.join(record['failed_callbacks'])
+                )
+            for metric, floor in ABSOLUTE_FLOOR.items():
+                if metric in record and metric in base:
+                    limit = base[metric] * (1 + tolerance)
+                    if record[metric] > limit and record[metric] - base[metric] > floor:
+                        flags.append(metric)
+            change = (
+                f"{record['min_s'] / base['min_s'] - 1:+.0%}"
+                if base.get('min_s')
+                else 'new'
+            )
+            lines.append(
+                f"{name:<52} {record['min_s'] * 1e3:>8.1f}ms "
+                f"{change:>8} {record['peak_mb']:>9.1f} {record.get('bytes', ''):>10}"
+                + (f"  REGRESSION ({', '.join(flags)})" if flags else '')
+            )
+            if flags:
+                regressions.append((dataset, case, flags))
+    return lines, regressions
+
+
+def update_baseline(baseline, results, cases):
+    """
+    ``baseline`` with the cases of ``results`` it lacks added, and the cases
+    named in ``cases`` (in every dataset run) replaced.
+
+    Returns:
+        (updated baseline, list of "dataset / case" entries written)
+    """
+    updated = {dataset: dict(entries) for dataset, entries in baseline.items()}
+    written = []
+    for dataset, records in results.items():
+        entries = updated.setdefault(dataset, {})
+        for case, record in records.items():
+            if case not in entries or case in cases:
+                entries[case] = record
+                written.append(f"{dataset} / {case}")
+    return updated, written
+
+
+def environment():
+    import plotly
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'plotly': plotly.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--synthetic',
+        nargs='*',
+        default=DEFAULT_SYNTHETIC,
+        help="Synthetic datasets as ROWSxASSETS (default: %(default)s)",
+    )
+    parser.add_argument(
+        '--no-bundled', action='store_true', help="Skip data/myport2.csv"
+    )
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per case")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for synthetic data")
+    parser.add_argument(
+        '--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against"
+    )
+    update = parser.add_mutually_exclusive_group()
+    update.add_argument(
+        '--save-baseline',
+        action='store_true',
+        help="Write the results as the new baseline instead of comparing",
+    )
+    update.add_argument(
+        '--update',
+        nargs='*',
+        metavar='CASE',
+        help="Add cases missing from the baseline, and replace the named ones",
+    )
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.5,
+        help="Allowed relative increase over the baseline (default: %(default)s)",
+    )
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='markolabs-bench-data-')
+    try:
+        datasets = []
+        for spec in args.synthetic:
+            rows, assets = (int(part) for part in spec.lower().split('x'))
+            path = os.path.join(work_dir, f'synthetic_{rows}x{assets}.csv')
+            datasets.append((spec, synthetic_csv(path, rows, assets, args.seed)))
+        if not args.no_bundled:
+            # Copied so the columnar conversion does not write into data/
+            datasets.append(('myport2', shutil.copy(BUNDLED, work_dir)))
+        results = run_suite(datasets, args.repeat)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {'environment': environment(), 'repeat': args.repeat, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    baseline = {}
+    stored = {
+        'environment': report['environment'],
+        'repeat': args.repeat,
+        'results': {},
+    }
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        baseline = stored.get('results', {})
+        if stored.get('environment') != report['environment']:
+            print(
+                "Note: baseline was recorded in a different environment",
+                file=sys.stderr,
+            )
+    if args.update is not None:
+        unknown = set(args.update) - {
+            case for cases in results.values() for case in cases
+        }
+        if unknown:
+            parser.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+        stored['results'], written = update_baseline(
+            baseline, results, set(args.update)
+        )
+        with open(args.baseline, 'w') as f:
+            json.dump(stored, f, indent=2)
+        print(f"Baseline entries written to {args.baseline}:", *written, sep='\n  ')
+        baseline = stored['results']
+
+    lines, regressions = compare(results, baseline, args.tolerance)
+    print('\n'.join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%} tolerance")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
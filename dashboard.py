@@ -1,202 +1,1633 @@
 import dash
-from dash import html, dcc, ALL
-from dash.dependencies import Input, Output, State
+from dash import html, dcc, dash_table, callback, clientside_callback, ALL, MATCH, Patch
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from flask import Response, g, jsonify, request
 import dash_bootstrap_components as dbc
-from quantstats import stats
 import numpy as np
+import pandas as pd
 import warnings
-warnings.filterwarnings("ignore")
+import hashlib
+import json
+import logging
 import os
+import threading
+import time
 
 # Import our modular components
-from src.config import COLORS, DATA_PATH
-from src.data.loader import PortfolioDataLoader
+from src.config import (
+    ATTRIBUTION_ASSETS,
+    ATTRIBUTION_DRAWDOWNS,
+    BATCH_MAX_BYTES,
+    BATCH_WORKERS,
+    CHART_MAX_POINTS,
+    COLORS,
+    CORRELATION_MAX_ASSETS,
+    CORRELATION_METHODS,
+    DATA_PATH,
+    DATA_POLL_SECONDS,
+    DEFAULT_DATASET,
+    DEFAULT_PERIOD_FREQUENCY,
+    DEFAULT_ROLLING_WINDOW,
+    DEFAULT_SIMULATION_YEARS,
+    FRONTIER_MAX_ASSETS,
+    FRONTIER_POINTS,
+    GRID_PORTFOLIOS,
+    HOLDINGS_SEARCH_RESULTS,
+    JOB_BACKEND,
+    JOB_DIR,
+    JOB_POLL_MS,
+    JOB_TTL_SECONDS,
+    JOB_WORKERS,
+    PAYLOAD_CACHE_BYTES,
+    PERIOD_FREQUENCIES,
+    PERIOD_TABLE_ASSETS,
+    RESPONSE_COMPRESSION,
+    ROLLING_WINDOWS,
+    SIMULATION_BLOCK,
+    SIMULATION_HORIZONS,
+    SIMULATION_METHODS,
+    SIMULATION_PATHS,
+    SIMULATION_SEED,
+    STORE_DIR,
+    STORE_MAX_BYTES,
+    STORE_MAX_ITEMS,
+    STORE_TTL_SECONDS,
+    TELEMETRY_ENABLED,
+    TELEMETRY_LOG,
+    UPLOAD_CHUNK_BYTES,
+    UPLOAD_DIR,
+    UPLOAD_MAX_BYTES,
+    UPLOAD_MAX_PENDING,
+    WEB_CONCURRENCY,
+    WIDE_UNIVERSE_ASSETS,
+)
+from src.data.loader import PortfolioDataLoader, decode_upload
+from src.data.store import DatasetStore
+from src.data.streaming import ChunkedUpload
 from src.components.charts import PortfolioCharts
 from src.components.metrics import PortfolioMetrics
 from src.layouts.dashboard import DashboardLayout
+from src.analytics.attribution import (
+    drawdown_attribution,
+    return_attribution,
+    risk_attribution,
+)
+from src.analytics.correlation import correlation
+from src.analytics.kernel import RunningStats, years_between
+from src.analytics.periods import (
+    asset_period_returns,
+    period_grids,
+    period_stats,
+    portfolio_period_returns,
+)
+from src.analytics.optimizer import PortfolioOptimizer
+from src.analytics.rolling import extend_rolling, rolling_stats
+from src.analytics.simulation import MonteCarloSimulator
+from src.jobs.backends import create_backend
+from src.jobs.runner import CANCELLED, DONE, FAILED, JobRunner
+from src.jobs.tasks import (
+    candidate_stats,
+    finalize_upload,
+    frontier_stats,
+    ingest_upload,
+)
+from src.server.payloads import PayloadCache, compress_response
+from src.telemetry.registry import SECONDS_BUCKETS, telemetry
+
+warnings.filterwarnings("ignore")
+
+logger = logging.getLogger(__name__)
+
+# Timing spans, cache counters and payload sizes, served on /metrics
+telemetry.configure(TELEMETRY_ENABLED, TELEMETRY_LOG)
+
+# Parsed datasets are shared per worker and keyed by upload hash; the
+# per-user selection (dataset key + weights) lives in the browser session.
+dataset_store = DatasetStore(
+    max_items=STORE_MAX_ITEMS,
+    ttl=STORE_TTL_SECONDS,
+    max_bytes=STORE_MAX_BYTES,
+    spill_dir=STORE_DIR,
+)
+
+
+def get_loader(dataset_key):
+    """Fetch the loader for a dataset key, rebuilding the default on a miss."""
+    if dataset_key == DEFAULT_DATASET:
+        loader = dataset_store.get_or_create(DEFAULT_DATASET, lambda: _load_default())
+        refresh_default(loader)
+        return loader
+    loader = dataset_store.get(dataset_key)
+    if loader is None:
+        raise ValueError("Uploaded data has expired, please upload the file again")
+    return loader
+
 
-# Initialize components
-data_loader = PortfolioDataLoader(DATA_PATH)
-returns, port_ret = data_loader.calculate_returns()
-charts = PortfolioCharts(COLORS)
+# Uploads are ingested off the request thread; job state is shared through
+# the backend so any worker can report progress or cancel.
+job_runner = JobRunner(
+    create_backend(JOB_BACKEND, JOB_DIR, JOB_TTL_SECONDS, WEB_CONCURRENCY),
+    workers=JOB_WORKERS,
+)
+
+
+def _load_default():
+    loader = PortfolioDataLoader(DATA_PATH)
+    loader.calculate_returns()
+    return loader
+
+
+# Rows appended to DATA_PATH (e.g. an end-of-day refresh) are picked up in
+# place: only the new rows are parsed and the memoized statistics extended.
+_refresh_lock = threading.Lock()
+_last_refresh = [time.monotonic()]
+
+
+def refresh_default(loader):
+    if not DATA_POLL_SECONDS or time.monotonic() - _last_refresh[0] < DATA_POLL_SECONDS:
+        return
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    try:
+        _last_refresh[0] = time.monotonic()
+        loader.refresh()
+    except (OSError, ValueError):
+        pass
+    finally:
+        _refresh_lock.release()
+
+
+# Initialize components; no data is loaded until the first request needs it
+charts = PortfolioCharts(COLORS, max_points=CHART_MAX_POINTS)
 metrics = PortfolioMetrics(COLORS)
 layout = DashboardLayout()
 
-# Initialize Dash app with callback exception suppression
-app = dash.Dash(
-    __name__, 
-    external_stylesheets=[
-        dbc.themes.FLATLY,
-        {
-            'href': 'https://use.fontawesome.com/releases/v5.15.4/css/all.css',
-            'rel': 'stylesheet',
-            'integrity': 'sha384-DyZ88mC6Up2uqS4h/KRgHuoeGwBcD4Ng9SiP4dIRy0EXTlnuz47vAwmeGwVChigm',
-            'crossorigin': 'anonymous'
-        },
-        {
-            'href': 'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',
-            'rel': 'stylesheet',
-            'integrity': 'sha384-1BmE4kWBq78iYhFldvKuhfTAU6auU8tT94WrHftjDbrCEXSU1oBoqyl2QvZ6jIW3',
-            'crossorigin': 'anonymous'
-        },
-        {'href': '/assets/styles.css', 'rel': 'stylesheet'}  
-    ],
-    suppress_callback_exceptions=True,
-    assets_folder='assets'
-)
-
-# Create initial charts and metrics
-initial_metric_cards = metrics.create_all_metric_cards(port_ret)
-initial_chart_figures = {
-    'Cumulative Returns': charts.create_cumulative_returns_chart(port_ret),
-    'Rolling Statistics': charts.create_rolling_stats_chart(port_ret),
-    'Drawdown Analysis': charts.create_drawdown_chart(port_ret),
-    'Risk Metrics': charts.create_risk_metrics_chart({
-        'Monthly VaR': stats.var(port_ret),
-        'Monthly CVaR': stats.cvar(port_ret),
-        'Max Drawdown': stats.max_drawdown(port_ret)
-    })
+
+def get_stats(pipeline, weights):
+    """One kernel pass feeds both the metric cards and the risk chart."""
+    return pipeline.memoize(
+        'stats',
+        weights,
+        telemetry.timed('portfolio_stats')(RunningStats.from_returns),
+        lambda state, port_ret, n_new: state.update(port_ret.iloc[-n_new:]),
+    ).result()
+
+
+def get_rolling(pipeline, weights, window, benchmark=None):
+    """Rolling statistics, cached per (dataset, weights, window, benchmark)."""
+    if benchmark not in pipeline.asset_names:
+        benchmark = pipeline.asset_names[0]
+    return pipeline.memoize(
+        ('rolling', window, benchmark),
+        weights,
+        lambda port_ret: telemetry.timed('rolling_stats')(rolling_stats)(
+            port_ret, window, pipeline.asset_returns(benchmark)
+        ),
+        lambda stats, port_ret, n_new: extend_rolling(
+            stats, port_ret, window, pipeline.asset_returns(benchmark)
+        ),
+    )
+
+
+def get_simulation(
+    pipeline, weights, method='bootstrap', years=DEFAULT_SIMULATION_YEARS
+):
+    """Simulated forward paths, cached per (dataset, weights, method, horizon)."""
+    simulator = MonteCarloSimulator(
+        pipeline,
+        SIMULATION_PATHS,
+        years,
+        method,
+        block=SIMULATION_BLOCK,
+        seed=SIMULATION_SEED,
+        max_bytes=BATCH_MAX_BYTES,
+        workers=BATCH_WORKERS,
+    )
+    return pipeline.memoize(
+        ('simulation', method, years),
+        weights,
+        lambda _: telemetry.timed('simulate', method=method)(simulator.simulate)(
+            weights
+        ),
+    )
+
+
+def create_simulation_chart(
+    pipeline, weights, title, create_chart, run=False, **options
+):
+    """
+    A simulation chart, or a prompt until the simulation is switched on.
+
+    Simulating allocates every path, so it runs only on request rather than
+    on each weight change of every session.
+    """
+    if not run:
+        return charts.create_message_chart(
+            title, "Switch on Run simulation to simulate this portfolio"
+        )
+    return create_chart(get_simulation(pipeline, weights, **options))
+
+
+def create_period_table(pipeline, weights, freq=DEFAULT_PERIOD_FREQUENCY):
+    """
+    Period return table and its statistics at ``freq``, from the cached resampled
+    returns.
+
+    Next to the portfolio only the PERIOD_TABLE_ASSETS largest holdings are shown.
+    """
+    columns, held = pipeline.holdings(weights)
+    largest = columns[np.argsort(-held, kind='stable')[:PERIOD_TABLE_ASSETS]]
+    returns = pd.concat(
+        [
+            portfolio_period_returns(pipeline, weights, freq),
+            asset_period_returns(pipeline, freq).iloc[:, np.sort(largest)],
+        ],
+        axis=1,
+    )
+    stats = period_stats(returns, freq, years_between(pipeline.index))
+    label = next(label for label, value in PERIOD_FREQUENCIES.items() if value == freq)
+    return charts.create_period_returns_table(returns, stats, label)
+
+
+def create_return_attribution(pipeline, weights, freq=DEFAULT_PERIOD_FREQUENCY):
+    """Per-holding contributions to each period's return at ``freq``."""
+    label = next(label for label, value in PERIOD_FREQUENCIES.items() if value == freq)
+    return charts.create_return_attribution_chart(
+        return_attribution(pipeline, weights, freq), label, ATTRIBUTION_ASSETS
+    )
+
+
+def get_correlation(loader, weights, window=0, method='sample'):
+    """
+    Correlation matrix over ``window`` trailing days (0: full history), from
+    the co-moments cached per (dataset, window).
+
+    Wide universes are limited to the CORRELATION_MAX_ASSETS largest holdings.
+    """
+    pipeline = loader.pipeline
+    columns = None
+    if len(pipeline.asset_names) > CORRELATION_MAX_ASSETS:
+        held, w = pipeline.holdings(weights)
+        columns = np.sort(held[np.argsort(-w, kind='stable')[:CORRELATION_MAX_ASSETS]])
+    return correlation(pipeline, loader.return_history, window or None, method, columns)
+
+
+# Time-series figure builders, memoized per dataset on the portfolio weights
+# (and the chart's control values, see chart_controls)
+chart_builders = {
+    'Cumulative Returns': lambda pipeline, weights, x_range: (
+        charts.create_cumulative_returns_chart(
+            pipeline.portfolio_returns(weights), x_range, period_grids(pipeline)
+        )
+    ),
+    'Rolling Statistics': lambda pipeline, weights, x_range, window=(
+        DEFAULT_ROLLING_WINDOW
+    ), benchmark=None: charts.create_rolling_stats_chart(
+        get_rolling(pipeline, weights, window, benchmark),
+        x_range,
+        period_grids(pipeline),
+    ),
+    'Drawdown Analysis': lambda pipeline, weights, x_range: (
+        charts.create_drawdown_chart(
+            pipeline.portfolio_returns(weights), x_range, period_grids(pipeline)
+        )
+    ),
+}
+
+summary_builders = {
+    'Risk Metrics': lambda pipeline, weights: charts.create_risk_metrics_chart(
+        get_stats(pipeline, weights)
+    ),
+    'Risk Contribution': lambda pipeline, weights: (
+        charts.create_risk_contribution_chart(
+            risk_attribution(pipeline, weights), ATTRIBUTION_ASSETS
+        )
+    ),
+    'Drawdown Attribution': lambda pipeline, weights: (
+        charts.create_drawdown_attribution_chart(
+            drawdown_attribution(pipeline, weights, ATTRIBUTION_DRAWDOWNS),
+            ATTRIBUTION_ASSETS,
+        )
+    ),
+    'Portfolio Grid': lambda pipeline, weights: charts.create_portfolio_scatter_chart(
+        evaluate_grid(pipeline),
+        get_stats(pipeline, weights),
+        *evaluate_frontier(pipeline),
+    ),
+    'Simulated Wealth': lambda pipeline, weights, **options: create_simulation_chart(
+        pipeline,
+        weights,
+        'Simulated Wealth',
+        charts.create_simulation_fan_chart,
+        **options,
+    ),
+    'Simulated Risk': lambda pipeline, weights, **options: create_simulation_chart(
+        pipeline,
+        weights,
+        'Simulated Risk',
+        charts.create_simulation_risk_chart,
+        **options,
+    ),
+    'Monthly Returns': lambda pipeline, weights: charts.create_monthly_returns_heatmap(
+        portfolio_period_returns(pipeline, weights, 'M')
+    ),
+    'Period Returns': lambda pipeline, weights, **options: create_period_table(
+        pipeline, weights, **options
+    ),
+    'Return Attribution': lambda pipeline, weights, **options: (
+        create_return_attribution(pipeline, weights, **options)
+    ),
+}
+
+# Summary figures that also need the loader (e.g. the price history behind its returns)
+loader_builders = {
+    'Correlation Matrix': lambda loader, weights, **options: (
+        charts.create_correlation_heatmap(get_correlation(loader, weights, **options))
+    )
+}
+
+chart_titles = list(chart_builders) + list(summary_builders) + list(loader_builders)
+
+# Charts that a weight change leaves as they are, given the dataset and the
+# chart's control values: the correlation matrix unless it shows the largest
+# holdings of a wide universe, and the simulation charts until they are run
+weight_independent = {
+    'Correlation Matrix': lambda pipeline, options: (
+        len(pipeline.asset_names) <= CORRELATION_MAX_ASSETS
+    ),
+    'Simulated Wealth': lambda pipeline, options: not options.get('run'),
+    'Simulated Risk': lambda pipeline, options: not options.get('run'),
+}
+
+# Charts whose layout (bins, marker lines, the prompt shown before simulating)
+# or traces (the holdings shown by the attribution charts) also change, so
+# they are never patched
+full_figure_charts = {
+    'Simulated Wealth',
+    'Simulated Risk',
+    'Monthly Returns',
+    'Period Returns',
+    'Correlation Matrix',
+    'Risk Contribution',
+    'Drawdown Attribution',
+    'Return Attribution',
 }
 
+# Chart options (builder keyword -> component id); the controls are shown
+# above the first chart using them
+simulation_controls = {
+    'run': 'simulation-run',
+    'method': 'simulation-method',
+    'years': 'simulation-horizon',
+}
+chart_controls = {
+    'Rolling Statistics': {
+        'window': 'rolling-window',
+        'benchmark': 'rolling-benchmark',
+    },
+    'Simulated Wealth': simulation_controls,
+    'Simulated Risk': simulation_controls,
+    'Period Returns': {'freq': 'period-frequency'},
+    'Return Attribution': {'freq': 'attribution-frequency'},
+    'Correlation Matrix': {
+        'window': 'correlation-window',
+        'method': 'correlation-method',
+    },
+}
+
+
+def build_figure(loader, weights, title, x_range=None, options=None):
+    """Build one chart, reusing the memoized full-range figure when possible."""
+    pipeline = loader.pipeline
+    weights = weights or loader.weights
+    options = options or {}
+    stage = (title,) + tuple(sorted(options.items())) if options else title
+    if title in chart_builders:
+
+        def builder(_):
+            with telemetry.span('build_figure', chart=title):
+                return chart_builders[title](pipeline, weights, x_range, **options)
+
+        if x_range is not None:
+            return builder(None)
+        return pipeline.memoize(stage, weights, builder)
+
+    def summary_builder(_=None):
+        with telemetry.span('build_figure', chart=title):
+            if title in loader_builders:
+                return loader_builders[title](loader, weights, **options)
+            return summary_builders[title](pipeline, weights, **options)
+
+    if title in weight_independent and weight_independent[title](pipeline, options):
+        return pipeline.cached(stage, summary_builder)
+    return pipeline.memoize(stage, weights, summary_builder)
+
+
+def evaluate_grid(pipeline):
+    """Statistics for a fixed set of random candidate allocations, cached per dataset"""
+    return pipeline.cached(
+        'grid_stats',
+        lambda: telemetry.timed('candidate_stats')(candidate_stats)(
+            pipeline, GRID_PORTFOLIOS, BATCH_MAX_BYTES, BATCH_WORKERS
+        ),
+    )
+
+
+def evaluate_frontier(pipeline):
+    """(statistics, error) along the long-only efficient frontier, per dataset."""
+    return pipeline.cached(
+        'frontier_stats',
+        lambda: telemetry.timed('frontier_stats')(frontier_stats)(
+            pipeline, FRONTIER_POINTS, BATCH_MAX_BYTES, FRONTIER_MAX_ASSETS
+        ),
+    )
+
+
+def patch_current_portfolio(pipeline, weights):
+    """
+    Partial update of the portfolio grid moving only its Current Portfolio
+    marker, the last trace after the frontier (when traced) and the
+    candidates, so the candidate scatter is not rebuilt on a weight change.
+    """
+    stats = get_stats(pipeline, weights)
+    frontier, _ = evaluate_frontier(pipeline)
+    index = 1 if frontier is None else 2
+    patched = Patch()
+    patched['data'][index]['x'] = [stats.volatility]
+    patched['data'][index]['y'] = [stats.cagr]
+    return patched
+
+
+# Partial updates for a weight change that are cheaper than building the
+# figure and sending its trace data
+weight_patches = {'Portfolio Grid': patch_current_portfolio}
+
+
+def patch_traces(figure, x_range=None):
+    """Partial update carrying only the trace data (and viewport) of a figure."""
+    patched = Patch()
+    for i, trace in enumerate(figure.data):
+        patched['data'][i]['x'] = trace.x
+        patched['data'][i]['y'] = trace.y
+        if getattr(trace, 'text', None) is not None:
+            patched['data'][i]['text'] = trace.text
+    if x_range is not None:
+        patched['layout']['xaxis']['range'] = list(x_range)
+    return patched
+
+
+# Metric cards and charts start as placeholders filled in by their callbacks
+shell_metric_cards = metrics.create_all_metric_cards()
+shell_chart_figures = {title: {} for title in chart_titles}
+
+
+# Window and beta benchmark selection for the rolling statistics chart
+def create_rolling_controls():
+    return dbc.Row(
+        [
+            dbc.Col(
+                [
+                    dbc.Label("Window", className="small"),
+                    dcc.Dropdown(
+                        id='rolling-window',
+                        options=[
+                            {'label': label, 'value': days}
+                            for label, days in ROLLING_WINDOWS.items()
+                        ],
+                        value=DEFAULT_ROLLING_WINDOW,
+                        clearable=False,
+                    ),
+                ],
+                width=6,
+                md=3,
+            ),
+            dbc.Col(
+                [
+                    dbc.Label("Beta vs", className="small"),
+                    dcc.Dropdown(id='rolling-benchmark', options=[], clearable=False),
+                ],
+                width=6,
+                md=3,
+            ),
+        ],
+        className="mb-2",
+    )
+
+
+# On/off switch, method and horizon selection for the simulation charts
+def create_simulation_controls():
+    return dbc.Row(
+        [
+            dbc.Col(
+                [
+                    dbc.Label("Simulation", className="small"),
+                    dbc.Switch(
+                        id='simulation-run', label="Run simulation", value=False
+                    ),
+                ],
+                width=12,
+                md=3,
+            ),
+            dbc.Col(
+                [
+                    dbc.Label("Method", className="small"),
+                    dcc.Dropdown(
+                        id='simulation-method',
+                        options=[
+                            {'label': label, 'value': method}
+                            for label, method in SIMULATION_METHODS.items()
+                        ],
+                        value='bootstrap',
+                        clearable=False,
+                    ),
+                ],
+                width=6,
+                md=3,
+            ),
+            dbc.Col(
+                [
+                    dbc.Label("Horizon", className="small"),
+                    dcc.Dropdown(
+                        id='simulation-horizon',
+                        options=[
+                            {'label': label, 'value': years}
+                            for label, years in SIMULATION_HORIZONS.items()
+                        ],
+                        value=DEFAULT_SIMULATION_YEARS,
+                        clearable=False,
+                    ),
+                ],
+                width=6,
+                md=3,
+            ),
+        ],
+        className="mb-2",
+    )
+
+
+# Frequency selection for the period returns table (and the return attribution)
+def create_period_controls(component_id='period-frequency'):
+    return dbc.Row(
+        [
+            dbc.Col(
+                [
+                    dbc.Label("Frequency", className="small"),
+                    dcc.Dropdown(
+                        id=component_id,
+                        options=[
+                            {'label': label, 'value': freq}
+                            for label, freq in PERIOD_FREQUENCIES.items()
+                        ],
+                        value=DEFAULT_PERIOD_FREQUENCY,
+                        clearable=False,
+                    ),
+                ],
+                width=6,
+                md=3,
+            )
+        ],
+        className="mb-2",
+    )
+
+
+# Window and estimator selection for the correlation heatmap
+def create_correlation_controls():
+    windows = {'Full': 0, **ROLLING_WINDOWS}
+    return dbc.Row(
+        [
+            dbc.Col(
+                [
+                    dbc.Label("Window", className="small"),
+                    dcc.Dropdown(
+                        id='correlation-window',
+                        options=[
+                            {'label': label, 'value': days}
+                            for label, days in windows.items()
+                        ],
+                        value=0,
+                        clearable=False,
+                    ),
+                ],
+                width=6,
+                md=3,
+            ),
+            dbc.Col(
+                [
+                    dbc.Label("Estimator", className="small"),
+                    dcc.Dropdown(
+                        id='correlation-method',
+                        options=[
+                            {'label': label, 'value': method}
+                            for label, method in CORRELATION_METHODS.items()
+                        ],
+                        value='sample',
+                        clearable=False,
+                    ),
+                ],
+                width=6,
+                md=3,
+            ),
+        ],
+        className="mb-2",
+    )
+
+
 # Create weight input components
-def create_weight_inputs():
-    asset_names = data_loader.asset_names
-    current_weights = data_loader.weights
-    
-    return dbc.Card([
-        dbc.CardHeader("Portfolio Weights", className="text-center"),
-        dbc.CardBody([
-            dbc.Row([
-                dbc.Col([
-                    dbc.Label(f"{asset} Weight"),
-                    dbc.Input(
-                        id={'type': 'weight-input', 'index': i},
-                        type='number',
-                        min=0,
-                        max=1,
-                        step=0.1,
-                        value=weight
-                    )
-                ], width=12, md=4, className="mb-3")
-                for i, (asset, weight) in enumerate(zip(asset_names, current_weights))
-            ]),
-            dbc.Row([
-                dbc.Col([
-                    dbc.Button("Update Portfolio", id='update-portfolio', color="primary", className="w-100"),
-                    html.Div(id="weight-error", className="text-danger small mt-2")
-                ], width=12)
-            ])
-        ])
-    ], className="mb-4")
+def create_weight_inputs(loader, current_weights=None):
+    asset_names = loader.asset_names
+    current_weights = current_weights or loader.weights
+
+    return dbc.Card(
+        [
+            dbc.CardHeader("Portfolio Weights", className="text-center"),
+            dbc.CardBody(
+                [
+                    dbc.Row(
+                        [
+                            dbc.Col(
+                                [
+                                    dbc.Label(f"{asset} Weight"),
+                                    dbc.Input(
+                                        id={'type': 'weight-input', 'index': i},
+                                        type='number',
+                                        min=0,
+                                        max=1,
+                                        step=0.1,
+                                        value=weight,
+                                    ),
+                                ],
+                                width=12,
+                                md=4,
+                                className="mb-3",
+                            )
+                            for i, (asset, weight) in enumerate(
+                                zip(asset_names, current_weights)
+                            )
+                        ]
+                    ),
+                    dbc.Row(
+                        [
+                            dbc.Col(
+                                [
+                                    dbc.Button(
+                                        "Update Portfolio",
+                                        id='update-portfolio',
+                                        color="primary",
+                                        className="w-100",
+                                    ),
+                                    html.Div(
+                                        id="weight-error",
+                                        className="text-danger small mt-2",
+                                    ),
+                                ],
+                                width=12,
+                            )
+                        ]
+                    ),
+                ]
+            ),
+        ],
+        className="mb-4",
+    )
+
+
+# Wide universes get a searchable table of the held assets instead of one input
+# per asset
+def create_holdings_table(loader, current_weights=None):
+    pipeline = loader.pipeline
+    columns, held = pipeline.holdings(current_weights or loader.weights)
+    rows = [
+        {'asset': pipeline.asset_names[i], 'weight': round(float(w), 6)}
+        for i, w in zip(columns, held)
+    ]
+
+    return dbc.Card(
+        [
+            dbc.CardHeader("Portfolio Holdings", className="text-center"),
+            dbc.CardBody(
+                [
+                    dcc.Dropdown(
+                        id={'type': 'holding-search', 'index': 0},
+                        placeholder=(
+                            f"Search {len(pipeline.asset_names)} assets"
+                            " to add a holding"
+                        ),
+                        options=[],
+                        className="mb-3",
+                    ),
+                    dash_table.DataTable(
+                        id={'type': 'holdings-table', 'index': 0},
+                        columns=[
+                            {'name': 'Asset', 'id': 'asset', 'editable': False},
+                            {
+                                'name': 'Weight',
+                                'id': 'weight',
+                                'type': 'numeric',
+                                'editable': True,
+                            },
+                        ],
+                        data=rows,
+                        editable=True,
+                        row_deletable=True,
+                        filter_action='native',
+                        sort_action='native',
+                        page_action='none',
+                        virtualization=True,
+                        fixed_rows={'headers': True},
+                        style_table={'height': '320px', 'overflowY': 'auto'},
+                        style_cell={'textAlign': 'left', 'minWidth': '120px'},
+                    ),
+                    dbc.Row(
+                        [
+                            dbc.Col(
+                                [
+                                    dbc.Button(
+                                        "Update Portfolio",
+                                        id='update-portfolio',
+                                        color="primary",
+                                        className="w-100 mt-3",
+                                    ),
+                                    html.Div(
+                                        id="weight-error",
+                                        className="text-danger small mt-2",
+                                    ),
+                                ],
+                                width=12,
+                            )
+                        ]
+                    ),
+                ]
+            ),
+        ],
+        className="mb-4",
+    )
+
+
+def parse_holdings(rows):
+    """Sparse {asset: weight} from holdings table rows; blank weights count as 0."""
+    weights = {}
+    for row in rows:
+        weight = row.get('weight')
+        weight = float(weight) if weight not in (None, '') else 0.0
+        weights[row['asset']] = weights.get(row['asset'], 0.0) + weight
+    return weights
+
 
 # Create file upload component
 def create_upload_section():
-    return dbc.Card([
-        dbc.CardHeader("Data Upload", className="text-center"),
-        dbc.CardBody([
-            dcc.Upload(
-                id='upload-data',
-                children=html.Div([
-                    'Drag and Drop or ',
-                    html.A('Select CSV File')
-                ]),
-                style={
-                    'width': '100%',
-                    'height': '60px',
-                    'lineHeight': '60px',
-                    'borderWidth': '1px',
-                    'borderStyle': 'dashed',
-                    'borderRadius': '5px',
-                    'textAlign': 'center',
-                    'margin': '10px 0'
-                },
-                multiple=False
+    return dbc.Card(
+        [
+            dbc.CardHeader("Data Upload", className="text-center"),
+            dbc.CardBody(
+                [
+                    dcc.Upload(
+                        id='upload-data',
+                        children=html.Div(
+                            ['Drag and Drop or ', html.A('Select CSV File')]
+                        ),
+                        style={
+                            'width': '100%',
+                            'height': '60px',
+                            'lineHeight': '60px',
+                            'borderWidth': '1px',
+                            'borderStyle': 'dashed',
+                            'borderRadius': '5px',
+                            'textAlign': 'center',
+                            'margin': '10px 0',
+                        },
+                        multiple=False,
+                    ),
+                    html.Div(
+                        [
+                            html.Button(
+                                "Upload a large CSV in chunks",
+                                id='chunked-upload-button',
+                                className="btn btn-link btn-sm p-0",
+                                **{'data-chunk-bytes': UPLOAD_CHUNK_BYTES},
+                            ),
+                            html.Span(
+                                id='chunked-upload-status',
+                                className="small text-muted ms-2",
+                            ),
+                            html.Button(
+                                id='chunked-upload-done', style={'display': 'none'}
+                            ),
+                            dcc.Store(
+                                id='chunked-upload-result', storage_type='memory'
+                            ),
+                        ]
+                    ),
+                    html.Div(
+                        [
+                            dbc.Progress(
+                                id='job-progress',
+                                value=0,
+                                striped=True,
+                                animated=True,
+                                className="mb-2",
+                            ),
+                            dbc.Button(
+                                "Cancel",
+                                id='cancel-job',
+                                color="link",
+                                size="sm",
+                                className="p-0",
+                            ),
+                        ],
+                        id='job-status',
+                        style={'display': 'none'},
+                    ),
+                    dcc.Interval(id='job-poll', interval=JOB_POLL_MS, disabled=True),
+                    dcc.Store(id='job-store', storage_type='memory'),
+                    html.Div(id='upload-error', className="text-danger small mt-2"),
+                    html.Div(id='upload-success', className="text-success small mt-2"),
+                ]
+            ),
+        ],
+        className="mb-4",
+    )
+
+
+# Create optimizer component
+def create_optimizer_section():
+    return dbc.Card(
+        [
+            dbc.CardHeader("Portfolio Optimizer", className="text-center"),
+            dbc.CardBody(
+                [
+                    dbc.Row(
+                        [
+                            dbc.Col(
+                                [
+                                    dcc.Dropdown(
+                                        id='optimizer-objective',
+                                        options=[
+                                            {
+                                                'label': 'Maximum Sharpe Ratio',
+                                                'value': 'max_sharpe',
+                                            },
+                                            {
+                                                'label': 'Minimum Variance',
+                                                'value': 'min_variance',
+                                            },
+                                            {
+                                                'label': 'Risk Parity',
+                                                'value': 'risk_parity',
+                                            },
+                                        ],
+                                        value='max_sharpe',
+                                        clearable=False,
+                                    )
+                                ],
+                                width=12,
+                                md=8,
+                                className="mb-2",
+                            ),
+                            dbc.Col(
+                                [
+                                    dbc.Button(
+                                        "Optimize Weights",
+                                        id='optimize-portfolio',
+                                        color="secondary",
+                                        className="w-100",
+                                    )
+                                ],
+                                width=12,
+                                md=4,
+                                className="mb-2",
+                            ),
+                        ]
+                    ),
+                    html.Div(id='optimizer-status', className="text-muted small mt-2"),
+                ]
+            ),
+        ],
+        className="mb-4",
+    )
+
+
+# Lightweight shell served immediately; the initial callbacks compute the
+# default dashboard on first request and the results are memoized per dataset.
+def create_shell():
+    return dbc.Container(
+        [
+            dbc.Row(
+                [
+                    dbc.Col(
+                        html.H1("Portfolio Statistics", className="text-center my-4"),
+                        width=12,
+                    )
+                ]
+            ),
+            dcc.Store(id='dataset-store', storage_type='memory', data=DEFAULT_DATASET),
+            dcc.Store(id='weights-store', storage_type='memory', data=None),
+            create_upload_section(),
+            html.Div(id='weight-inputs-container'),
+            create_optimizer_section(),
+            html.Div(
+                layout.create_layout(
+                    shell_metric_cards,
+                    shell_chart_figures,
+                    {
+                        'Rolling Statistics': create_rolling_controls(),
+                        'Simulated Wealth': create_simulation_controls(),
+                        'Period Returns': create_period_controls(),
+                        'Return Attribution': create_period_controls(
+                            'attribution-frequency'
+                        ),
+                        'Correlation Matrix': create_correlation_controls(),
+                    },
+                ),
+                id='charts-container',
             ),
-            html.Div(id='upload-error', className="text-danger small mt-2"),
-            html.Div(id='upload-success', className="text-success small mt-2")
-        ])
-    ], className="mb-4")
-
-# Create app layout with initial content
-app.layout = dbc.Container([
-    dbc.Row([
-        dbc.Col(html.H1("Portfolio Statistics", className="text-center my-4"), width=12)
-    ]),
-    create_upload_section(),
-    html.Div(create_weight_inputs(), id='weight-inputs-container'),
-    html.Div(layout.create_layout(initial_metric_cards, initial_chart_figures), id='charts-container')
-], fluid=True)
-
-# Callback to update the dashboard
-@app.callback(
+        ],
+        fluid=True,
+    )
+
+
+def create_app():
+    """Build the Dash app; callbacks are registered globally via dash.callback."""
+    app = dash.Dash(
+        __name__,
+        external_stylesheets=[
+            dbc.themes.FLATLY,
+            {
+                'href': 'https://use.fontawesome.com/releases/v5.15.4/css/all.css',
+                'rel': 'stylesheet',
+                'integrity': 'sha384-DyZ88mC6Up2uqS4h/KRgHuoeGwBcD4Ng9SiP4dIRy0EXTlnuz47vAwmeGwVChigm',  # noqa: E501
+                'crossorigin': 'anonymous',
+            },
+            {
+                'href': 'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',  # noqa: E501
+                'rel': 'stylesheet',
+                'integrity': 'sha384-1BmE4kWBq78iYhFldvKuhfTAU6auU8tT94WrHftjDbrCEXSU1oBoqyl2QvZ6jIW3',  # noqa: E501
+                'crossorigin': 'anonymous',
+            },
+            {'href': '/assets/styles.css', 'rel': 'stylesheet'},
+        ],
+        suppress_callback_exceptions=True,
+        assets_folder='assets',
+    )
+    app.layout = create_shell()
+    register_upload_routes(app.server)
+    register_metrics_route(app.server, lambda: app.callback_map)
+    register_payload_cache(app.server)
+    return app
+
+
+def register_metrics_route(server, callback_outputs=lambda: ()):
+    """
+    Request timings and payload sizes, plus a Prometheus-style /metrics route.
+
+    ``callback_outputs`` returns the registered callback outputs; callback
+    requests for any other output (the body is client supplied) are
+    labelled 'other' so a client cannot create new series.
+    """
+
+    @server.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @server.after_request
+    def record_request(response):
+        if (
+            not telemetry.enabled
+            or request.endpoint == 'metrics'
+            or 'request_start' not in g
+        ):
+            return response
+        labels = {'route': request.url_rule.rule if request.url_rule else 'unmatched'}
+        if request.path.endswith('_dash-update-component'):
+            # Callback compute is in the callback span; the rest is serialization
+            output = (request.get_json(silent=True) or {}).get('output')
+            known = isinstance(output, str) and output in callback_outputs()
+            labels['output'] = output if known else 'other'
+        telemetry.observe(
+            'request_seconds',
+            time.perf_counter() - g.request_start,
+            SECONDS_BUCKETS,
+            **labels,
+        )
+        if request.content_length:
+            telemetry.observe('request_bytes', request.content_length, **labels)
+        size = response.content_length
+        if size is None and not response.direct_passthrough:
+            size = len(response.get_data())
+        if size is not None:
+            telemetry.observe('response_bytes', size, **labels)
+        return response
+
+    @server.route('/metrics')
+    def metrics():
+        if not telemetry.enabled:
+            return Response(
+                "Telemetry is disabled\n", status=404, mimetype='text/plain'
+            )
+        return Response(telemetry.render(), mimetype='text/plain; version=0.0.4')
+
+
+# Chart figures and metric values depend only on the dataset and the callback
+# inputs, so a repeat request (another user on the default portfolio, a
+# revisited weight set) is answered with the stored, already compressed body.
+payload_cache = PayloadCache(PAYLOAD_CACHE_BYTES, compression=RESPONSE_COMPRESSION)
+cacheable_outputs = {f'chart-{i}.figure' for i in range(len(chart_titles))}
+cacheable_outputs.add(
+    '..'
+    + '...'.join(f'metric-value-{i}.children' for i in range(len(shell_metric_cards)))
+    + '..'
+)
+cacheable_pages = {'/_dash-layout', '/_dash-dependencies'}
+
+
+def payload_key(body):
+    """
+    Cache key of a callback request body, None if it is not cacheable.
+
+    The body carries the output, every input and state value and which of
+    them changed (which decides between a full figure and a Patch); the
+    dataset's version is added so appended rows invalidate its payloads.
+    """
+    if not isinstance(body, dict) or body.get('output') not in cacheable_outputs:
+        return None
+    dataset_key = next(
+        (
+            item.get('value')
+            for item in body.get('inputs', [])
+            if isinstance(item, dict) and item.get('id') == 'dataset-store'
+        ),
+        None,
+    )
+    try:
+        version = get_loader(dataset_key).version
+    except ValueError:
+        return None
+    canonical = json.dumps([body, dataset_key, version], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def register_payload_cache(server):
+    """Serve repeat callbacks and pages from payload_cache; compress, ETag the rest."""
+
+    @server.before_request
+    def serve_cached_payload():
+        if request.method == 'POST' and request.path.endswith('_dash-update-component'):
+            body = request.get_json(silent=True)
+            key = g.payload_key = payload_key(body)
+            label = body.get('output', '') if key else ''
+        elif request.method in ('GET', 'HEAD') and request.path in cacheable_pages:
+            key = g.payload_key = request.path
+            label = request.path
+        else:
+            return None
+        if key is None:
+            return None
+        response = payload_cache.respond(key, request)
+        telemetry.cache('payload', response is not None, output=label)
+        if response is not None:
+            g.payload_served = True
+        return response
+
+    @server.after_request
+    def store_payload(response):
+        if g.get('payload_served'):
+            return response
+        key = g.get('payload_key')
+        if (
+            key is not None
+            and response.status_code == 200
+            and not response.direct_passthrough
+            and not response.is_streamed
+        ):
+            payload = payload_cache.put(key, response.get_data(), response.mimetype)
+            return payload_cache.serve(payload, request)
+        if RESPONSE_COMPRESSION:
+            return compress_response(response, request)
+        return response
+
+
+def register_upload_routes(server):
+    """Chunked upload endpoints used by assets/chunked_upload.js."""
+
+    @server.route('/upload/chunked', methods=['POST'])
+    def start_chunked_upload():
+        ChunkedUpload.cleanup(UPLOAD_DIR, STORE_TTL_SECONDS)
+        body = request.get_json(silent=True) or {}
+        try:
+            upload = ChunkedUpload.create(
+                UPLOAD_DIR,
+                body.get('filename'),
+                body.get('size'),
+                UPLOAD_MAX_BYTES,
+                UPLOAD_MAX_PENDING,
+            )
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        return jsonify(id=upload.id)
+
+    @server.route('/upload/chunked/<upload_id>/<int:index>', methods=['POST'])
+    def append_chunk(upload_id, index):
+        if (request.content_length or 0) > UPLOAD_CHUNK_BYTES:
+            return jsonify(error="Upload chunk is too large"), 413
+        try:
+            rows = ChunkedUpload.open(UPLOAD_DIR, upload_id).append(
+                index, request.get_data()
+            )
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        return jsonify(rows=rows)
+
+    @server.route('/upload/chunked/<upload_id>/complete', methods=['POST'])
+    def complete_chunked_upload(upload_id):
+        try:
+            upload = ChunkedUpload.open(UPLOAD_DIR, upload_id)
+            upload.finish()
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+
+        # Columnar conversion and analytics run as a job polled like uploads
+        job_id = job_runner.submit(
+            finalize_upload,
+            upload.directory,
+            STORE_DIR,
+            GRID_PORTFOLIOS,
+            FRONTIER_POINTS,
+            BATCH_MAX_BYTES,
+            FRONTIER_MAX_ASSETS,
+            key=f'upload:{upload_id}',
+        )
+        return jsonify(job={'id': job_id, 'filename': upload.filename})
+
+
+# Callback to update the selected dataset and weights
+@callback(
     [
-        Output('weight-inputs-container', 'children'),
-        Output('charts-container', 'children'),
+        Output('dataset-store', 'data'),
+        Output('weights-store', 'data'),
         Output('upload-error', 'children'),
-        Output('upload-success', 'children')
-    ],
-    [
-        Input('upload-data', 'contents'),
-        Input('update-portfolio', 'n_clicks')
+        Output('upload-success', 'children'),
+        Output('job-store', 'data'),
+        Output('job-poll', 'disabled'),
     ],
+    [Input('upload-data', 'contents'), Input('update-portfolio', 'n_clicks')],
     [
         State('upload-data', 'filename'),
-        State({'type': 'weight-input', 'index': ALL}, 'value')
+        State({'type': 'weight-input', 'index': ALL}, 'value'),
+        State({'type': 'holdings-table', 'index': ALL}, 'data'),
+        State('dataset-store', 'data'),
+        State('weights-store', 'data'),
     ],
-    prevent_initial_call=True
+    prevent_initial_call=True,
 )
-def update_dashboard(contents, n_clicks, filename, weights):
+@telemetry.timed('callback', callback='update_dashboard')
+def update_dashboard(
+    contents, n_clicks, filename, weights, holdings, dataset_key, current_weights
+):
     ctx = dash.callback_context
     trigger_id = ctx.triggered[0]['prop_id'] if ctx.triggered else None
 
     try:
         # Handle file upload
         if trigger_id == 'upload-data.contents' and contents is not None:
-            # Validate the uploaded file
-            is_valid, error_message = data_loader.validate_csv(contents, filename)
-            if not is_valid:
-                return dash.no_update, dash.no_update, error_message, ""
-
-            # Load new data
-            data_loader.load_data(contents, filename)
-            success_msg = f"Successfully loaded {filename}"
-        else:
-            success_msg = ""
+            # Decode once; identical files share one parsed dataset
+            try:
+                dataset_key, raw = decode_upload(contents, filename)
+            except ValueError as e:
+                return (
+                    dash.no_update,
+                    dash.no_update,
+                    str(e),
+                    "",
+                    dash.no_update,
+                    dash.no_update,
+                )
+            if dataset_store.get(dataset_key) is not None:
+                return (
+                    dataset_key,
+                    None,
+                    "",
+                    f"Successfully loaded {filename}",
+                    None,
+                    True,
+                )
+
+            # Parse in the background; identical in-flight uploads share one job
+            job_id = f'ingest:{dataset_key}'
+            state = job_runner.status(job_id)
+            if state is not None and state.finished:
+                job_runner.discard(job_id)
+            job_runner.submit(
+                ingest_upload,
+                raw,
+                dataset_key,
+                STORE_DIR,
+                GRID_PORTFOLIOS,
+                FRONTIER_POINTS,
+                BATCH_MAX_BYTES,
+                FRONTIER_MAX_ASSETS,
+                key=job_id,
+            )
+            return (
+                dash.no_update,
+                dash.no_update,
+                "",
+                "",
+                {'id': job_id, 'filename': filename},
+                False,
+            )
 
         # Handle weight updates
-        if trigger_id == 'update-portfolio.n_clicks' and weights:
+        if trigger_id == 'update-portfolio.n_clicks' and (weights or holdings):
+            loader = get_loader(dataset_key or DEFAULT_DATASET)
             try:
-                weights = [float(w) if w is not None else 0 for w in weights]
-                data_loader.set_weights(weights)
+                if holdings:
+                    # Wide universes are stored sparsely, as {asset: weight}
+                    weights = loader.validate_weights(parse_holdings(holdings[0]))
+                    loader.pipeline.weights_key(weights)
+                else:
+                    weights = [float(w) if w is not None else 0 for w in weights]
+                    if len(weights) != len(loader.asset_names):
+                        raise ValueError("Weight inputs do not match the loaded data")
+                    weights = loader.validate_weights(weights)
             except ValueError as e:
-                return dash.no_update, dash.no_update, str(e), ""
-
-        # Calculate portfolio returns
-        returns, port_ret = data_loader.calculate_returns()
-
-        # Create weight inputs section
-        weight_inputs = create_weight_inputs()
-
-        # Create charts and metrics
-        metric_cards = metrics.create_all_metric_cards(port_ret)
-        chart_figures = {
-            'Cumulative Returns': charts.create_cumulative_returns_chart(port_ret),
-            'Rolling Statistics': charts.create_rolling_stats_chart(port_ret),
-            'Drawdown Analysis': charts.create_drawdown_chart(port_ret),
-            'Risk Metrics': charts.create_risk_metrics_chart({
-                'Monthly VaR': stats.var(port_ret),
-                'Monthly CVaR': stats.cvar(port_ret),
-                'Max Drawdown': stats.max_drawdown(port_ret)
-            })
-        }
+                return (
+                    dash.no_update,
+                    dash.no_update,
+                    str(e),
+                    "",
+                    dash.no_update,
+                    dash.no_update,
+                )
 
-        # Create layout components
-        charts_layout = layout.create_layout(metric_cards, chart_figures)
+            # Unchanged weights leave every dependent component untouched
+            if weights == (current_weights or loader.weights):
+                return (
+                    dash.no_update,
+                    dash.no_update,
+                    "",
+                    "",
+                    dash.no_update,
+                    dash.no_update,
+                )
+            return dash.no_update, weights, "", "", dash.no_update, dash.no_update
 
-        return weight_inputs, charts_layout, "", success_msg
+        return dash.no_update, dash.no_update, "", "", dash.no_update, dash.no_update
 
+    except ValueError as e:
+        return (
+            dash.no_update,
+            dash.no_update,
+            f"Error: {str(e)}",
+            "",
+            dash.no_update,
+            dash.no_update,
+        )
     except Exception as e:
-        return dash.no_update, dash.no_update, f"Error: {str(e)}", ""
+        # Unexpected failures are logged with their traceback, not just shown
+        logger.exception("update_dashboard failed")
+        telemetry.count(
+            'callback_errors_total', callback='update_dashboard', error=type(e).__name__
+        )
+        return (
+            dash.no_update,
+            dash.no_update,
+            f"Error: {str(e)}",
+            "",
+            dash.no_update,
+            dash.no_update,
+        )
+
+
+# Hand a finished chunked upload over to the job polling
+clientside_callback(
+    ClientsideFunction(namespace='upload', function_name='result'),
+    Output('chunked-upload-result', 'data'),
+    Input('chunked-upload-done', 'n_clicks'),
+    prevent_initial_call=True,
+)
+
+
+@callback(
+    [
+        Output('job-store', 'data', allow_duplicate=True),
+        Output('job-poll', 'disabled', allow_duplicate=True),
+        Output('upload-error', 'children', allow_duplicate=True),
+        Output('upload-success', 'children', allow_duplicate=True),
+    ],
+    Input('chunked-upload-result', 'data'),
+    prevent_initial_call=True,
+)
+@telemetry.timed('callback', callback='start_chunked_job')
+def start_chunked_job(result):
+    if not result:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    if result.get('error'):
+        return dash.no_update, dash.no_update, result['error'], ""
+    return result['job'], False, "", ""
+
+
+# Poll the running ingest job and switch to its dataset when it finishes
+@callback(
+    [
+        Output('dataset-store', 'data', allow_duplicate=True),
+        Output('weights-store', 'data', allow_duplicate=True),
+        Output('upload-error', 'children', allow_duplicate=True),
+        Output('upload-success', 'children', allow_duplicate=True),
+        Output('job-progress', 'value'),
+        Output('job-progress', 'label'),
+        Output('job-status', 'style'),
+        Output('job-poll', 'disabled', allow_duplicate=True),
+    ],
+    Input('job-poll', 'n_intervals'),
+    State('job-store', 'data'),
+    prevent_initial_call=True,
+)
+@telemetry.timed('callback', callback='poll_job')
+def poll_job(n_intervals, job):
+    hidden = {'display': 'none'}
+    state = job_runner.status(job['id']) if job else None
+    if state is None:
+        return (
+            dash.no_update,
+            dash.no_update,
+            "Upload job was lost, please upload the file again",
+            "",
+            0,
+            "",
+            hidden,
+            True,
+        )
+
+    if state.status == DONE:
+        try:
+            loader = get_loader(state.result['dataset'])
+        except ValueError as e:
+            return dash.no_update, dash.no_update, str(e), "", 0, "", hidden, True
+        # Reuse the analytics the job already computed
+        loader.pipeline.cached('grid_stats', lambda: state.result['grid_stats'])
+        loader.pipeline.cached('frontier_stats', lambda: state.result['frontier_stats'])
+        return (
+            state.result['dataset'],
+            None,
+            "",
+            f"Successfully loaded {job['filename']}",
+            100,
+            "",
+            hidden,
+            True,
+        )
+    if state.status == FAILED:
+        return dash.no_update, dash.no_update, state.error, "", 0, "", hidden, True
+    if state.status == CANCELLED:
+        return (
+            dash.no_update,
+            dash.no_update,
+            "Upload cancelled",
+            "",
+            0,
+            "",
+            hidden,
+            True,
+        )
+
+    percent = round(state.progress * 100)
+    return (
+        dash.no_update,
+        dash.no_update,
+        "",
+        "",
+        percent,
+        state.message or "Queued",
+        {'display': 'block'},
+        False,
+    )
+
+
+@callback(
+    Output('job-progress', 'label', allow_duplicate=True),
+    Input('cancel-job', 'n_clicks'),
+    State('job-store', 'data'),
+    prevent_initial_call=True,
+)
+@telemetry.timed('callback', callback='cancel_job')
+def cancel_job(n_clicks, job):
+    if job and job_runner.cancel(job['id']):
+        return "Cancelling"
+    return dash.no_update
+
+
+# Rebuild the weight inputs only when a different dataset is selected
+@callback(Output('weight-inputs-container', 'children'), Input('dataset-store', 'data'))
+@telemetry.timed('callback', callback='update_weight_inputs')
+def update_weight_inputs(dataset_key):
+    try:
+        loader = get_loader(dataset_key)
+    except ValueError:
+        return dash.no_update
+    if len(loader.asset_names) > WIDE_UNIVERSE_ASSETS:
+        return create_holdings_table(loader)
+    return create_weight_inputs(loader)
+
+
+# Search the asset universe server-side; only the matches are sent to the browser
+@callback(
+    Output({'type': 'holding-search', 'index': MATCH}, 'options'),
+    Input({'type': 'holding-search', 'index': MATCH}, 'search_value'),
+    State('dataset-store', 'data'),
+    prevent_initial_call=True,
+)
+@telemetry.timed('callback', callback='search_holdings')
+def search_holdings(search_value, dataset_key):
+    if not search_value:
+        return dash.no_update
+    try:
+        asset_names = get_loader(dataset_key).asset_names
+    except ValueError:
+        return dash.no_update
+    needle = search_value.lower()
+    matches = [name for name in asset_names if needle in str(name).lower()]
+    return [
+        {'label': name, 'value': name} for name in matches[:HOLDINGS_SEARCH_RESULTS]
+    ]
+
+
+# Add the picked asset to the holdings table (at weight 0, to be edited)
+@callback(
+    [
+        Output(
+            {'type': 'holdings-table', 'index': MATCH}, 'data', allow_duplicate=True
+        ),
+        Output({'type': 'holding-search', 'index': MATCH}, 'value'),
+    ],
+    Input({'type': 'holding-search', 'index': MATCH}, 'value'),
+    State({'type': 'holdings-table', 'index': MATCH}, 'data'),
+    prevent_initial_call=True,
+)
+@telemetry.timed('callback', callback='add_holding')
+def add_holding(asset, rows):
+    if not asset:
+        return dash.no_update, dash.no_update
+    rows = rows or []
+    if any(row['asset'] == asset for row in rows):
+        return dash.no_update, None
+    return rows + [{'asset': asset, 'weight': 0}], None
+
+
+# Offer the dataset's assets as beta benchmarks
+@callback(
+    [Output('rolling-benchmark', 'options'), Output('rolling-benchmark', 'value')],
+    Input('dataset-store', 'data'),
+    State('rolling-benchmark', 'value'),
+)
+@telemetry.timed('callback', callback='update_rolling_benchmarks')
+def update_rolling_benchmarks(dataset_key, current):
+    try:
+        asset_names = get_loader(dataset_key).asset_names
+    except ValueError:
+        return dash.no_update, dash.no_update
+    value = current if current in asset_names else asset_names[0]
+    return [{'label': name, 'value': name} for name in asset_names], value
+
+
+# Update only the metric card values
+@callback(
+    [Output(f'metric-value-{i}', 'children') for i in range(len(shell_metric_cards))],
+    [Input('dataset-store', 'data'), Input('weights-store', 'data')],
+)
+@telemetry.timed('callback', callback='update_metric_values')
+def update_metric_values(dataset_key, weights):
+    try:
+        loader = get_loader(dataset_key)
+    except ValueError:
+        return [dash.no_update] * len(shell_metric_cards)
+    return metrics.metric_values(get_stats(loader.pipeline, weights or loader.weights))
+
+
+# Callback to fill the weight inputs with optimized weights
+@callback(
+    [
+        Output({'type': 'weight-input', 'index': ALL}, 'value'),
+        Output({'type': 'holdings-table', 'index': ALL}, 'data'),
+        Output('optimizer-status', 'children'),
+    ],
+    Input('optimize-portfolio', 'n_clicks'),
+    [State('optimizer-objective', 'value'), State('dataset-store', 'data')],
+    prevent_initial_call=True,
+)
+@telemetry.timed('callback', callback='optimize_weights')
+def optimize_weights(n_clicks, objective, dataset_key):
+    n_inputs = len(dash.callback_context.outputs_list[0])
+    n_tables = len(dash.callback_context.outputs_list[1])
+    try:
+        loader = get_loader(dataset_key or DEFAULT_DATASET)
+        # Each solve is a dense QP in every asset, run inside the request
+        n_assets = len(loader.asset_names)
+        if n_assets > FRONTIER_MAX_ASSETS:
+            raise ValueError(
+                f"Optimization is not available for {n_assets} assets "
+                f"(FRONTIER_MAX_ASSETS is {FRONTIER_MAX_ASSETS})"
+            )
+        result = PortfolioOptimizer(loader.pipeline).optimize(objective)
+        if n_inputs and len(result.weights) != n_inputs:
+            raise ValueError("Weight inputs do not match the loaded data")
+
+        # Round for display, keeping the total at exactly 1
+        weights = np.round(result.weights, 4)
+        weights[np.argmax(weights)] += 1 - weights.sum()
+        status = (
+            f"Expected return {result.expected_return:.1%}, "
+            f"volatility {result.volatility:.1%}. Click Update Portfolio to apply."
+        )
+        rows = [
+            {'asset': name, 'weight': round(float(w), 4)}
+            for name, w in zip(loader.asset_names, weights)
+            if round(float(w), 4) != 0
+        ]
+        return (
+            [round(float(w), 4) for w in weights] if n_inputs else [],
+            [rows] * n_tables,
+            status,
+        )
+    except ValueError as e:
+        return (
+            [dash.no_update] * n_inputs,
+            [dash.no_update] * n_tables,
+            f"Error: {str(e)}",
+        )
+
+
+def parse_x_range(relayout_data):
+    """
+    Extract the x-axis viewport from a relayoutData event.
+
+    Returns (start, end) for a zoom/pan, None for an autorange reset and
+    dash.no_update for events that do not change the x-axis.
+    """
+    if not relayout_data:
+        return dash.no_update
+    if relayout_data.get('xaxis.autorange') or relayout_data.get('autosize'):
+        return None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        return relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    if 'xaxis.range' in relayout_data:
+        return tuple(relayout_data['xaxis.range'])
+    return dash.no_update
+
+
+# One callback per chart: the first load or a new dataset sends the full
+# figure, while weight changes, control changes and zooms (time-series
+# charts) send a Patch with trace data only.
+def register_chart_callback(graph_id, title):
+    zoomable = title in chart_builders
+    controls = chart_controls.get(title, {})
+    inputs = [Input('dataset-store', 'data'), Input('weights-store', 'data')]
+    if zoomable:
+        inputs.append(Input(graph_id, 'relayoutData'))
+    inputs += [Input(component_id, 'value') for component_id in controls.values()]
+
+    @callback(Output(graph_id, 'figure'), inputs)
+    @telemetry.timed('callback', callback=f'update_chart:{graph_id}')
+    def update_chart(dataset_key, weights, *values):
+        relayout_data, control_values = (
+            (values[0], values[1:]) if zoomable else (None, values)
+        )
+        trigger = dash.callback_context.triggered_id
+        full = (
+            trigger is None
+            or 'dataset-store.data' in dash.callback_context.triggered_prop_ids
+        )
+        x_range = parse_x_range(relayout_data) if zoomable else None
+        if trigger == graph_id and x_range is dash.no_update:
+            return dash.no_update
+        if full or x_range is dash.no_update:
+            x_range = None
+
+        try:
+            loader = get_loader(dataset_key)
+        except ValueError:
+            return dash.no_update
+        options = {
+            name: value
+            for name, value in zip(controls, control_values)
+            if value is not None
+        }
+        if not full and trigger == 'weights-store':
+            if title in weight_independent and weight_independent[title](
+                loader.pipeline, options
+            ):
+                return dash.no_update
+            if title in weight_patches:
+                return weight_patches[title](loader.pipeline, weights or loader.weights)
+        figure = build_figure(loader, weights, title, x_range, options)
+        if full or title in full_figure_charts:
+            return figure
+        return patch_traces(figure, x_range if trigger != graph_id else None)
+
+
+for i, title in enumerate(chart_titles):
+    register_chart_callback(f'chart-{i}', title)
+
+app = create_app()
+server = app.server
 
 if __name__ == '__main__':
     # Get host and port from environment variables with defaults
@@ -0,0 +1,262 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.kernel import TRADING_DAYS
+from src.analytics.periods import period_grid
+from src.data.pipeline import ReturnsPipeline, Weights, WeightsKey
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+MEASURES = ('Volatility', 'VaR', 'CVaR')
+# Share of the rows, centred on the VaR quantile, whose asset returns are
+# averaged for the VaR contributions; a single scenario row is too noisy
+VAR_BAND = 0.01
+
+
+@dataclass
+class RiskAttribution:
+    """
+    Euler decomposition of portfolio volatility, historical VaR and CVaR.
+
+    ``marginal[m][i]`` is the sensitivity of measure m to the weight of
+    asset i, and the components ``weights * marginal[m]`` add up to
+    ``totals[m]``. Volatility is annualised; VaR and CVaR are one-period
+    returns (negative for a loss), so a positive share of them is a
+    contribution to the loss.
+    """
+
+    assets: List[str]
+    weights: np.ndarray
+    marginal: Dict[str, np.ndarray]
+    totals: Dict[str, float]
+    confidence: float
+
+    @property
+    def components(self) -> Dict[str, np.ndarray]:
+        return {
+            measure: self.weights * marginal
+            for measure, marginal in self.marginal.items()
+        }
+
+    def shares(self) -> pd.DataFrame:
+        """Component of each measure as a share of its total, one row per asset."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return pd.DataFrame(
+                {
+                    measure: component / self.totals[measure]
+                    for measure, component in self.components.items()
+                },
+                index=self.assets,
+            )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Weight, then the marginal and component values of each measure, per asset."""
+        columns = {'Weight': self.weights}
+        for measure, marginal in self.marginal.items():
+            columns[f'Marginal {measure}'] = marginal
+            columns[measure] = self.weights * marginal
+        return pd.DataFrame(columns, index=self.assets)
+
+
+@dataclass
+class DrawdownAttribution:
+    """
+    The deepest drawdowns of the portfolio, split by holding.
+
+    ``periods`` has the peak, trough and recovery (NaT while underwater)
+    dates and the depth of each drawdown; row i of ``contributions`` adds
+    up to the depth of drawdown i.
+    """
+
+    periods: pd.DataFrame
+    contributions: pd.DataFrame
+
+
+def held_product(
+    pipeline: ReturnsPipeline,
+    left: Union[np.ndarray, 'sparse.spmatrix'],
+    columns: np.ndarray,
+) -> np.ndarray:
+    """
+    ``left @ matrix[:, columns]`` for a vector or (sparse) row-weighting matrix.
+
+    As in ReturnsPipeline.portfolio_returns, the held columns are gathered
+    only when they are a minority; otherwise the full product is sliced.
+    """
+    if len(columns) * 2 > pipeline.matrix.shape[1]:
+        return np.asarray(left @ pipeline.matrix)[..., columns]
+    return np.asarray(left @ pipeline.matrix[:, columns])
+
+
+def column_sums(pipeline: ReturnsPipeline) -> np.ndarray:
+    """Sum of each asset's returns, cached per dataset and extended on append."""
+    return pipeline.cached(
+        'column_sums',
+        lambda: pipeline.matrix.sum(axis=0),
+        lambda sums, rows: sums + rows.sum(axis=0),
+    )
+
+
+def risk_attribution(
+    pipeline: ReturnsPipeline,
+    weights: Union[Weights, WeightsKey],
+    confidence: float = 0.95,
+    periods: int = TRADING_DAYS,
+) -> RiskAttribution:
+    """
+    Marginal and component contributions of the holdings to volatility, VaR and CVaR.
+
+    Volatility: the marginal contribution of asset i is cov(r_i, r_p) / sigma_p,
+    from one product of the held columns with the portfolio series (no
+    covariance matrix). VaR and CVaR are historical: their marginals are the
+    mean asset returns over the scenario rows (the VAR_BAND rows around the
+    quantile, the rows at or below it), selected with one partition of the
+    portfolio series. Each weight set costs O(rows x holdings) and is
+    memoized per dataset.
+    """
+    if not 0 < confidence < 1:
+        raise ValueError("Confidence must be between 0 and 1")
+
+    def build(port_ret):
+        r = port_ret.to_numpy()
+        n_rows = len(r)
+        if n_rows < 2:
+            raise ValueError("Not enough return rows for a risk attribution")
+        columns, w = pipeline.holdings(weights)
+        names = [pipeline.asset_names[i] for i in columns]
+
+        sigma = r.std(ddof=1)
+        means = column_sums(pipeline)[columns] / n_rows
+        cov = (held_product(pipeline, r, columns) - n_rows * means * r.mean()) / (
+            n_rows - 1
+        )
+
+        position = (1 - confidence) * (n_rows - 1)
+        half = max(1, int(round(VAR_BAND * n_rows / 2)))
+        low = max(int(np.floor(position)) - half, 0)
+        high = min(int(np.ceil(position)) + half, n_rows - 1)
+        order = np.argpartition(r, [low, high])
+        band = order[low : high + 1]
+        tail = np.flatnonzero(r <= np.quantile(r, 1 - confidence))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            marginal = {
+                'Volatility': cov / sigma * np.sqrt(periods),
+                'VaR': pipeline.matrix[np.ix_(band, columns)].mean(axis=0),
+                'CVaR': pipeline.matrix[np.ix_(tail, columns)].mean(axis=0),
+            }
+        totals = {
+            'Volatility': float(sigma * np.sqrt(periods)),
+            'VaR': float(r[band].mean()),
+            'CVaR': float(r[tail].mean()),
+        }
+        return RiskAttribution(names, w, marginal, totals, confidence)
+
+    return pipeline.memoize(('risk_attribution', confidence, periods), weights, build)
+
+
+def return_attribution(
+    pipeline: ReturnsPipeline, weights: Union[Weights, WeightsKey], freq: str
+) -> pd.DataFrame:
+    """
+    Contribution of each holding to the compounded portfolio return of every period.
+
+    Within a period, the return of row t is scaled by the portfolio's growth
+    since the period start, so the contributions of a period add up exactly
+    to its compounded (daily rebalanced) return in portfolio_period_returns.
+    The scaling is one sparse (periods x rows) matrix applied to the held
+    columns.
+    """
+    # scipy is imported on first use to keep app startup light
+    from scipy import sparse
+
+    def build(port_ret):
+        grid = period_grid(pipeline, freq)
+        r = port_ret.to_numpy()
+        before = np.concatenate([[1.0], np.cumprod(1.0 + r)[:-1]])
+        period = np.repeat(
+            np.arange(len(grid)), np.diff(np.append(grid.starts, grid.n_rows))
+        )
+        growth = before / before[grid.starts][period]
+        linking = sparse.csr_matrix(
+            (growth, (period, np.arange(len(r)))), shape=(len(grid), len(r))
+        )
+        columns, w = pipeline.holdings(weights)
+        return pd.DataFrame(
+            held_product(pipeline, linking, columns) * w,
+            index=grid.labels,
+            columns=[pipeline.asset_names[i] for i in columns],
+        )
+
+    return pipeline.memoize(('return_attribution', freq), weights, build)
+
+
+def drawdown_attribution(
+    pipeline: ReturnsPipeline, weights: Union[Weights, WeightsKey], n_periods: int = 5
+) -> DrawdownAttribution:
+    """
+    Contribution of each holding to the ``n_periods`` deepest drawdowns (peak to
+    trough).
+
+    Drawdowns are found in one pass over the portfolio wealth. Each row's
+    asset returns are scaled by the wealth relative to the peak, so the
+    contributions add up exactly to the drawdown depth; all drawdowns share
+    one sparse (drawdowns x rows) product with the held columns.
+    """
+    from scipy import sparse
+
+    def build(port_ret):
+        r = port_ret.to_numpy()
+        index = pipeline.index
+        columns, w = pipeline.holdings(weights)
+        # Wealth at each point: before the first row, then after every row
+        wealth = np.concatenate([[1.0], np.cumprod(1.0 + r)])
+        drawdown = wealth / np.maximum.accumulate(wealth) - 1.0
+        peaks = np.flatnonzero(drawdown == 0)
+        ends = np.append(peaks[1:], len(wealth))
+        depths = np.minimum.reduceat(drawdown, peaks)
+        deepest = np.argsort(depths, kind='stable')[:n_periods]
+        deepest = deepest[depths[deepest] < 0]
+
+        starts, stops = peaks[deepest], ends[deepest]
+        troughs = np.array(
+            [
+                start + int(np.argmin(drawdown[start:stop]))
+                for start, stop in zip(starts, stops)
+            ],
+            dtype=np.int64,
+        )
+        # Rows from each peak to its trough, and their wealth relative to the peak
+        lengths = troughs - starts
+        owner = np.repeat(np.arange(len(starts)), lengths)
+        rows = np.arange(lengths.sum()) + np.repeat(
+            starts - np.cumsum(lengths) + lengths, lengths
+        )
+        linking = sparse.csr_matrix(
+            (wealth[rows] / wealth[starts][owner], (owner, rows)),
+            shape=(len(starts), len(r)),
+        )
+
+        periods = pd.DataFrame(
+            {
+                'peak': index[np.maximum(starts - 1, 0)],
+                'trough': index[troughs - 1],
+                'recovery': [
+                    index[stop - 1] if stop < len(wealth) else pd.NaT for stop in stops
+                ],
+                'depth': drawdown[troughs],
+            }
+        )
+        return DrawdownAttribution(
+            periods,
+            pd.DataFrame(
+                held_product(pipeline, linking, columns) * w,
+                columns=[pipeline.asset_names[i] for i in columns],
+            ),
+        )
+
+    return pipeline.memoize(('drawdown_attribution', n_periods), weights, build)
@@ -0,0 +1,156 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.kernel import TRADING_DAYS, stats_arrays, years_between
+from src.data.pipeline import ReturnsPipeline
+
+# Rough number of (n_periods x chunk) float64 temporaries alive inside stats_arrays
+_WORKSPACE_ARRAYS = 8
+
+_worker_matrix: Optional[np.ndarray] = None
+
+
+@dataclass
+class BatchResult:
+    """Statistics (and optionally return paths) for k candidate portfolios."""
+
+    weights: np.ndarray
+    paths: Optional[pd.DataFrame]
+    stats: pd.DataFrame
+
+
+class BatchEvaluator:
+    """
+    Evaluate many weight vectors against one dataset in vectorized chunks.
+
+    Each chunk of candidates is a single (n_periods x n_assets) @
+    (n_assets x chunk) product followed by one stats kernel call. Chunks are
+    sized so the kernel's temporaries stay within ``max_bytes`` and can be
+    spread over a process pool with ``workers``.
+    """
+
+    def __init__(
+        self,
+        pipeline: ReturnsPipeline,
+        max_bytes: int = 256 * 1024 * 1024,
+        workers: Optional[int] = None,
+        periods: int = TRADING_DAYS,
+    ):
+        self.pipeline = pipeline
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.periods = periods
+
+    def chunk_size(self) -> int:
+        """Number of portfolios evaluated per chunk under the memory budget."""
+        per_portfolio = self.pipeline.matrix.shape[0] * 8 * _WORKSPACE_ARRAYS
+        return max(1, int(self.max_bytes // max(per_portfolio, 1)))
+
+    def validate_weights(self, weights: np.ndarray) -> np.ndarray:
+        """Check a (k x n_assets) weight matrix whose rows each sum to 1."""
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        n_assets = self.pipeline.matrix.shape[1]
+        if weights.ndim != 2 or weights.shape[1] != n_assets:
+            raise ValueError(f"Weight matrix must have {n_assets} columns")
+        bad_rows = np.flatnonzero(np.abs(weights.sum(axis=1) - 1.0) > 1e-6)
+        if len(bad_rows):
+            raise ValueError(
+                f"Weights must sum to 1 (rows {', '.join(map(str, bad_rows[:5]))})"
+            )
+        return weights
+
+    def evaluate(
+        self,
+        weights: np.ndarray,
+        keep_paths: bool = False,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> BatchResult:
+        """
+        Compute statistics for every row of ``weights``.
+
+        Args:
+            weights: (k x n_assets) matrix, one candidate allocation per row
+            keep_paths: Also return the (n_periods x k) return paths; without
+                it only one chunk of paths is alive at a time, so peak memory
+                stays within ``max_bytes``
+            progress: Called with the fraction done after every chunk; an
+                exception it raises (e.g. a job cancellation) stops the batch
+        """
+        weights = self.validate_weights(weights)
+        years = years_between(self.pipeline.index)
+        size = self.chunk_size()
+        chunks = [weights[i : i + size] for i in range(0, len(weights), size)]
+
+        results = []
+        if self.workers and len(chunks) > 1:
+            pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.pipeline.matrix,),
+            )
+            try:
+                for result in pool.map(
+                    _evaluate_chunk,
+                    chunks,
+                    [years] * len(chunks),
+                    [self.periods] * len(chunks),
+                    [None] * len(chunks),
+                    [keep_paths] * len(chunks),
+                ):
+                    results.append(result)
+                    if progress is not None:
+                        progress(len(results) / len(chunks))
+            finally:
+                pool.shutdown(cancel_futures=True)
+        else:
+            for chunk in chunks:
+                results.append(
+                    _evaluate_chunk(
+                        chunk, years, self.periods, self.pipeline.matrix, keep_paths
+                    )
+                )
+                if progress is not None:
+                    progress(len(results) / len(chunks))
+
+        paths = None
+        if keep_paths:
+            paths = pd.DataFrame(
+                np.concatenate([paths for paths, _ in results], axis=1),
+                index=self.pipeline.index,
+            )
+        stats = _concat_stats([values for _, values in results])
+        return BatchResult(weights=weights, paths=paths, stats=pd.DataFrame(stats))
+
+
+def random_weights(n_assets: int, k: int, seed: Optional[int] = 0) -> np.ndarray:
+    """Draw k long-only allocations uniformly from the simplex."""
+    rng = np.random.default_rng(seed)
+    return rng.dirichlet(np.ones(n_assets), size=k)
+
+
+def _init_worker(matrix: np.ndarray) -> None:
+    global _worker_matrix
+    _worker_matrix = matrix
+
+
+def _evaluate_chunk(
+    weights: np.ndarray,
+    years: float,
+    periods: int,
+    matrix: Optional[np.ndarray] = None,
+    keep_paths: bool = False,
+):
+    matrix = _worker_matrix if matrix is None else matrix
+    paths = matrix @ weights.T
+    return paths if keep_paths else None, stats_arrays(paths, years, periods)
+
+
+def _concat_stats(chunks: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    return {
+        name: np.concatenate([np.atleast_1d(chunk[name]) for chunk in chunks])
+        for name in chunks[0]
+    }
@@ -0,0 +1,317 @@
+from dataclasses import dataclass, replace
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.kernel import TRADING_DAYS
+from src.data.pipeline import GrowableArray, ReturnsPipeline
+
+METHODS = ('sample', 'ledoit_wolf')
+# Fewest overlapping rows for a full-history pair; rolling pairs need half the window
+MIN_OBSERVATIONS = 21
+
+# Returns over the full price history for some columns (all when None), NaN
+# where an asset has no price yet; see PortfolioDataLoader.return_history
+History = Callable[[Optional[Sequence[int]]], pd.DataFrame]
+
+
+class CoMoments:
+    """
+    Pairwise-complete co-moment sums over a set of rows, updated by blocks.
+
+    For assets i and j only the rows where both are finite count: ``n[i, j]``
+    of them, with sums ``s[i, j]`` and squares ``q[i, j]`` of asset i over
+    those rows and cross products ``p[i, j]``. Adding or removing a block
+    costs a few (rows x assets)' (rows x assets) products; blocks without
+    missing values need only one. Values are centred on ``shift`` (the
+    column means) so the sums stay well conditioned.
+    """
+
+    def __init__(self, shift: np.ndarray):
+        n_assets = len(shift)
+        self.shift = shift
+        self.n = np.zeros((n_assets, n_assets))
+        self.s = np.zeros((n_assets, n_assets))
+        self.q = np.zeros((n_assets, n_assets))
+        self.p = np.zeros((n_assets, n_assets))
+
+    def copy(self) -> 'CoMoments':
+        other = CoMoments(self.shift)
+        for name in ('n', 's', 'q', 'p'):
+            setattr(other, name, getattr(self, name).copy())
+        return other
+
+    def _update(self, block: np.ndarray, sign: float) -> None:
+        if not len(block):
+            return
+        x = block - self.shift
+        valid = np.isfinite(x)
+        if valid.all():
+            self.n += sign * len(x)
+            self.s += sign * x.sum(axis=0)[:, None]
+            self.q += sign * (x * x).sum(axis=0)[:, None]
+        else:
+            mask = valid.astype(np.float64)
+            x = np.where(valid, x, 0.0)
+            self.n += sign * (mask.T @ mask)
+            self.s += sign * (x.T @ mask)
+            self.q += sign * ((x * x).T @ mask)
+        self.p += sign * (x.T @ x)
+
+    def add(self, block: np.ndarray) -> None:
+        self._update(block, 1.0)
+
+    def remove(self, block: np.ndarray) -> None:
+        self._update(block, -1.0)
+
+    def covariance(self, min_periods: int = 2) -> np.ndarray:
+        """Sample covariance of every pair over its common rows.
+
+        NaN where a pair has fewer than ``min_periods`` common rows.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (self.p - self.s * self.s.T / self.n) / (self.n - 1)
+        cov[self.n < max(min_periods, 2)] = np.nan
+        return cov
+
+    def correlation(self, min_periods: int = 2) -> np.ndarray:
+        """
+        Pearson correlation of every pair over its common rows.
+
+        Means and variances are those of the common rows too, as in
+        ``DataFrame.corr``, so each entry is a proper correlation in [-1, 1].
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            centred = self.s * self.s.T / self.n
+            var = np.maximum(self.q - self.s * self.s / self.n, 0.0)
+            corr = np.clip((self.p - centred) / np.sqrt(var * var.T), -1.0, 1.0)
+        corr[self.n < max(min_periods, 2)] = np.nan
+        np.fill_diagonal(
+            corr, np.where(np.diag(self.n) >= max(min_periods, 2), 1.0, np.nan)
+        )
+        return corr
+
+
+class RollingCorrelation:
+    """
+    Co-moments of the trailing ``window`` rows of a return history (every
+    row when ``window`` is None), kept up to date as rows are appended.
+
+    Appending adds the new rows and removes the ones that left the window,
+    so the cost depends on the number of new rows, not on the history.
+    """
+
+    def __init__(self, returns: pd.DataFrame, window: Optional[int] = None):
+        values = np.ascontiguousarray(returns.to_numpy(dtype=np.float64))
+        self.assets = list(returns.columns)
+        self.window = window
+        self.min_periods = MIN_OBSERVATIONS if window is None else max(2, window // 2)
+        self._values = GrowableArray(values)
+        self._dates = GrowableArray(returns.index.values)
+        finite = np.isfinite(values)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shift = np.where(finite, values, 0.0).sum(axis=0) / finite.sum(axis=0)
+        self.moments = CoMoments(np.where(np.isfinite(shift), shift, 0.0))
+        self.moments.add(self.rows)
+
+    @property
+    def rows(self) -> np.ndarray:
+        """Rows currently in the window."""
+        values = self._values.values
+        return values if self.window is None else values[-self.window :]
+
+    @property
+    def end(self) -> pd.Timestamp:
+        """Date of the last row in the window."""
+        return pd.Timestamp(self._dates.values[-1])
+
+    def __len__(self) -> int:
+        return len(self._values.values)
+
+    def extend(self, rows: np.ndarray, dates: np.ndarray) -> 'RollingCorrelation':
+        """Slide the window over appended ``rows`` (dated ``dates``)."""
+        n_old = len(self)
+        values = self._values.append(rows)
+        self._dates.append(dates)
+        self.moments.add(rows)
+        if self.window is not None:
+            self.moments.remove(
+                values[max(n_old - self.window, 0) : max(len(values) - self.window, 0)]
+            )
+        return self
+
+
+@dataclass
+class CorrelationResult:
+    """Covariance and correlation matrices of a set of assets over one window."""
+
+    assets: List[str]
+    covariance: np.ndarray
+    correlation: np.ndarray
+    observations: np.ndarray
+    window: Optional[int]
+    method: str
+    end: Optional[pd.Timestamp] = None
+    shrinkage: Optional[float] = None
+
+    @property
+    def average(self) -> float:
+        """Mean pairwise correlation (off-diagonal, pairs with enough data)."""
+        upper = self.correlation[np.triu_indices(len(self.assets), k=1)]
+        upper = upper[np.isfinite(upper)]
+        return float(upper.mean()) if len(upper) else float('nan')
+
+    def to_frame(self, matrix: str = 'correlation') -> pd.DataFrame:
+        return pd.DataFrame(
+            getattr(self, matrix), index=self.assets, columns=self.assets
+        )
+
+    def clustered(self) -> 'CorrelationResult':
+        """The same result with assets ordered so correlated groups sit together."""
+        order = cluster_order(self.correlation)
+        take = np.ix_(order, order)
+        return replace(
+            self,
+            assets=[self.assets[i] for i in order],
+            covariance=self.covariance[take],
+            correlation=self.correlation[take],
+            observations=self.observations[take],
+        )
+
+
+def ledoit_wolf(values: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Ledoit-Wolf shrinkage of the covariance of complete rows ``values``.
+
+    The sample covariance is shrunk towards a scaled identity with the
+    intensity that minimises the expected Frobenius loss (Ledoit and Wolf,
+    2004). The fourth-moment term is a sum over rows of squared row norms,
+    so no (assets x assets) array is built per row.
+
+    Returns:
+        (shrunk covariance, shrinkage intensity in [0, 1])
+    """
+    n_rows, n_assets = values.shape
+    if n_rows < 2:
+        raise ValueError("Ledoit-Wolf shrinkage needs at least 2 complete rows")
+    x = values - values.mean(axis=0)
+    sample = x.T @ x / n_rows
+    mu = np.trace(sample) / n_assets
+    delta = ((sample - mu * np.eye(n_assets)) ** 2).sum() / n_assets
+    beta = ((x * x).sum(axis=1) ** 2).sum() / n_rows - (sample**2).sum()
+    beta = min(beta / (n_assets * n_rows), delta)
+    shrinkage = 0.0 if delta == 0 else float(beta / delta)
+    shrunk = (1.0 - shrinkage) * sample
+    shrunk[np.diag_indices(n_assets)] += shrinkage * mu
+    return shrunk, shrinkage
+
+
+def cluster_order(corr: np.ndarray) -> np.ndarray:
+    """Leaf order of an average-linkage clustering on 1 - correlation."""
+    # scipy is imported on first use to keep app startup light
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    if len(corr) < 3:
+        return np.arange(len(corr))
+    distance = 1.0 - np.where(np.isfinite(corr), corr, 0.0)
+    np.fill_diagonal(distance, 0.0)
+    distance = np.clip((distance + distance.T) / 2.0, 0.0, 2.0)
+    return leaves_list(linkage(squareform(distance, checks=False), 'average'))
+
+
+def correlation_state(
+    pipeline: ReturnsPipeline,
+    history: Optional[History] = None,
+    window: Optional[int] = None,
+    columns: Optional[Sequence[int]] = None,
+) -> RollingCorrelation:
+    """
+    Co-moments of ``columns`` (all assets when None) over the trailing
+    ``window`` rows, cached per (dataset, window, columns) and slid forward
+    when rows are appended.
+
+    ``history`` supplies returns with the partial rows the pipeline drops
+    (leading NaN before an asset's first price); without it only complete
+    rows are used.
+    """
+    key = None if columns is None else tuple(int(c) for c in columns)
+
+    def build():
+        if history is not None:
+            returns = history(key)
+        else:
+            returns = pd.DataFrame(
+                pipeline.matrix, index=pipeline.index, columns=pipeline.asset_names
+            )
+            if key is not None:
+                returns = returns.iloc[:, list(key)]
+        return RollingCorrelation(returns, window)
+
+    def extend(state, rows):
+        return state.extend(
+            rows if key is None else rows[:, list(key)],
+            pipeline.index.values[-len(rows) :],
+        )
+
+    return pipeline.cached(('correlation', window, key), build, extend)
+
+
+def correlation(
+    pipeline: ReturnsPipeline,
+    history: Optional[History] = None,
+    window: Optional[int] = None,
+    method: str = 'sample',
+    columns: Optional[Sequence[int]] = None,
+    periods: int = TRADING_DAYS,
+) -> CorrelationResult:
+    """
+    Covariance (annualised) and correlation of the assets over the last ``window`` rows.
+
+    Args:
+        pipeline: Dataset whose cache holds the co-moments
+        history: Source of partial rows for pairwise-complete estimates
+        window: Trailing rows to use; None for the whole history
+        method: 'sample' (pairwise-complete) or 'ledoit_wolf' (complete rows, shrunk)
+        columns: Asset positions to include; None for every asset
+        periods: Periods per year used to annualise the covariance
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown correlation method: {method}")
+    state = correlation_state(pipeline, history, window, columns)
+    if len(state) < 2:
+        raise ValueError("Not enough return rows for a correlation matrix")
+
+    if method == 'sample':
+        moments = state.moments
+        return CorrelationResult(
+            assets=state.assets,
+            covariance=moments.covariance(state.min_periods) * periods,
+            correlation=moments.correlation(state.min_periods),
+            observations=moments.n.copy(),
+            window=window,
+            method=method,
+            end=state.end,
+        )
+
+    def shrink():
+        rows = state.rows
+        complete = rows[np.isfinite(rows).all(axis=1)]
+        return ledoit_wolf(complete) + (len(complete),)
+
+    key = None if columns is None else tuple(int(c) for c in columns)
+    cov, shrinkage, n_rows = pipeline.cached(('ledoit_wolf', window, key), shrink)
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = np.clip(cov / np.outer(std, std), -1.0, 1.0)
+    return CorrelationResult(
+        assets=state.assets,
+        covariance=cov * periods,
+        correlation=corr,
+        observations=np.full(cov.shape, float(n_rows)),
+        window=window,
+        method=method,
+        end=state.end,
+        shrinkage=shrinkage,
+    )
@@ -0,0 +1,220 @@
+from dataclasses import dataclass, asdict, replace
+from statistics import NormalDist
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+@dataclass(frozen=True)
+class PortfolioStats:
+    """Portfolio-level statistics shared by the metric cards and risk chart."""
+
+    sharpe: float
+    sortino: float
+    cagr: float
+    max_drawdown: float
+    win_rate: float
+    var: float
+    cvar: float
+    volatility: float
+
+    @property
+    def risk_metrics(self) -> Dict[str, float]:
+        """Values plotted by PortfolioCharts.create_risk_metrics_chart."""
+        return {
+            'Monthly VaR': self.var,
+            'Monthly CVaR': self.cvar,
+            'Max Drawdown': self.max_drawdown,
+        }
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+def years_between(index: pd.Index) -> float:
+    """Calendar years spanned by a date index, as used for CAGR."""
+    if len(index) < 2:
+        return float('nan')
+    return (index[-1] - index[0]).days / 365.0
+
+
+def stats_arrays(
+    returns: np.ndarray,
+    years: float,
+    periods: int = TRADING_DAYS,
+    confidence: float = 0.95,
+) -> Dict[str, np.ndarray]:
+    """
+    Compute every portfolio statistic column-wise in two passes.
+
+    Definitions follow quantstats (rf=0, non-smart ratios, parametric VaR) so
+    results are interchangeable with ``quantstats.stats``.
+
+    Args:
+        returns: (n_periods,) or (n_periods, n_portfolios) array of returns
+        years: Calendar years covered, for CAGR
+        periods: Periods per year used to annualise
+        confidence: VaR/CVaR confidence level
+    """
+    r = np.array(returns, dtype=np.float64, copy=True)
+    r[~np.isfinite(r)] = 0.0
+    n = r.shape[0]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Pass 1: moments, downside deviation and win counts
+        mean = r.mean(axis=0)
+        std = r.std(axis=0, ddof=1)
+        downside = np.sqrt(np.square(np.minimum(r, 0.0)).sum(axis=0) / n)
+        wins = (r > 0).sum(axis=0)
+        nonzero = (r != 0).sum(axis=0)
+
+        # Pass 2: compounded wealth, running peak and drawdown
+        wealth = np.cumprod(1.0 + r, axis=0)
+        drawdown = wealth / np.maximum.accumulate(wealth, axis=0) - 1.0
+
+        var = mean + std * NormalDist().inv_cdf(1 - confidence)
+        tail = r < var
+        tail_count = tail.sum(axis=0)
+        cvar = np.where(
+            tail_count > 0, np.where(tail, r, 0.0).sum(axis=0) / tail_count, var
+        )
+
+        return {
+            'sharpe': mean / std * np.sqrt(periods),
+            'sortino': mean / downside * np.sqrt(periods),
+            'cagr': np.abs(wealth[-1]) ** (1.0 / years) - 1,
+            'max_drawdown': drawdown.min(axis=0),
+            'win_rate': np.where(nonzero > 0, wins / np.maximum(nonzero, 1), 0.0),
+            'var': var,
+            'cvar': cvar,
+            'volatility': std * np.sqrt(periods),
+        }
+
+
+def compute_portfolio_stats(
+    port_ret: Union[pd.Series, np.ndarray],
+    years: Optional[float] = None,
+    periods: int = TRADING_DAYS,
+) -> PortfolioStats:
+    """
+    Compute PortfolioStats for a single return series.
+
+    Args:
+        port_ret: Portfolio return series (DatetimeIndex needed unless ``years`` given)
+        years: Calendar years covered; derived from the index when omitted
+        periods: Periods per year used to annualise
+    """
+    if years is None:
+        years = years_between(port_ret.index)
+    values = stats_arrays(np.asarray(port_ret, dtype=np.float64), years, periods)
+    return PortfolioStats(**{name: float(value) for name, value in values.items()})
+
+
+@dataclass(frozen=True)
+class RunningStats:
+    """
+    Sufficient statistics of a return series that can be extended by new rows.
+
+    Moments are merged with Chan's parallel update of (count, mean, M2);
+    wealth, peak and max drawdown continue from their last values. CVaR is
+    the only statistic whose tail depends on the whole history: the sorted
+    returns are kept so the tail below VaR is one contiguous slice.
+    """
+
+    count: int
+    mean: float
+    m2: float
+    downside_sq: float
+    wins: int
+    nonzero: int
+    wealth: float
+    peak: float
+    max_drawdown: float
+    sorted_returns: np.ndarray
+    start: Optional[pd.Timestamp]
+    end: Optional[pd.Timestamp]
+
+    @classmethod
+    def from_returns(cls, port_ret: pd.Series) -> 'RunningStats':
+        r = _finite(port_ret)
+        wealth = np.cumprod(1.0 + r)
+        peak = np.maximum.accumulate(wealth)
+        return cls(
+            count=len(r),
+            mean=float(r.mean()) if len(r) else 0.0,
+            m2=float(np.square(r - r.mean()).sum()) if len(r) else 0.0,
+            downside_sq=float(np.square(np.minimum(r, 0.0)).sum()),
+            wins=int((r > 0).sum()),
+            nonzero=int((r != 0).sum()),
+            wealth=float(wealth[-1]) if len(r) else 1.0,
+            peak=float(peak[-1]) if len(r) else 1.0,
+            max_drawdown=float((wealth / peak - 1.0).min()) if len(r) else 0.0,
+            sorted_returns=np.sort(r),
+            start=port_ret.index[0] if len(r) else None,
+            end=port_ret.index[-1] if len(r) else None,
+        )
+
+    def update(self, new_ret: pd.Series) -> 'RunningStats':
+        """Statistics of the series extended by ``new_ret``, in O(len(new_ret))."""
+        if not len(new_ret):
+            return self
+        if not self.count:
+            return RunningStats.from_returns(new_ret)
+        r = _finite(new_ret)
+        n, mean = len(r), float(r.mean())
+        total = self.count + n
+        delta = mean - self.mean
+        wealth = self.wealth * np.cumprod(1.0 + r)
+        peak = np.maximum(self.peak, np.maximum.accumulate(wealth))
+        return replace(
+            self,
+            count=total,
+            mean=self.mean + delta * n / total,
+            m2=self.m2
+            + float(np.square(r - mean).sum())
+            + delta**2 * self.count * n / total,
+            downside_sq=self.downside_sq + float(np.square(np.minimum(r, 0.0)).sum()),
+            wins=self.wins + int((r > 0).sum()),
+            nonzero=self.nonzero + int((r != 0).sum()),
+            wealth=float(wealth[-1]),
+            peak=float(peak[-1]),
+            max_drawdown=min(self.max_drawdown, float((wealth / peak - 1.0).min())),
+            sorted_returns=np.insert(
+                self.sorted_returns,
+                np.searchsorted(self.sorted_returns, np.sort(r)),
+                np.sort(r),
+            ),
+            end=new_ret.index[-1],
+        )
+
+    def result(
+        self, periods: int = TRADING_DAYS, confidence: float = 0.95
+    ) -> PortfolioStats:
+        """PortfolioStats identical (up to rounding) to compute_portfolio_stats."""
+        years = (self.end - self.start).days / 365.0 if self.count > 1 else float('nan')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(np.float64(self.m2) / (self.count - 1))
+            downside = np.sqrt(np.float64(self.downside_sq) / self.count)
+            var = self.mean + std * NormalDist().inv_cdf(1 - confidence)
+            tail = self.sorted_returns[
+                : np.searchsorted(self.sorted_returns, var, side='left')
+            ]
+            return PortfolioStats(
+                sharpe=float(self.mean / std * np.sqrt(periods)),
+                sortino=float(self.mean / downside * np.sqrt(periods)),
+                cagr=float(np.abs(np.float64(self.wealth)) ** (1.0 / years) - 1),
+                max_drawdown=self.max_drawdown,
+                win_rate=self.wins / self.nonzero if self.nonzero else 0.0,
+                var=float(var),
+                cvar=float(tail.mean()) if len(tail) else float(var),
+                volatility=float(std * np.sqrt(periods)),
+            )
+
+
+def _finite(port_ret: Union[pd.Series, np.ndarray]) -> np.ndarray:
+    r = np.array(port_ret, dtype=np.float64, copy=True)
+    r[~np.isfinite(r)] = 0.0
+    return r
@@ -0,0 +1,413 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.analytics.kernel import TRADING_DAYS
+from src.data.pipeline import ReturnsPipeline
+
+Bounds = Union[Tuple[float, float], Sequence[Tuple[float, float]]]
+
+
+@dataclass
+class OptimizationResult:
+    """Optimal weights with their annualized expected return and risk."""
+
+    weights: np.ndarray
+    expected_return: float
+    volatility: float
+    sharpe: float
+
+
+class QuadraticSolver:
+    """
+    Primal active-set solver for
+    ``min 0.5 x'Px + q'x  s.t.  Ex = e, lower <= x <= upper``.
+
+    Every iteration solves the equality-constrained problem over the free
+    variables exactly, then either steps to the first bound in the way
+    (adding it to the working set) or, at a stationary point, releases the
+    bound with the most wrong-signed multiplier. Solutions are exact rather
+    than to a tolerance, and a feasible start with the working set of a
+    nearby solution (e.g. the previous point along a frontier) usually
+    takes only a few iterations.
+    """
+
+    def __init__(
+        self,
+        P: np.ndarray,
+        E: np.ndarray,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        ridge: float = 1e-10,
+    ):
+        diag = np.diag(P)
+        self.scale = float(diag[diag > 0].mean()) if (diag > 0).any() else 1.0
+        # A tiny ridge keeps singular covariances (fewer rows than assets) factorizable
+        self.P = P / self.scale + ridge * np.eye(len(P))
+        self.E = np.atleast_2d(E)
+        self.lower = lower
+        self.upper = upper
+
+    def solve(
+        self,
+        q: np.ndarray,
+        x0: np.ndarray,
+        working: Optional[np.ndarray] = None,
+        max_iter: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Solve from a feasible ``x0`` (``E @ x0 == e`` and within the bounds).
+
+        ``working`` marks variables held at their lower (-1) or upper (+1)
+        bound, 0 for free; by default every variable ``x0`` has at a bound.
+        Returns the solution and its working set, to warm-start the next solve.
+
+        Raises:
+            ValueError: if the iteration limit is reached
+        """
+        from scipy.linalg import LinAlgError, cho_factor, cho_solve
+
+        n = len(x0)
+        q = q / self.scale
+        x = np.clip(x0, self.lower, self.upper)
+        if working is None:
+            working = np.where(x <= self.lower, -1, np.where(x >= self.upper, 1, 0))
+        working = working.astype(np.int8)
+        max_iter = 10 * n + 1000 if max_iter is None else max_iter
+
+        for _ in range(max_iter):
+            free = np.flatnonzero(working == 0)
+            g = self.P @ x + q
+            E_free = self.E[:, free]
+            if len(free):
+                try:
+                    factor = cho_factor(self.P[np.ix_(free, free)])
+                except LinAlgError:
+                    raise ValueError("Covariance matrix is not positive semi-definite")
+                step = cho_solve(factor, -g[free])
+                spread = cho_solve(factor, E_free.T)
+                nu = np.linalg.pinv(E_free @ spread) @ (E_free @ step)
+                step -= spread @ nu
+            else:
+                step, nu = np.zeros(0), np.zeros(len(self.E))
+
+            if np.abs(step).max(initial=0.0) <= 1e-12 * max(np.abs(x).max(), 1.0):
+                # Stationary on the working set: check the bound multipliers
+                if not len(free):
+                    nu = np.linalg.lstsq(self.E.T, -g, rcond=None)[0]
+                reduced = g + self.E.T @ nu
+                tol = 1e-9 * max(np.abs(g).max(), np.abs(self.E.T @ nu).max(), 1e-12)
+                wrong = np.where(
+                    working == -1, -reduced, np.where(working == 1, reduced, 0.0)
+                )
+                worst = int(np.argmax(wrong))
+                if wrong[worst] <= tol:
+                    return x, working
+                working[worst] = 0
+                continue
+
+            # Longest step along the direction that keeps every bound
+            x_free = x[free]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                limits = np.where(
+                    step < 0,
+                    (self.lower[free] - x_free) / step,
+                    np.where(step > 0, (self.upper[free] - x_free) / step, np.inf),
+                )
+            blocking = int(np.argmin(limits))
+            alpha = max(float(limits[blocking]), 0.0)
+            if alpha >= 1.0:
+                x[free] = x_free + step
+            else:
+                x[free] = x_free + alpha * step
+                index = free[blocking]
+                working[index] = -1 if step[blocking] < 0 else 1
+                x[index] = (
+                    self.lower[index] if step[blocking] < 0 else self.upper[index]
+                )
+        raise ValueError("Optimization did not converge")
+
+
+def estimate_moments(
+    pipeline: ReturnsPipeline, periods: int = TRADING_DAYS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Annualized mean returns and covariance matrix, cached per dataset."""
+
+    def estimate():
+        matrix = pipeline.matrix
+        n_assets = matrix.shape[1]
+        return (
+            matrix.mean(axis=0) * periods,
+            np.cov(matrix, rowvar=False).reshape(n_assets, n_assets) * periods,
+        )
+
+    return pipeline.cached(('moments', periods), estimate)
+
+
+class PortfolioOptimizer:
+    """
+    Mean-variance and risk-parity allocation over a dataset's return matrix.
+
+    Annualized mean returns and the covariance matrix are cached on the
+    pipeline, so every optimizer built for the same dataset shares them.
+    Mean-variance objectives are quadratic programs solved exactly by
+    QuadraticSolver under a fully-invested constraint and per-asset
+    ``bounds`` (long-only by default); risk parity uses SLSQP with analytic
+    gradients.
+    """
+
+    def __init__(
+        self,
+        pipeline: ReturnsPipeline,
+        bounds: Bounds = (0.0, 1.0),
+        periods: int = TRADING_DAYS,
+    ):
+        self.pipeline = pipeline
+        self.periods = periods
+        self.n_assets = pipeline.matrix.shape[1]
+        self.bounds = self._expand_bounds(bounds)
+        self.mu, self.cov = estimate_moments(pipeline, periods)
+        self._frontier_solvers: Dict[bool, QuadraticSolver] = {}
+
+    def _expand_bounds(self, bounds: Bounds) -> List[Tuple[float, float]]:
+        if len(bounds) == 2 and np.isscalar(bounds[0]):
+            bounds = [tuple(bounds)] * self.n_assets
+        if len(bounds) != self.n_assets:
+            raise ValueError(f"Expected bounds for {self.n_assets} assets")
+        lower, upper = np.array(bounds, dtype=np.float64).T
+        if lower.sum() > 1 + 1e-9 or upper.sum() < 1 - 1e-9:
+            raise ValueError("Bounds make a fully-invested portfolio infeasible")
+        return [tuple(b) for b in bounds]
+
+    def _result(self, weights: np.ndarray) -> OptimizationResult:
+        weights = np.clip(weights, *np.array(self.bounds).T)
+        weights = weights / weights.sum()
+        expected = float(self.mu @ weights)
+        volatility = float(np.sqrt(max(weights @ self.cov @ weights, 0.0)))
+        return OptimizationResult(
+            weights=weights,
+            expected_return=expected,
+            volatility=volatility,
+            sharpe=expected / volatility if volatility > 0 else float('nan'),
+        )
+
+    def _frontier_problem(self, target: bool) -> QuadraticSolver:
+        """Min-variance QP under the budget row, plus the return row for a target."""
+        solver = self._frontier_solvers.get(target)
+        if solver is None:
+            lower, upper = np.array(self.bounds, dtype=np.float64).T
+            E = (
+                np.vstack([np.ones(self.n_assets), self.mu])
+                if target
+                else np.ones((1, self.n_assets))
+            )
+            solver = self._frontier_solvers[target] = QuadraticSolver(
+                self.cov, E, lower, upper
+            )
+        return solver
+
+    def _feasible_start(self, target: Optional[float], warm_start=None) -> np.ndarray:
+        """
+        A fully-invested point within the bounds and with the ``target`` return:
+        the warm start (or an interior point) moved in a straight line towards
+        the highest or lowest return allocation.
+
+        Raises:
+            ValueError: if no portfolio has the target return
+        """
+        lower, upper = np.array(self.bounds, dtype=np.float64).T
+        if warm_start is not None:
+            weights = np.array(warm_start[0], dtype=np.float64)
+        else:
+            budget = 1.0 - lower.sum()
+            span = np.minimum(upper - lower, budget)
+            weights = lower + (budget * span / span.sum() if span.sum() > 0 else 0.0)
+        if target is None:
+            return weights
+
+        current = float(self.mu @ weights)
+        anchor = (
+            self.max_return_weights()
+            if target >= current
+            else self.max_return_weights(lowest=True)
+        )
+        reach = float(self.mu @ anchor)
+        if abs(target - current) > abs(reach - current) + 1e-9 * max(abs(reach), 1.0):
+            low = float(self.mu @ self.max_return_weights(lowest=True))
+            high = float(self.mu @ self.max_return_weights())
+            raise ValueError(
+                f"Target return {target:.2%} is outside the attainable range "
+                f"{low:.2%} to {high:.2%}"
+            )
+        theta = (
+            min((target - current) / (reach - current), 1.0)
+            if reach != current
+            else 0.0
+        )
+        return weights + theta * (anchor - weights)
+
+    def _frontier_solve(
+        self, target: Optional[float], warm_start=None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(weights, working set) of a min-variance solve, optionally warm-started."""
+        solver = self._frontier_problem(target is not None)
+        x0 = self._feasible_start(target, warm_start)
+        working = None
+        if warm_start is not None:
+            # Keep the bounds of the previous solution that the start still sits on
+            previous = warm_start[1]
+            working = np.where(
+                ((previous == -1) & (x0 <= solver.lower))
+                | ((previous == 1) & (x0 >= solver.upper)),
+                previous,
+                0,
+            )
+        return solver.solve(np.zeros(self.n_assets), x0, working)
+
+    def min_variance(self) -> OptimizationResult:
+        """Global minimum-variance portfolio."""
+        weights, _ = self._frontier_solve(None)
+        return self._result(weights)
+
+    def target_return(self, target: float, warm_start=None) -> OptimizationResult:
+        """Minimum-variance portfolio with the given annualized expected return."""
+        weights, _ = self._frontier_solve(target, warm_start)
+        return self._result(weights)
+
+    def max_sharpe(
+        self, risk_free: float = 0.0, tol: float = 1e-9
+    ) -> OptimizationResult:
+        """
+        Tangency portfolio maximising (return - risk_free) / volatility.
+
+        The Sharpe ratio is unimodal along the efficient frontier, so the
+        tangency point is found by a golden-section search over the target
+        return, each solve warm-started from the previous one.
+        """
+        excess = self.mu - risk_free
+        if excess @ self.max_return_weights() <= 0:
+            raise ValueError("No portfolio has a positive excess return")
+
+        solution = self._frontier_solve(None)
+        low, high = float(self.mu @ solution[0]), float(
+            self.mu @ self.max_return_weights()
+        )
+        solutions = {}
+
+        def sharpe(target):
+            nonlocal solution
+            solution = self._frontier_solve(target, solution)
+            solutions[target] = solution[0]
+            variance = max(solution[0] @ self.cov @ solution[0], 1e-300)
+            return (target - risk_free) / np.sqrt(variance)
+
+        ratio = (np.sqrt(5.0) - 1.0) / 2.0
+        a, b = low, high
+        c, d = b - ratio * (b - a), a + ratio * (b - a)
+        fc, fd = sharpe(c), sharpe(d)
+        while b - a > tol * max(abs(high - low), 1e-12):
+            if fc >= fd:
+                b, d, fd = d, c, fc
+                c = b - ratio * (b - a)
+                fc = sharpe(c)
+            else:
+                a, c, fc = c, d, fd
+                d = a + ratio * (b - a)
+                fd = sharpe(d)
+        return self._result(solutions[c] if fc >= fd else solutions[d])
+
+    def risk_parity(self, x0: Optional[np.ndarray] = None) -> OptimizationResult:
+        """Portfolio whose assets contribute equally to total variance."""
+        from scipy.optimize import minimize
+
+        if x0 is None:
+            inv_vol = 1.0 / np.sqrt(np.maximum(np.diag(self.cov), 1e-18))
+            x0 = inv_vol / inv_vol.sum()
+
+        def dispersion(w):
+            cov_w = self.cov @ w
+            contrib = w * cov_w
+            diff = contrib - contrib.mean()
+            # d contrib_i / d w_j = delta_ij * cov_w_i + w_i * cov_ij
+            jac_contrib = np.diag(cov_w) + w[:, None] * self.cov
+            return float(diff @ diff) * 1e4, 2e4 * (jac_contrib.T @ diff)
+
+        res = minimize(
+            dispersion,
+            x0,
+            jac=True,
+            method='SLSQP',
+            bounds=self.bounds,
+            constraints=[
+                {
+                    'type': 'eq',
+                    'fun': lambda w: w.sum() - 1.0,
+                    'jac': lambda w: np.ones_like(w),
+                }
+            ],
+            options={'maxiter': 500, 'ftol': 1e-12},
+        )
+        if not res.success and res.status != 9:
+            raise ValueError(f"Optimization failed: {res.message}")
+        return self._result(res.x)
+
+    def max_return_weights(self, lowest: bool = False) -> np.ndarray:
+        """Highest (or ``lowest``) expected-return allocation under the bounds.
+
+        The bounds are filled greedily in order of expected return.
+        """
+        lower, upper = np.array(self.bounds, dtype=np.float64).T
+        weights = lower.copy()
+        remaining = 1.0 - weights.sum()
+        for i in np.argsort(self.mu if lowest else -self.mu):
+            add = min(upper[i] - weights[i], remaining)
+            weights[i] += add
+            remaining -= add
+            if remaining <= 0:
+                break
+        return weights
+
+    def efficient_frontier(
+        self,
+        n_points: int = 50,
+        progress: Optional[Callable[[float], None]] = None,
+    ) -> List[OptimizationResult]:
+        """
+        Solve the efficient frontier from the minimum-variance portfolio up to
+        the highest attainable return. Each point is warm-started from the
+        previous solution and its working set; ``progress`` is called with
+        the fraction solved after every point.
+        """
+        solution = self._frontier_solve(None)
+        start = self._result(solution[0])
+        top = self.max_return_weights()
+        targets = np.linspace(start.expected_return, float(self.mu @ top), n_points)
+
+        frontier = [start]
+        for target in targets[1:-1]:
+            solution = self._frontier_solve(target, warm_start=solution)
+            frontier.append(self._result(solution[0]))
+            if progress is not None:
+                progress(len(frontier) / n_points)
+        frontier.append(self._result(top))
+        return frontier
+
+    def optimize(
+        self, objective: str, target: Optional[float] = None
+    ) -> OptimizationResult:
+        """Dispatch by objective name.
+
+        One of max_sharpe, min_variance, risk_parity or target_return.
+        """
+        if objective == 'max_sharpe':
+            return self.max_sharpe()
+        if objective == 'min_variance':
+            return self.min_variance()
+        if objective == 'risk_parity':
+            return self.risk_parity()
+        if objective == 'target_return':
+            if target is None:
+                raise ValueError("A target return is required")
+            return self.target_return(target)
+        raise ValueError(f"Unknown objective: {objective}")
@@ -0,0 +1,167 @@
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.kernel import stats_arrays, years_between
+from src.data.pipeline import ReturnsPipeline
+
+# Pandas period alias and periods per year for each resampling frequency,
+# from finest to coarsest
+FREQUENCIES = {'W': 'W-FRI', 'M': 'M', 'Q': 'Q', 'Y': 'Y'}
+PERIODS_PER_YEAR = {'D': 252, 'W': 52, 'M': 12, 'Q': 4, 'Y': 1}
+
+# Rows of period_stats, with the stats_arrays column they come from
+_STATS_ROWS = {
+    'CAGR': 'cagr',
+    'Volatility': 'volatility',
+    'Sharpe': 'sharpe',
+    'Sortino': 'sortino',
+    'Max Drawdown': 'max_drawdown',
+    'Win Rate': 'win_rate',
+    'VaR': 'var',
+    'CVaR': 'cvar',
+}
+
+
+@dataclass(frozen=True)
+class PeriodGrid:
+    """
+    Row positions of the calendar periods in a daily index.
+
+    ``starts[i]`` is the first row of period i, so any daily array can be
+    compounded per period with one ``reduceat`` and sampled at period ends
+    with ``ends``. The first and last periods may be partial.
+    """
+
+    freq: str
+    starts: np.ndarray
+    n_rows: int
+    labels: pd.DatetimeIndex
+
+    @property
+    def ends(self) -> np.ndarray:
+        """Last row of each period."""
+        return np.append(self.starts[1:], self.n_rows) - 1
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+def build_grid(index: pd.DatetimeIndex, freq: str, offset: int = 0) -> PeriodGrid:
+    """PeriodGrid of ``index``; row positions are shifted by ``offset``."""
+    codes = index.to_period(FREQUENCIES[freq]).asi8
+    starts = np.flatnonzero(np.diff(codes, prepend=codes[:1] - 1))
+    ends = np.append(starts[1:], len(index)) - 1
+    return PeriodGrid(freq, starts + offset, len(index) + offset, index[ends])
+
+
+def extend_grid(grid: PeriodGrid, index: pd.DatetimeIndex) -> PeriodGrid:
+    """Grid of a longer ``index``, re-reading only the rows from the last period on."""
+    if not len(grid):
+        return build_grid(index, grid.freq)
+    last = int(grid.starts[-1])
+    tail = build_grid(index[last:], grid.freq, offset=last)
+    return PeriodGrid(
+        grid.freq,
+        np.concatenate([grid.starts[:-1], tail.starts]),
+        len(index),
+        grid.labels[:-1].append(tail.labels),
+    )
+
+
+def compound(values: np.ndarray, grid: PeriodGrid) -> np.ndarray:
+    """Compound daily returns (rows of ``values``) into one return per period."""
+    if not len(grid):
+        return np.empty((0,) + values.shape[1:])
+    return np.multiply.reduceat(1.0 + values, grid.starts, axis=0) - 1.0
+
+
+def period_grid(pipeline: ReturnsPipeline, freq: str) -> PeriodGrid:
+    """Period positions for ``freq``, cached per dataset and extended on append."""
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency: {freq}")
+    return pipeline.cached(
+        ('period_grid', freq),
+        lambda: build_grid(pipeline.index, freq),
+        lambda grid, rows: extend_grid(grid, pipeline.index),
+    )
+
+
+def period_grids(pipeline: ReturnsPipeline) -> List[PeriodGrid]:
+    """Every resampling grid of a dataset, finest first."""
+    return [period_grid(pipeline, freq) for freq in FREQUENCIES]
+
+
+def asset_period_returns(pipeline: ReturnsPipeline, freq: str) -> pd.DataFrame:
+    """
+    Compounded asset returns per period, cached per dataset.
+
+    Appended rows only recompute the last (possibly partial) period onwards.
+    """
+
+    def build():
+        grid = period_grid(pipeline, freq)
+        return pd.DataFrame(
+            compound(pipeline.matrix, grid),
+            index=grid.labels,
+            columns=pipeline.asset_names,
+        )
+
+    def extend(table, rows):
+        # Located from the table itself: the cached grid may not be extended yet
+        kept = len(table) - 1
+        period = table.index[-1].to_period(FREQUENCIES[freq])
+        start = int(pipeline.index.searchsorted(period.start_time))
+        tail = build_grid(pipeline.index[start:], freq)
+        return pd.concat(
+            [
+                table.iloc[:kept],
+                pd.DataFrame(
+                    compound(pipeline.matrix[start:], tail),
+                    index=tail.labels,
+                    columns=pipeline.asset_names,
+                ),
+            ]
+        )
+
+    return pipeline.cached(('period_returns', freq), build, extend)
+
+
+def portfolio_period_returns(
+    pipeline: ReturnsPipeline, weights: Sequence[float], freq: str
+) -> pd.Series:
+    """Compounded portfolio return per period (rebalanced daily, as the daily one)."""
+
+    def build(port_ret):
+        grid = period_grid(pipeline, freq)
+        return pd.Series(
+            compound(port_ret.to_numpy(), grid), index=grid.labels, name='Portfolio'
+        )
+
+    return pipeline.memoize(('period_returns', freq), weights, build)
+
+
+def period_stats(
+    returns: pd.DataFrame, freq: str, years: Optional[float] = None
+) -> pd.DataFrame:
+    """
+    Statistics of each column of a period return table, annualised for ``freq``.
+
+    Args:
+        returns: One column of period returns per portfolio or asset
+        freq: Frequency of the rows, one of FREQUENCIES (or 'D')
+        years: Calendar years covered; derived from the index when omitted
+    """
+    if years is None:
+        years = years_between(returns.index)
+    values = stats_arrays(
+        returns.to_numpy(dtype=np.float64), years, PERIODS_PER_YEAR[freq]
+    )
+    table = pd.DataFrame(
+        {row: values[name] for row, name in _STATS_ROWS.items()}, index=returns.columns
+    ).T
+    table.loc['Best'] = returns.max()
+    table.loc['Worst'] = returns.min()
+    return table
@@ -0,0 +1,144 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.kernel import TRADING_DAYS
+
+
+def window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing sums over ``window`` rows from one cumulative sum (NaN until full)."""
+    out = np.full(len(values), np.nan)
+    if window <= len(values):
+        csum = np.concatenate([[0.0], np.cumsum(values)])
+        out[window - 1 :] = csum[window:] - csum[:-window]
+    return out
+
+
+def rolling_max_drawdown(wealth: np.ndarray, window: int) -> np.ndarray:
+    """
+    Max drawdown inside each trailing ``window`` of wealth points (NaN until full).
+
+    Each window is measured from its own running peak, as the stats kernel
+    does for the whole series. The series is cut into blocks of ``window``
+    points, so every window is the end of one block followed by the start
+    of the next: its deepest fall is the worst of the one inside the first
+    part, the one inside the second part, and the lowest point of the
+    second part against the highest of the first. Running extremes from
+    each block start and to each block end give all three for every window
+    in O(n) time and memory.
+    """
+    n = len(wealth)
+    out = np.full(n, np.nan)
+    if window > n:
+        return out
+    n_blocks = -(-n // window)
+    blocks = np.empty(n_blocks * window)
+    blocks[:n] = wealth
+    blocks[n:] = wealth[-1]
+    blocks = blocks.reshape(n_blocks, window)
+
+    # From each block start: the deepest drawdown so far and the lowest point
+    head_drawdown = np.minimum.accumulate(
+        blocks / np.maximum.accumulate(blocks, axis=1), axis=1
+    ).ravel()
+    head_low = np.minimum.accumulate(blocks, axis=1).ravel()
+    # To each block end: the highest point and the deepest drawdown
+    reverse = blocks[:, ::-1]
+    tail_high = np.maximum.accumulate(reverse, axis=1)[:, ::-1].ravel()
+    tail_low = np.minimum.accumulate(reverse, axis=1)[:, ::-1]
+    tail_drawdown = np.minimum.accumulate((tail_low / blocks)[:, ::-1], axis=1)
+    tail_drawdown = tail_drawdown[:, ::-1].ravel()
+
+    start = np.arange(n - window + 1)
+    end = start + window - 1
+    straddling = np.minimum(
+        np.minimum(tail_drawdown[start], head_low[end] / tail_high[start]),
+        head_drawdown[end],
+    )
+    # A window starting on a block boundary is that whole block
+    out[window - 1 :] = (
+        np.where(start % window == 0, head_drawdown[end], straddling) - 1.0
+    )
+    return out
+
+
+def rolling_stats(
+    port_ret: pd.Series,
+    window: int,
+    benchmark: Optional[pd.Series] = None,
+    periods: int = TRADING_DAYS,
+) -> pd.DataFrame:
+    """
+    Rolling Sharpe, Sortino, volatility, beta and max drawdown in one pass.
+
+    Moments come from cumulative sums of mean-centred values, which keeps
+    the variance numerically stable, so every window costs O(1). Ratios
+    follow the same definitions as the stats kernel (rf=0).
+
+    Args:
+        port_ret: Portfolio return series
+        window: Window length in periods
+        benchmark: Optional return series (same index) to compute beta against
+        periods: Periods per year used to annualise
+
+    Returns:
+        Frame indexed like ``port_ret``; rows before the first full window are NaN.
+        'Max Drawdown' is the deepest fall from a peak to a later trough
+        within the window.
+    """
+    x = port_ret.to_numpy(dtype=np.float64)
+    n = float(window)
+    centred = x - x.mean()
+    sum_x = window_sums(centred, window)
+    mean = sum_x / n + x.mean()
+    var = np.maximum(
+        (window_sums(centred**2, window) - sum_x**2 / n) / (n - 1), 0.0
+    )
+    std = np.sqrt(var)
+    downside = np.sqrt(window_sums(np.minimum(x, 0.0) ** 2, window) / n)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stats = {
+            'Sharpe': mean / std * np.sqrt(periods),
+            'Sortino': mean / downside * np.sqrt(periods),
+            'Volatility': std * np.sqrt(periods),
+        }
+        if benchmark is not None:
+            b = benchmark.to_numpy(dtype=np.float64)
+            b_centred = b - b.mean()
+            sum_b = window_sums(b_centred, window)
+            cov = window_sums(centred * b_centred, window) - sum_x * sum_b / n
+            var_b = window_sums(b_centred**2, window) - sum_b**2 / n
+            stats['Beta'] = cov / var_b
+
+        stats['Max Drawdown'] = rolling_max_drawdown(np.cumprod(1.0 + x), window)
+
+    return pd.DataFrame(stats, index=port_ret.index)
+
+
+def extend_rolling(
+    stats: pd.DataFrame,
+    port_ret: pd.Series,
+    window: int,
+    benchmark: Optional[pd.Series] = None,
+    periods: int = TRADING_DAYS,
+) -> pd.DataFrame:
+    """
+    Extend a rolling_stats frame to the end of a longer ``port_ret``.
+
+    Only the ``window - 1`` rows before the new ones are revisited (the rest
+    of the first new window), so the cost depends on the window and the new
+    rows, not the history.
+    """
+    n_new = len(port_ret) - len(stats)
+    if n_new <= 0:
+        return stats
+    start = max(len(port_ret) - n_new - (window - 1), 0)
+    tail = rolling_stats(
+        port_ret.iloc[start:],
+        window,
+        None if benchmark is None else benchmark.iloc[start:],
+        periods,
+    )
+    return pd.concat([stats, tail.iloc[-n_new:]])
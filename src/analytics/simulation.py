@@ -0,0 +1,242 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.kernel import TRADING_DAYS
+from src.data.pipeline import ReturnsPipeline, Weights
+
+METHODS = ('bootstrap', 'normal', 't')
+FAN_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# Paths drawn from one RNG stream; chunks are whole blocks, so results do
+# not depend on the memory budget or the number of workers
+_SEED_BLOCK = 256
+# Rough number of (chunk x horizon) float64 arrays alive per chunk
+_WORKSPACE_ARRAYS = 1.5
+# Wealth is kept for the fan chart at no more than this many steps
+_FAN_STEPS = 120
+
+_worker_returns: Optional[np.ndarray] = None
+
+
+@dataclass
+class SimulationResult:
+    """Summary of simulated forward wealth paths for one portfolio."""
+
+    method: str
+    horizon: int
+    periods: int
+    confidence: float
+    fan: pd.DataFrame
+    terminal_wealth: np.ndarray
+    max_drawdown: np.ndarray
+
+    @property
+    def terminal_returns(self) -> np.ndarray:
+        return self.terminal_wealth - 1.0
+
+    @property
+    def var(self) -> float:
+        """Horizon return not undercut with ``confidence`` (negative for a loss)."""
+        return float(np.quantile(self.terminal_returns, 1 - self.confidence))
+
+    @property
+    def cvar(self) -> float:
+        """Mean horizon return of the paths at or below VaR."""
+        returns = self.terminal_returns
+        return float(returns[returns <= self.var].mean())
+
+    def terminal_quantiles(
+        self, quantiles: Sequence[float] = FAN_QUANTILES
+    ) -> Dict[float, float]:
+        """Terminal wealth (per unit invested) at each quantile."""
+        return dict(
+            zip(quantiles, np.quantile(self.terminal_wealth, quantiles).tolist())
+        )
+
+    @property
+    def risk_metrics(self) -> Dict[str, float]:
+        """Simulated counterparts of PortfolioStats.risk_metrics."""
+        return {
+            'Simulated VaR': self.var,
+            'Simulated CVaR': self.cvar,
+            'Median Max Drawdown': float(np.median(self.max_drawdown)),
+        }
+
+
+class MonteCarloSimulator:
+    """
+    Forward wealth paths for a constant-weight portfolio.
+
+    ``bootstrap`` resamples blocks of ``block`` consecutive historical
+    portfolio returns, keeping short-range autocorrelation and volatility
+    clustering. ``normal`` and ``t`` draw from the assets' sample mean and
+    covariance; with fixed weights w'X of a multivariate normal (or t) draw
+    is itself univariate normal (t) with the portfolio's mean and variance,
+    so that is sampled directly instead of one draw per asset. The t draws
+    are scaled to the same variance.
+
+    Paths are generated in chunks whose temporaries fit in ``max_bytes`` and
+    can be spread over a process pool with ``workers``; each block of paths
+    has its own seeded stream, so a given ``seed`` always gives the same result.
+    """
+
+    def __init__(
+        self,
+        pipeline: ReturnsPipeline,
+        n_paths: int = 10000,
+        years: float = 10,
+        method: str = 'bootstrap',
+        block: int = 21,
+        dof: float = 5.0,
+        seed: Optional[int] = 0,
+        max_bytes: int = 256 * 1024 * 1024,
+        workers: Optional[int] = None,
+        confidence: float = 0.95,
+        periods: int = TRADING_DAYS,
+    ):
+        if method not in METHODS:
+            raise ValueError(f"Unknown simulation method: {method}")
+        if method == 'bootstrap' and len(pipeline.matrix) < block:
+            raise ValueError(f"Block bootstrap needs at least {block} return rows")
+        if method == 't' and dof <= 2:
+            raise ValueError("Student-t draws need more than 2 degrees of freedom")
+        self.pipeline = pipeline
+        self.n_paths = int(n_paths)
+        self.horizon = max(1, int(round(years * periods)))
+        self.method = method
+        self.block = block
+        self.dof = dof
+        self.seed = seed
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.confidence = confidence
+        self.periods = periods
+
+    def chunk_size(self) -> int:
+        """Paths simulated per chunk under the memory budget (whole seed blocks)."""
+        per_path = self.horizon * 8 * _WORKSPACE_ARRAYS
+        blocks = int(self.max_bytes // max(per_path * _SEED_BLOCK, 1))
+        return max(blocks, 1) * _SEED_BLOCK
+
+    def fan_steps(self) -> np.ndarray:
+        """Periods (1..horizon) at which wealth quantiles are recorded."""
+        return np.unique(
+            np.linspace(0, self.horizon, min(self.horizon, _FAN_STEPS) + 1)
+            .round()
+            .astype(int)
+        )[1:]
+
+    def simulate(self, weights: Weights) -> SimulationResult:
+        """Simulate ``n_paths`` paths of ``horizon`` periods for ``weights``."""
+        returns = self.pipeline.portfolio_returns(weights).to_numpy()
+        source = np.where(np.isfinite(returns), returns, 0.0)
+        if self.method != 'bootstrap':
+            # w'mu and w'Sigma w of the sample moments are the mean and variance
+            # of the portfolio series, without an (assets x assets) covariance
+            source = np.array([source.mean(), source.std(ddof=1)])
+
+        seeds = np.random.SeedSequence(self.seed).spawn(-(-self.n_paths // _SEED_BLOCK))
+        sizes = [
+            min(_SEED_BLOCK, self.n_paths - i * _SEED_BLOCK) for i in range(len(seeds))
+        ]
+        per_chunk = self.chunk_size() // _SEED_BLOCK
+        chunks = [
+            (seeds[i : i + per_chunk], sizes[i : i + per_chunk])
+            for i in range(0, len(seeds), per_chunk)
+        ]
+        steps = self.fan_steps()
+        args = (self.method, self.horizon, self.block, self.dof, steps)
+
+        if self.workers and len(chunks) > 1:
+            with ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(source,)
+            ) as pool:
+                results = list(
+                    pool.map(
+                        _simulate_chunk, chunks, *[[a] * len(chunks) for a in args]
+                    )
+                )
+        else:
+            results = [_simulate_chunk(chunk, *args, source=source) for chunk in chunks]
+
+        fan_wealth = np.concatenate([fan for fan, _, _ in results])
+        fan = pd.DataFrame(
+            np.quantile(fan_wealth, FAN_QUANTILES, axis=0).T,
+            index=pd.Index(steps, name='period'),
+            columns=list(FAN_QUANTILES),
+        )
+        fan.loc[0] = 1.0
+        return SimulationResult(
+            method=self.method,
+            horizon=self.horizon,
+            periods=self.periods,
+            confidence=self.confidence,
+            fan=fan.sort_index(),
+            terminal_wealth=np.concatenate([terminal for _, terminal, _ in results]),
+            max_drawdown=np.concatenate([drawdown for _, _, drawdown in results]),
+        )
+
+
+def _init_worker(source: np.ndarray) -> None:
+    global _worker_returns
+    _worker_returns = source
+
+
+def _draw(
+    rng: np.random.Generator,
+    out: np.ndarray,
+    method: str,
+    block: int,
+    dof: float,
+    source: np.ndarray,
+) -> None:
+    """Fill ``out`` (paths x horizon) with simulated portfolio returns."""
+    n, horizon = out.shape
+    if method == 'bootstrap':
+        n_blocks = -(-horizon // block)
+        starts = rng.integers(0, len(source) - block + 1, size=(n, n_blocks))
+        rows = (starts[:, :, None] + np.arange(block)).reshape(n, -1)[:, :horizon]
+        np.take(source, rows, out=out)
+        return
+    mean, std = source
+    if method == 'normal':
+        rng.standard_normal(out=out)
+    else:
+        out[:] = rng.standard_t(dof, size=out.shape)
+        std = std * np.sqrt((dof - 2) / dof)
+    out *= std
+    out += mean
+
+
+def _simulate_chunk(
+    chunk: Tuple[List[np.random.SeedSequence], List[int]],
+    method: str,
+    horizon: int,
+    block: int,
+    dof: float,
+    steps: np.ndarray,
+    source: Optional[np.ndarray] = None,
+):
+    source = _worker_returns if source is None else source
+    seeds, sizes = chunk
+    paths = np.empty((sum(sizes), horizon))
+    fan = np.empty((len(paths), len(steps)))
+    terminal = np.empty(len(paths))
+    drawdown = np.empty(len(paths))
+    offsets = np.cumsum([0] + sizes)
+    for seed, start, stop in zip(seeds, offsets[:-1], offsets[1:]):
+        wealth = paths[start:stop]
+        _draw(np.random.default_rng(seed), wealth, method, block, dof, source)
+        # Returns become wealth, then drawdown, in place; the running peak
+        # is only ever one block of paths
+        wealth += 1.0
+        np.cumprod(wealth, axis=1, out=wealth)
+        fan[start:stop] = wealth[:, steps - 1]
+        terminal[start:stop] = wealth[:, -1]
+        wealth /= np.maximum.accumulate(wealth, axis=1)
+        drawdown[start:stop] = wealth.min(axis=1) - 1.0
+    return fan, terminal, drawdown
@@ -1,80 +1,168 @@
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+import numpy as np
 import pandas as pd
-from typing import Dict
+from typing import Dict, Optional, Sequence, Union
+
+from src.analytics.attribution import DrawdownAttribution, RiskAttribution
+from src.analytics.correlation import CorrelationResult
+from src.analytics.kernel import PortfolioStats
+from src.analytics.periods import PeriodGrid
+from src.analytics.simulation import SimulationResult
+from src.components.downsample import fit_resolution
+
+# Figures take their theme from the default template, which plotly applies
+# without validating it again; a template passed to every figure is
+# validated (and copied) each time, the bulk of building a small chart
+pio.templates.default = 'plotly_white'
+
+# Above this many assets the correlation heatmap drops cell text and tick labels
+HEATMAP_LABELLED_ASSETS = 40
+
+MONTHS = [
+    'Jan',
+    'Feb',
+    'Mar',
+    'Apr',
+    'May',
+    'Jun',
+    'Jul',
+    'Aug',
+    'Sep',
+    'Oct',
+    'Nov',
+    'Dec',
+]
+
 
 class PortfolioCharts:
-    def __init__(self, colors: Dict[str, str]):
+    def __init__(self, colors: Dict[str, str], max_points: Optional[int] = None):
         self.colors = colors
+        self.max_points = max_points
+
+    def _line(
+        self,
+        series: pd.Series,
+        x_range: Optional[Sequence] = None,
+        grids: Optional[Sequence[PeriodGrid]] = None,
+        how: str = 'last',
+        **kwargs,
+    ) -> go.Scatter:
+        """Line trace at the finest resolution within the viewport's point budget."""
+        series = fit_resolution(series, grids or [], self.max_points, x_range, how)
+        return go.Scatter(x=series.index, y=series.values, mode='lines', **kwargs)
 
-    def create_cumulative_returns_chart(self, port_ret: pd.Series) -> go.Figure:
+    @staticmethod
+    def _xaxis(x_range: Optional[Sequence] = None) -> dict:
+        return dict(range=list(x_range)) if x_range is not None else dict()
+
+    def create_cumulative_returns_chart(
+        self,
+        port_ret: pd.Series,
+        x_range: Optional[Sequence] = None,
+        grids: Optional[Sequence[PeriodGrid]] = None,
+    ) -> go.Figure:
         """Create cumulative returns chart."""
         return go.Figure(
-            data=[go.Scatter(
-                x=port_ret.index,
-                y=(1 + port_ret).cumprod(),
-                mode='lines',
-                name='Portfolio',
-                line=dict(color=self.colors['primary'])
-            )],
+            data=[
+                self._line(
+                    (1 + port_ret).cumprod(),
+                    x_range,
+                    grids,
+                    name='Portfolio',
+                    line=dict(color=self.colors['primary']),
+                )
+            ],
             layout=go.Layout(
                 title='Cumulative Portfolio Returns',
+                xaxis=self._xaxis(x_range),
                 yaxis=dict(title='Value'),
-                template='plotly_white',
                 plot_bgcolor='white',
                 paper_bgcolor='white'
             )
         )
 
-    def create_rolling_stats_chart(self, port_ret: pd.Series) -> go.Figure:
-        """Create rolling statistics chart."""
+    def create_rolling_stats_chart(
+        self,
+        rolling: pd.DataFrame,
+        x_range: Optional[Sequence] = None,
+        grids: Optional[Sequence[PeriodGrid]] = None,
+    ) -> go.Figure:
+        """Create rolling statistics chart from a rolling_stats frame."""
+        percent = [('Volatility', 'danger'), ('Max Drawdown', 'warning')]
+        ratios = [('Sharpe', 'primary'), ('Sortino', 'success'), ('Beta', 'info')]
         return go.Figure(
             data=[
-                go.Scatter(
-                    x=port_ret.index,
-                    y=port_ret.rolling(window=252).mean(),
-                    mode='lines',
-                    name='Rolling Mean',
-                    line=dict(color=self.colors['success'])
-                ),
-                go.Scatter(
-                    x=port_ret.index,
-                    y=port_ret.rolling(window=252).std(),
-                    mode='lines',
-                    name='Rolling Volatility',
-                    line=dict(color=self.colors['danger'])
+                self._line(
+                    rolling[name],
+                    x_range,
+                    grids,
+                    name=f'Rolling {name}',
+                    line=dict(color=self.colors[color]),
                 )
+                for name, color in percent
+            ]
+            + [
+                self._line(
+                    rolling[name],
+                    x_range,
+                    grids,
+                    name=f'Rolling {name}',
+                    yaxis='y2',
+                    line=dict(color=self.colors[color], dash='dot'),
+                )
+                for name, color in ratios
+                if name in rolling
             ],
             layout=go.Layout(
-                title='Rolling Mean Return and Volatility',
-                yaxis=dict(title='Value'),
-                template='plotly_white',
+                title='Rolling Risk and Return Ratios',
+                xaxis=self._xaxis(x_range),
+                yaxis=dict(title='Volatility / Drawdown', tickformat='.0%'),
+                yaxis2=dict(
+                    title='Ratio', overlaying='y', side='right', showgrid=False
+                ),
+                legend=dict(orientation='h', y=-0.15),
                 plot_bgcolor='white',
                 paper_bgcolor='white'
             )
         )
 
-    def create_drawdown_chart(self, port_ret: pd.Series) -> go.Figure:
+    def create_drawdown_chart(
+        self,
+        port_ret: pd.Series,
+        x_range: Optional[Sequence] = None,
+        grids: Optional[Sequence[PeriodGrid]] = None,
+    ) -> go.Figure:
         """Create drawdown chart."""
+        wealth = (1 + port_ret).cumprod()
         return go.Figure(
-            data=[go.Scatter(
-                x=port_ret.index,
-                y=((1 + port_ret).cumprod() / (1 + port_ret).cumprod().expanding().max() - 1),
-                mode='lines',
-                name='Drawdown',
-                fill='tozeroy',
-                line=dict(color=self.colors['danger'])
-            )],
+            data=[
+                self._line(
+                    wealth / wealth.cummax() - 1,
+                    x_range,
+                    grids,
+                    'min',
+                    name='Drawdown',
+                    fill='tozeroy',
+                    line=dict(color=self.colors['danger']),
+                )
+            ],
             layout=go.Layout(
                 title='Portfolio Drawdown',
+                xaxis=self._xaxis(x_range),
                 yaxis=dict(title='Drawdown'),
-                template='plotly_white',
                 plot_bgcolor='white',
                 paper_bgcolor='white'
             )
         )
 
-    def create_risk_metrics_chart(self, risk_metrics: Dict[str, float]) -> go.Figure:
+    def create_risk_metrics_chart(
+        self, risk_metrics: Union[Dict[str, float], PortfolioStats]
+    ) -> go.Figure:
         """Create risk metrics comparison chart."""
+        if isinstance(risk_metrics, PortfolioStats):
+            risk_metrics = risk_metrics.risk_metrics
         return go.Figure(
             data=[go.Bar(
                 x=list(risk_metrics.keys()),
@@ -86,8 +174,476 @@ class PortfolioCharts:
             layout=go.Layout(
                 title='Risk Metrics Comparison',
                 yaxis=dict(title='Absolute Value'),
-                template='plotly_white',
                 plot_bgcolor='white',
                 paper_bgcolor='white'
             )
         )
+
+    def create_portfolio_scatter_chart(
+        self,
+        grid_stats: pd.DataFrame,
+        current: PortfolioStats,
+        frontier_stats: Optional[pd.DataFrame] = None,
+        frontier_error: Optional[str] = None,
+    ) -> go.Figure:
+        """
+        Create risk/return scatter of candidate portfolios against the current one.
+
+        ``frontier_error`` is shown on the chart when the frontier is missing.
+        """
+        frontier = (
+            []
+            if frontier_stats is None
+            else [
+                go.Scatter(
+                    x=frontier_stats['volatility'],
+                    y=frontier_stats['cagr'],
+                    mode='lines',
+                    name='Efficient Frontier',
+                    line=dict(color=self.colors['primary'], width=2),
+                )
+            ]
+        )
+        fig = go.Figure(
+            data=frontier
+            + [
+                go.Scattergl(
+                    x=grid_stats['volatility'],
+                    y=grid_stats['cagr'],
+                    mode='markers',
+                    name='Candidates',
+                    marker=dict(
+                        color=grid_stats['sharpe'],
+                        colorscale='Viridis',
+                        size=6,
+                        opacity=0.7,
+                        colorbar=dict(title='Sharpe'),
+                    ),
+                    hovertemplate=(
+                        'Volatility: %{x:.1%}<br>CAGR: %{y:.1%}<extra></extra>'
+                    ),
+                ),
+                go.Scatter(
+                    x=[current.volatility],
+                    y=[current.cagr],
+                    mode='markers',
+                    name='Current Portfolio',
+                    marker=dict(color=self.colors['danger'], size=14, symbol='star'),
+                ),
+            ],
+            layout=go.Layout(
+                title='Candidate Portfolios: Risk vs Return',
+                xaxis=dict(title='Annualized Volatility', tickformat='.0%'),
+                yaxis=dict(title='CAGR', tickformat='.0%'),
+                plot_bgcolor='white',
+                paper_bgcolor='white',
+            ),
+        )
+        if frontier_stats is None and frontier_error:
+            fig.add_annotation(
+                text=frontier_error,
+                xref='paper',
+                yref='paper',
+                x=0.5,
+                y=1.02,
+                xanchor='center',
+                yanchor='bottom',
+                showarrow=False,
+                font=dict(color=self.colors['danger']),
+            )
+        return fig
+
+    def create_message_chart(self, title: str, message: str) -> go.Figure:
+        """Create an empty chart showing ``message``, for charts built on demand."""
+        return go.Figure(
+            layout=go.Layout(
+                title=title,
+                xaxis=dict(visible=False),
+                yaxis=dict(visible=False),
+                annotations=[
+                    dict(
+                        text=message,
+                        xref='paper',
+                        yref='paper',
+                        x=0.5,
+                        y=0.5,
+                        showarrow=False,
+                        font=dict(color=self.colors['gray']),
+                    )
+                ],
+                plot_bgcolor='white',
+                paper_bgcolor='white',
+            )
+        )
+
+    def create_simulation_fan_chart(self, result: SimulationResult) -> go.Figure:
+        """Create fan chart of simulated wealth quantiles over the horizon."""
+        fan = result.fan
+        years = fan.index / result.periods
+        lower, upper = fan.columns[0], fan.columns[-1]
+        inner_lower, inner_upper = fan.columns[1], fan.columns[-2]
+        band = dict(
+            mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'
+        )
+        return go.Figure(
+            data=[
+                go.Scatter(x=years, y=fan[upper], **band),
+                go.Scatter(
+                    x=years,
+                    y=fan[lower],
+                    fill='tonexty',
+                    fillcolor='rgba(44, 62, 80, 0.15)',
+                    name=f'{lower:.0%}-{upper:.0%}',
+                    mode='lines',
+                    line=dict(width=0),
+                ),
+                go.Scatter(x=years, y=fan[inner_upper], **band),
+                go.Scatter(
+                    x=years,
+                    y=fan[inner_lower],
+                    fill='tonexty',
+                    fillcolor='rgba(44, 62, 80, 0.3)',
+                    name=f'{inner_lower:.0%}-{inner_upper:.0%}',
+                    mode='lines',
+                    line=dict(width=0),
+                ),
+                go.Scatter(
+                    x=years,
+                    y=fan[0.5],
+                    mode='lines',
+                    name='Median',
+                    line=dict(color=self.colors['primary']),
+                ),
+            ],
+            layout=go.Layout(
+                title=f'Simulated Wealth ({len(result.terminal_wealth):,} paths)',
+                xaxis=dict(title='Years'),
+                yaxis=dict(title='Value', type='log'),
+                legend=dict(orientation='h', y=-0.15),
+                plot_bgcolor='white',
+                paper_bgcolor='white',
+            ),
+        )
+
+    def create_simulation_risk_chart(
+        self, result: SimulationResult, bins: int = 60
+    ) -> go.Figure:
+        """Create distributions of simulated horizon returns and max drawdowns."""
+        years = result.horizon / result.periods
+        figure = make_subplots(
+            rows=1, cols=2, subplot_titles=(f'{years:g}-Year Return', 'Max Drawdown')
+        )
+        for col, values, color in [
+            (1, result.terminal_returns, 'info'),
+            (2, result.max_drawdown, 'danger'),
+        ]:
+            # Binned here so the figure carries bins, not every path
+            counts, edges = np.histogram(values, bins=bins)
+            figure.add_trace(
+                go.Bar(
+                    x=(edges[:-1] + edges[1:]) / 2,
+                    y=counts / len(values),
+                    width=np.diff(edges),
+                    marker_color=self.colors[color],
+                    showlegend=False,
+                    hovertemplate='%{x:.1%}: %{y:.1%}<extra></extra>',
+                ),
+                row=1,
+                col=col,
+            )
+        for name, value, dash in [
+            ('VaR', result.var, 'dash'),
+            ('CVaR', result.cvar, 'dot'),
+        ]:
+            figure.add_vline(
+                x=value,
+                line=dict(color=self.colors['warning'], dash=dash),
+                annotation_text=f'{name} {value:.1%}',
+                row=1,
+                col=1,
+            )
+        median = float(np.median(result.max_drawdown))
+        figure.add_vline(
+            x=median,
+            line=dict(color=self.colors['primary'], dash='dash'),
+            annotation_text=f'Median {median:.1%}',
+            row=1,
+            col=2,
+        )
+        figure.update_xaxes(tickformat='.0%')
+        figure.update_yaxes(tickformat='.0%', title_text='Share of Paths', row=1, col=1)
+        figure.update_layout(
+            title='Simulated Risk Distribution',
+            bargap=0,
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+        )
+        return figure
+
+    def create_monthly_returns_heatmap(self, monthly: pd.Series) -> go.Figure:
+        """Create heatmap of monthly returns, one row per year."""
+        table = pd.DataFrame(
+            {
+                'year': monthly.index.year,
+                'month': monthly.index.month,
+                'value': monthly.to_numpy(),
+            }
+        )
+        grid = table.pivot(index='year', columns='month', values='value').reindex(
+            columns=range(1, 13)
+        )
+        text = [
+            ['' if pd.isna(v) else f'{v:.1%}' for v in row] for row in grid.to_numpy()
+        ]
+        return go.Figure(
+            data=[
+                go.Heatmap(
+                    z=grid.to_numpy(),
+                    x=MONTHS,
+                    y=[str(year) for year in grid.index],
+                    text=text,
+                    texttemplate='%{text}',
+                    colorscale='RdYlGn',
+                    zmid=0,
+                    colorbar=dict(tickformat='.0%'),
+                    hovertemplate='%{x} %{y}: %{text}<extra></extra>',
+                )
+            ],
+            layout=go.Layout(
+                title='Monthly Returns Heatmap',
+                yaxis=dict(autorange='reversed', type='category'),
+                plot_bgcolor='white',
+                paper_bgcolor='white',
+            ),
+        )
+
+    def create_period_returns_table(
+        self, returns: pd.DataFrame, stats: pd.DataFrame, label: str
+    ) -> go.Figure:
+        """Create tables of frequency-aware statistics and per-period returns.
+
+        Periods are listed latest first.
+        """
+        header = dict(
+            fill_color=self.colors['primary'], font=dict(color='white'), align='center'
+        )
+        ratios = {'Sharpe', 'Sortino'}
+        stat_cells = [list(stats.index)] + [
+            [
+                f'{v:.2f}' if name in ratios else f'{v:.1%}'
+                for name, v in stats[column].items()
+            ]
+            for column in stats.columns
+        ]
+        returns = returns.iloc[::-1]
+        period_cells = [[f'{d:%Y-%m-%d}' for d in returns.index]] + [
+            [f'{v:.2%}' for v in returns[column]] for column in returns.columns
+        ]
+        figure = make_subplots(
+            rows=2,
+            cols=1,
+            row_heights=[0.35, 0.65],
+            vertical_spacing=0.05,
+            specs=[[{'type': 'table'}], [{'type': 'table'}]],
+        )
+        figure.add_trace(
+            go.Table(
+                header=dict(
+                    values=[f'{label} Statistics'] + list(stats.columns), **header
+                ),
+                cells=dict(values=stat_cells, align='right'),
+            ),
+            row=1,
+            col=1,
+        )
+        figure.add_trace(
+            go.Table(
+                header=dict(values=['Period End'] + list(returns.columns), **header),
+                cells=dict(values=period_cells, align='right'),
+            ),
+            row=2,
+            col=1,
+        )
+        figure.update_layout(
+            title=f'{label} Returns',
+            height=700,
+            paper_bgcolor='white',
+        )
+        return figure
+
+    def create_correlation_heatmap(self, result: CorrelationResult) -> go.Figure:
+        """Create a correlation heatmap with assets ordered by cluster."""
+        result = result.clustered()
+        n_assets = len(result.assets)
+        labelled = n_assets <= HEATMAP_LABELLED_ASSETS
+        # Three decimals keep the payload small for hundreds of assets
+        z = np.round(result.correlation, 3)
+        z = np.where(np.isfinite(z), z, None).tolist()
+        window = (
+            'full history' if result.window is None else f'{result.window}-day window'
+        )
+        method = 'Ledoit-Wolf' if result.method == 'ledoit_wolf' else 'Pairwise Sample'
+        title = f'{method} Correlation ({window}), average {result.average:.2f}'
+        if result.shrinkage is not None:
+            title += f', shrinkage {result.shrinkage:.2f}'
+        return go.Figure(
+            data=[
+                go.Heatmap(
+                    z=z,
+                    x=result.assets,
+                    y=result.assets,
+                    zmin=-1,
+                    zmax=1,
+                    colorscale='RdBu',
+                    reversescale=True,
+                    texttemplate='%{z:.2f}' if labelled else None,
+                    hovertemplate='%{y} / %{x}: %{z:.3f}<extra></extra>',
+                    hoverongaps=False,
+                )
+            ],
+            layout=go.Layout(
+                title=title,
+                xaxis=dict(showticklabels=labelled, type='category'),
+                yaxis=dict(
+                    showticklabels=labelled,
+                    type='category',
+                    autorange='reversed',
+                    scaleanchor='x',
+                ),
+                height=min(450 + 4 * n_assets, 900),
+                plot_bgcolor='white',
+                paper_bgcolor='white',
+            ),
+        )
+
+    def create_risk_contribution_chart(
+        self, result: RiskAttribution, max_assets: int = 10
+    ) -> go.Figure:
+        """Create bars of each holding's share of volatility, VaR and CVaR."""
+        size = result.components['Volatility']
+        shares = _largest(result.shares(), max_assets, size)
+        components = _largest(
+            result.to_frame()[list(result.marginal)], max_assets, size
+        )
+        confidence = f'{result.confidence:.0%}'
+        colors = {'Volatility': 'info', 'VaR': 'warning', 'CVaR': 'danger'}
+        figure = go.Figure()
+        for measure in result.marginal:
+            figure.add_trace(
+                go.Bar(
+                    y=list(shares.index),
+                    x=shares[measure].to_numpy(),
+                    name=measure,
+                    orientation='h',
+                    marker_color=self.colors[colors.get(measure, 'primary')],
+                    customdata=components[measure].to_numpy(),
+                    hovertemplate=f'%{{y}}: %{{x:.1%}} of {measure}'
+                    '<br>Contribution: %{customdata:.3%}<extra></extra>',
+                )
+            )
+        totals = result.totals
+        figure.update_layout(
+            title=(
+                f"Risk Contribution (volatility {totals['Volatility']:.1%}, "
+                f"daily {confidence} VaR {totals['VaR']:.2%}, "
+                f"CVaR {totals['CVaR']:.2%})"
+            ),
+            barmode='group',
+            xaxis=dict(title='Share of Total', tickformat='.0%'),
+            yaxis=dict(autorange='reversed', type='category'),
+            height=max(450, 60 * len(shares)),
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+        )
+        return figure
+
+    def create_return_attribution_chart(
+        self, contributions: pd.DataFrame, label: str, max_assets: int = 10
+    ) -> go.Figure:
+        """Create stacked bars of each holding's contribution to each period's return"""
+        table = _largest(
+            contributions.T, max_assets, contributions.abs().sum().to_numpy()
+        ).T
+        x = [f'{d:%Y-%m-%d}' for d in table.index]
+        figure = go.Figure()
+        for asset in table.columns:
+            figure.add_trace(
+                go.Bar(
+                    x=x,
+                    y=table[asset].to_numpy(),
+                    name=str(asset),
+                    hovertemplate=f'{asset} %{{x}}: %{{y:.2%}}<extra></extra>',
+                )
+            )
+        figure.add_trace(
+            go.Scatter(
+                x=x,
+                y=table.sum(axis=1).to_numpy(),
+                name='Portfolio',
+                mode='markers',
+                marker=dict(color=self.colors['primary'], symbol='diamond'),
+                hovertemplate='Portfolio %{x}: %{y:.2%}<extra></extra>',
+            )
+        )
+        figure.update_layout(
+            title=f'{label} Return Attribution',
+            barmode='relative',
+            xaxis=dict(title='Period End', type='category'),
+            yaxis=dict(title='Contribution', tickformat='.0%'),
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+        )
+        return figure
+
+    def create_drawdown_attribution_chart(
+        self, result: DrawdownAttribution, max_assets: int = 10
+    ) -> go.Figure:
+        """Create stacked bars of each holding's share of the deepest drawdowns."""
+        contributions = result.contributions
+        table = _largest(
+            contributions.T, max_assets, contributions.abs().sum().to_numpy()
+        ).T
+        periods = result.periods
+        labels = [
+            f'{peak:%Y-%m-%d} to {trough:%Y-%m-%d} ({depth:.1%})'
+            for peak, trough, depth in zip(
+                periods['peak'], periods['trough'], periods['depth']
+            )
+        ]
+        recovery = [
+            'not recovered' if pd.isna(d) else f'recovered {d:%Y-%m-%d}'
+            for d in periods['recovery']
+        ]
+        figure = go.Figure()
+        for asset in table.columns:
+            figure.add_trace(
+                go.Bar(
+                    y=labels,
+                    x=table[asset].to_numpy(),
+                    name=str(asset),
+                    orientation='h',
+                    customdata=recovery,
+                    hovertemplate=(
+                        f'{asset}: %{{x:.2%}}<br>%{{customdata}}<extra></extra>'
+                    ),
+                )
+            )
+        figure.update_layout(
+            title='Drawdown Attribution (peak to trough)',
+            barmode='relative',
+            xaxis=dict(title='Contribution', tickformat='.0%'),
+            yaxis=dict(autorange='reversed', type='category'),
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+        )
+        return figure
+
+
+def _largest(frame: pd.DataFrame, n: int, size: np.ndarray) -> pd.DataFrame:
+    """The ``n`` rows of ``frame`` with the largest ``size``, the rest as 'Other'."""
+    if len(frame) <= n:
+        return frame
+    order = np.argsort(-np.abs(size), kind='stable')
+    largest = frame.iloc[order[:n]]
+    other = frame.iloc[order[n:]].sum().rename('Other')
+    return pd.concat([largest, other.to_frame().T])
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from typing import Optional, Sequence
+
+from src.analytics.periods import PeriodGrid
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: pick ``n_out`` points that preserve the
+    visual shape of (x, y). Returns the selected positions.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (n_out - 2)
+    edges = (np.arange(n_out - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(
+    series: pd.Series, max_points: Optional[int], x_range: Optional[Sequence] = None
+) -> pd.Series:
+    """
+    Reduce a time series to at most ``max_points`` for plotting.
+
+    Args:
+        series: Values indexed by date; NaNs are dropped
+        max_points: Target point count (roughly the plot width in pixels);
+            None keeps every point
+        x_range: Optional (start, end) viewport; only points inside it (plus
+            one neighbour on each side so lines reach the edges) are kept
+    """
+    series = series.dropna()
+    if x_range is not None:
+        start, end = pd.Timestamp(x_range[0]), pd.Timestamp(x_range[1])
+        lo = max(series.index.searchsorted(start, side='left') - 1, 0)
+        hi = series.index.searchsorted(end, side='right') + 1
+        series = series.iloc[lo:hi]
+
+    if max_points is None or len(series) <= max_points:
+        return series
+
+    x = (
+        series.index.asi8.astype(np.float64)
+        if isinstance(series.index, pd.DatetimeIndex)
+        else np.arange(len(series), dtype=np.float64)
+    )
+    return series.iloc[lttb_indices(x, series.to_numpy(dtype=np.float64), max_points)]
+
+
+def fit_resolution(
+    series: pd.Series,
+    grids: Sequence[PeriodGrid],
+    max_points: Optional[int],
+    x_range: Optional[Sequence] = None,
+    how: str = 'last',
+) -> pd.Series:
+    """
+    Reduce a daily series to the finest period resolution that fits ``max_points``.
+
+    Daily points are kept while they fit the viewport; otherwise the series
+    is sampled at the end of each week, month, quarter or year (``how='last'``,
+    for levels such as wealth) or reduced to each period's minimum
+    (``how='min'``, so drawdown troughs survive). Falls back to ``downsample``
+    when even the coarsest grid does not fit or the grids belong to another index.
+
+    Args:
+        series: Values on the dataset's daily index
+        grids: Period grids of that index, finest first
+        max_points: Target point count; None keeps every point
+        x_range: Optional (start, end) viewport
+        how: 'last' or 'min' aggregation within a period
+    """
+    if (
+        max_points is None
+        or not grids
+        or any(grid.n_rows != len(series) for grid in grids)
+    ):
+        return downsample(series, max_points, x_range)
+    lo, hi = 0, len(series)
+    if x_range is not None:
+        lo = max(
+            series.index.searchsorted(pd.Timestamp(x_range[0]), side='left') - 1, 0
+        )
+        hi = series.index.searchsorted(pd.Timestamp(x_range[1]), side='right') + 1
+    if hi - lo <= max_points:
+        return downsample(series, max_points, x_range)
+
+    for grid in grids:
+        ends = grid.ends
+        if np.searchsorted(ends, hi) - np.searchsorted(ends, lo) > max_points:
+            continue
+        values = series.to_numpy(dtype=np.float64)
+        if how == 'min':
+            values = np.fmin.reduceat(values, grid.starts)
+        else:
+            values = values[ends]
+        return downsample(
+            pd.Series(values, index=series.index[ends], name=series.name), None, x_range
+        )
+    return downsample(series, max_points, x_range)
@@ -1,69 +1,114 @@
 from dash import html
 import dash_bootstrap_components as dbc
-from quantstats import stats
 import pandas as pd
-from typing import Dict
+from typing import Dict, List, Optional, Union
+
+from src.analytics.kernel import PortfolioStats, compute_portfolio_stats
 
 class PortfolioMetrics:
+    # Metric cards, in the order of metric_values
+    CARDS = [
+        {
+            'title': 'Sharpe Ratio',
+            'description': 'Risk-adjusted return measure',
+            'icon': 'fa-chart-line',
+            'color': 'primary',
+        },
+        {
+            'title': 'Sortino Ratio',
+            'description': 'Downside risk-adjusted return',
+            'icon': 'fa-shield-alt',
+            'color': 'success',
+        },
+        {
+            'title': 'CAGR',
+            'description': 'Compound Annual Growth Rate',
+            'icon': 'fa-chart-area',
+            'color': 'info',
+        },
+        {
+            'title': 'Max Drawdown',
+            'description': 'Largest peak-to-trough decline',
+            'icon': 'fa-arrow-down',
+            'color': 'danger',
+        },
+        {
+            'title': 'Win Rate',
+            'description': 'Percentage of positive returns',
+            'icon': 'fa-trophy',
+            'color': 'warning',
+        },
+    ]
+
     def __init__(self, colors: Dict[str, str]):
         self.colors = colors
 
-    def create_metric_card(self, title: str, value: str, description: str, 
-                          icon: str, color: str) -> dbc.Card:
+    def create_metric_card(
+        self,
+        title: str,
+        value: str,
+        description: str,
+        icon: str,
+        color: str,
+        value_id: Optional[str] = None,
+    ) -> dbc.Card:
         """Create a metric card component."""
-        return dbc.Card([
-            dbc.CardBody([
-                html.I(className=f"fas {icon} fa-2x mb-3", 
-                      style={'color': self.colors[color]}),
-                html.H4(title, className="text-muted"),
-                html.H2(value, style={'color': self.colors[color]}),
-                html.P(description, className="text-muted small")
-            ])
-        ], className="text-center h-100 shadow-sm metric-card", 
-        style={'transition': 'all 0.3s ease-in-out',
-               'border': 'none',
-               'border-radius': '10px',
-               'background': 'white',
-               'cursor': 'pointer'})
-
-    def create_all_metric_cards(self, port_ret: pd.Series) -> list:
-        """Create all metric cards for the dashboard."""
-        metrics = [
-            {
-                'title': 'Sharpe Ratio',
-                'value': f"{stats.sharpe(port_ret):.3g}",
-                'description': 'Risk-adjusted return measure',
-                'icon': 'fa-chart-line',
-                'color': 'primary'
-            },
-            {
-                'title': 'Sortino Ratio',
-                'value': f"{stats.sortino(port_ret):.3g}",
-                'description': 'Downside risk-adjusted return',
-                'icon': 'fa-shield-alt',
-                'color': 'success'
-            },
-            {
-                'title': 'CAGR',
-                'value': f"{stats.cagr(port_ret):.1%}",
-                'description': 'Compound Annual Growth Rate',
-                'icon': 'fa-chart-area',
-                'color': 'info'
+        return dbc.Card(
+            [
+                dbc.CardBody(
+                    [
+                        html.I(
+                            className=f"fas {icon} fa-2x mb-3",
+                            style={'color': self.colors[color]},
+                        ),
+                        html.H4(title, className="text-muted"),
+                        html.H2(
+                            value,
+                            style={'color': self.colors[color]},
+                            **({'id': value_id} if value_id else {}),
+                        ),
+                        html.P(description, className="text-muted small"),
+                    ]
+                )
+            ],
+            className="text-center h-100 shadow-sm metric-card",
+            style={
+                'transition': 'all 0.3s ease-in-out',
+                'border': 'none',
+                'border-radius': '10px',
+                'background': 'white',
+                'cursor': 'pointer',
             },
-            {
-                'title': 'Max Drawdown',
-                'value': f"{stats.max_drawdown(port_ret):.1%}",
-                'description': 'Largest peak-to-trough decline',
-                'icon': 'fa-arrow-down',
-                'color': 'danger'
-            },
-            {
-                'title': 'Win Rate',
-                'value': f"{stats.win_rate(port_ret):.1%}",
-                'description': 'Percentage of positive returns',
-                'icon': 'fa-trophy',
-                'color': 'warning'
-            }
+        )
+
+    def create_all_metric_cards(
+        self, port_ret: Optional[Union[pd.Series, PortfolioStats]] = None
+    ) -> list:
+        """Create all metric cards from a return series or precomputed stats.
+
+        Cards show placeholders if there is neither.
+        """
+        values = (
+            self.metric_values(port_ret)
+            if port_ret is not None
+            else ['–'] * len(self.CARDS)
+        )
+        return [
+            self.create_metric_card(**metric, value=value, value_id=f'metric-value-{i}')
+            for i, (metric, value) in enumerate(zip(self.CARDS, values))
+        ]
+
+    def metric_values(self, port_ret: Union[pd.Series, PortfolioStats]) -> List[str]:
+        """Formatted card values, in card order, for partial updates."""
+        stats = (
+            port_ret
+            if isinstance(port_ret, PortfolioStats)
+            else compute_portfolio_stats(port_ret)
+        )
+        return [
+            f"{stats.sharpe:.3g}",
+            f"{stats.sortino:.3g}",
+            f"{stats.cagr:.1%}",
+            f"{stats.max_drawdown:.1%}",
+            f"{stats.win_rate:.1%}",
         ]
-        
-        return [self.create_metric_card(**metric) for metric in metrics]
@@ -1,3 +1,6 @@
+import os
+import tempfile
+
 import plotly.io as pio
 
 # Color palette
@@ -12,9 +15,98 @@ COLORS = {
 
 # File paths
 DATA_PATH = "/app/data/myport2.csv"
+# Seconds between checks for rows appended to DATA_PATH (0 disables)
+DATA_POLL_SECONDS = float(os.getenv('DATA_POLL_SECONDS', 5))
+
+# Dataset store settings (shared by all sessions in a worker process)
+STORE_MAX_ITEMS = int(os.getenv('STORE_MAX_ITEMS', 16))
+STORE_TTL_SECONDS = float(os.getenv('STORE_TTL_SECONDS', 3600))
+STORE_MAX_BYTES = int(os.getenv('STORE_MAX_MB', 512)) * 1024 * 1024
+STORE_DIR = os.getenv(
+    'STORE_DIR', os.path.join(tempfile.gettempdir(), 'markolabs-store')
+)
+DEFAULT_DATASET = 'default'
+
+# Batch evaluation settings
+BATCH_MAX_BYTES = int(os.getenv('BATCH_MAX_MB', 256)) * 1024 * 1024
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 0)) or None
+GRID_PORTFOLIOS = int(os.getenv('GRID_PORTFOLIOS', 500))
+FRONTIER_POINTS = int(os.getenv('FRONTIER_POINTS', 50))
+# The efficient frontier is skipped above this many assets
+FRONTIER_MAX_ASSETS = int(os.getenv('FRONTIER_MAX_ASSETS', 500))
+
+# Chunked upload settings (browser sends the file in pieces of this size)
+UPLOAD_CHUNK_BYTES = int(os.getenv('UPLOAD_CHUNK_MB', 8)) * 1024 * 1024
+# Largest file accepted by the chunked upload, and uploads in progress at once
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_MB', 2048)) * 1024 * 1024
+UPLOAD_MAX_PENDING = int(os.getenv('UPLOAD_MAX_PENDING', 16))
+UPLOAD_DIR = os.path.join(STORE_DIR, 'uploads')
+
+# Background job settings ('disk', 'local' or a redis:// URL); 'local' only
+# works with a single server process
+JOB_BACKEND = os.getenv('JOB_BACKEND', 'disk')
+JOB_DIR = os.getenv('JOB_DIR', os.path.join(tempfile.gettempdir(), 'markolabs-jobs'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2)) or None
+JOB_TTL_SECONDS = float(os.getenv('JOB_TTL_SECONDS', 3600))
+JOB_POLL_MS = int(os.getenv('JOB_POLL_MS', 500))
+# Server worker processes, as set for gunicorn
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+
+# Telemetry: timing spans and cache counters on /metrics, optionally logged
+# as JSON lines to TELEMETRY_LOG ('-' for stderr). Off by default: /metrics
+# is unauthenticated, so enable it only where the endpoint is not public
+TELEMETRY_ENABLED = os.getenv('TELEMETRY_ENABLED', 'false').lower() == 'true'
+TELEMETRY_LOG = os.getenv('TELEMETRY_LOG') or None
+
+# Serialized chart and metric payloads kept per worker, keyed by dataset
+# version and callback inputs; responses are gzip (or brotli) compressed
+PAYLOAD_CACHE_BYTES = int(os.getenv('PAYLOAD_CACHE_MB', 64)) * 1024 * 1024
+RESPONSE_COMPRESSION = os.getenv('RESPONSE_COMPRESSION', 'true').lower() == 'true'
 
 # Chart settings
 pio.templates.default = "plotly_white"
+CHART_MAX_POINTS = int(os.getenv('CHART_MAX_POINTS', 1200)) or None
+
+# Rolling analytics windows (label -> trading days)
+ROLLING_WINDOWS = {'1M': 21, '3M': 63, '6M': 126, '1Y': 252, '3Y': 756}
+DEFAULT_ROLLING_WINDOW = 252
+
+# Resampled return tables (label -> frequency)
+PERIOD_FREQUENCIES = {'Weekly': 'W', 'Monthly': 'M', 'Quarterly': 'Q', 'Yearly': 'Y'}
+DEFAULT_PERIOD_FREQUENCY = 'Y'
+# Largest holdings shown next to the portfolio in the period table
+PERIOD_TABLE_ASSETS = int(os.getenv('PERIOD_TABLE_ASSETS', 20))
+
+# Wide universes: above this many assets the weight inputs become a
+# searchable holdings table and weights are stored sparsely
+WIDE_UNIVERSE_ASSETS = int(os.getenv('WIDE_UNIVERSE_ASSETS', 30))
+HOLDINGS_SEARCH_RESULTS = 20
+
+# Correlation heatmap: estimators, and the most assets shown (largest holdings
+# beyond it); the window choices are ROLLING_WINDOWS plus the full history
+CORRELATION_METHODS = {'Pairwise Sample': 'sample', 'Ledoit-Wolf': 'ledoit_wolf'}
+CORRELATION_MAX_ASSETS = int(os.getenv('CORRELATION_MAX_ASSETS', 200))
+
+# Risk and return attribution: holdings shown individually (the rest as
+# 'Other') and the number of deepest drawdowns broken down
+ATTRIBUTION_ASSETS = int(os.getenv('ATTRIBUTION_ASSETS', 10))
+ATTRIBUTION_DRAWDOWNS = int(os.getenv('ATTRIBUTION_DRAWDOWNS', 5))
+
+# Monte Carlo simulation (paths share BATCH_MAX_MB and BATCH_WORKERS)
+SIMULATION_PATHS = int(os.getenv('SIMULATION_PATHS', 10000))
+SIMULATION_BLOCK = int(os.getenv('SIMULATION_BLOCK', 21))
+SIMULATION_SEED = int(os.getenv('SIMULATION_SEED', 0))
+SIMULATION_METHODS = {
+    'Block Bootstrap': 'bootstrap',
+    'Normal': 'normal',
+    'Student-t': 't',
+}
+SIMULATION_HORIZONS = {'1Y': 1, '3Y': 3, '5Y': 5, '10Y': 10}
+DEFAULT_SIMULATION_YEARS = 10
+
+# Batch tearsheet export (python -m src.reports.tearsheet); png and pdf need kaleido
+REPORT_FORMATS = tuple(os.getenv('REPORT_FORMATS', 'html').split(','))
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', 0)) or os.cpu_count()
 
 # Portfolio settings
 DEFAULT_WEIGHTS = [0.2, 0.3, 0.5]
@@ -0,0 +1,459 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+FORMAT_VERSION = 2
+SUFFIX = '.columnar'
+
+# Bytes before the previous end of the CSV that must be unchanged for an append
+_TAIL_BYTES = 4096
+_NPY_HEADERS = {
+    (1, 0): (np.lib.format.read_array_header_1_0, np.lib.format.write_array_header_1_0),
+    (2, 0): (np.lib.format.read_array_header_2_0, np.lib.format.write_array_header_2_0),
+}
+
+_META = 'meta.json'
+_PRICES = 'prices.npy'
+_DATES = 'dates.npy'
+_RETURNS = 'returns.npy'
+_RETURN_DATES = 'return_dates.npy'
+
+
+def columnar_path(csv_path: str) -> str:
+    """Location of the columnar copy of a CSV file (next to it)."""
+    return os.path.splitext(csv_path)[0] + SUFFIX
+
+
+def is_columnar(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, _META))
+
+
+def is_fresh(path: str, csv_path: str) -> bool:
+    """True if ``path`` holds a columnar copy written from the current ``csv_path``."""
+    try:
+        meta = _read_meta(path)
+        stat = os.stat(csv_path)
+    except (OSError, ValueError):
+        return False
+    source = meta.get('source') or {}
+    return (
+        meta.get('version') == FORMAT_VERSION
+        and source.get('size') == stat.st_size
+        and source.get('mtime_ns') == stat.st_mtime_ns
+    )
+
+
+def generation(path: str) -> Tuple[str, int]:
+    """
+    (write id, return rows) of a columnar copy.
+
+    The write id changes whenever the copy is rewritten from scratch, while
+    appends only grow the row count, so a reader holding an older state knows
+    whether it can extend or has to reload.
+    """
+    meta = _read_meta(path)
+    return meta.get('generation', ''), meta.get('return_rows', 0)
+
+
+def write_columnar(df: pd.DataFrame, path: str, source: Optional[str] = None) -> str:
+    """
+    Write a prepared price frame (DatetimeIndex, numeric columns) to ``path``.
+
+    Args:
+        df: Frame as returned by PortfolioDataLoader.prepare_frame
+        path: Output directory, replaced atomically if it exists
+        source: Optional CSV the frame was read from, recorded for staleness checks
+    """
+    return write_arrays(
+        df.index.values,
+        df.to_numpy(dtype=np.float64),
+        [str(c) for c in df.columns],
+        path,
+        source,
+    )
+
+
+def write_arrays(
+    dates: np.ndarray,
+    prices: np.ndarray,
+    columns: List[str],
+    path: str,
+    source: Optional[str] = None,
+    block_bytes: int = 8 * 1024 * 1024,
+) -> str:
+    """
+    Write a dataset from a date vector and an (n_dates x n_assets) price array.
+
+    Prices and returns are stored row-major: returns in the layout
+    ReturnsPipeline multiplies against, so they need no copy when
+    memory-mapped back, and both so new rows can be appended in place (see
+    append_csv). Both are produced in row blocks of about ``block_bytes``,
+    so ``prices`` may itself be a memory map larger than RAM.
+    """
+    meta = {
+        'version': FORMAT_VERSION,
+        'generation': uuid.uuid4().hex,
+        'columns': list(columns),
+        'source': _source_meta(source) if source else None,
+    }
+
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp_path = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    try:
+        os.chmod(tmp_path, 0o755)
+        n_rows, n_cols = prices.shape
+        block_rows = max(1, block_bytes // (8 * max(n_cols, 1)))
+        out = np.lib.format.open_memmap(
+            os.path.join(tmp_path, _PRICES),
+            mode='w+',
+            dtype=np.float64,
+            shape=(n_rows, n_cols),
+        )
+        for start in range(0, n_rows, block_rows):
+            out[start : start + block_rows] = prices[start : start + block_rows]
+        out.flush()
+        del out
+        np.save(os.path.join(tmp_path, _DATES), np.asarray(dates))
+
+        last_valid, meta['return_rows'] = _write_returns(
+            dates, prices, tmp_path, block_rows
+        )
+        meta['rows'] = n_rows
+        meta['last_valid'] = _to_json(last_valid)
+        _write_meta(tmp_path, meta)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return path
+
+
+def _block_returns(
+    block: np.ndarray, last_valid: Optional[np.ndarray], prev_row: Optional[np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ``pct_change().dropna()`` rows of a price block that follows earlier rows.
+
+    The block is prefixed with the last valid price per column and the
+    previous raw row, which makes pandas' fill behaviour across the block
+    boundary identical to a single call on the whole frame.
+
+    Returns:
+        Tuple of (kept return rows, boolean mask of kept block rows)
+    """
+    if prev_row is None:
+        returns = pd.DataFrame(block).pct_change().to_numpy()
+    else:
+        extended = np.vstack([last_valid, prev_row, block])
+        returns = pd.DataFrame(extended).pct_change().to_numpy()[2:]
+    keep = ~np.isnan(returns).any(axis=1)
+    return np.ascontiguousarray(returns[keep]), keep
+
+
+def _last_valid(block: np.ndarray, last_valid: Optional[np.ndarray]) -> np.ndarray:
+    filled = pd.DataFrame(block).ffill().to_numpy()[-1]
+    return (
+        filled if last_valid is None else np.where(np.isnan(filled), last_valid, filled)
+    )
+
+
+def _write_returns(
+    dates: np.ndarray, prices: np.ndarray, directory: str, block_rows: int
+) -> Tuple[Optional[np.ndarray], int]:
+    """
+    Stream ``DataFrame.pct_change().dropna()`` of ``prices`` to returns.npy.
+
+    Returns:
+        Tuple of (last valid price per column, number of return rows)
+    """
+    raw_path = os.path.join(directory, 'returns.raw')
+    kept_dates = []
+    n_rows, n_cols = prices.shape
+    last_valid = prev_row = None
+    with open(raw_path, 'wb') as raw:
+        for start in range(0, n_rows, block_rows):
+            block = np.asarray(prices[start : start + block_rows], dtype=np.float64)
+            returns, keep = _block_returns(block, last_valid, prev_row)
+            returns.tofile(raw)
+            kept_dates.append(np.asarray(dates[start : start + block_rows])[keep])
+            last_valid = _last_valid(block, last_valid)
+            prev_row = block[-1]
+
+    return_dates = np.concatenate(kept_dates) if kept_dates else np.asarray(dates)[:0]
+    raw_values = (
+        np.memmap(
+            raw_path, dtype=np.float64, mode='r', shape=(len(return_dates), n_cols)
+        )
+        if len(return_dates)
+        else np.empty((0, n_cols))
+    )
+    out = np.lib.format.open_memmap(
+        os.path.join(directory, _RETURNS),
+        mode='w+',
+        dtype=np.float64,
+        shape=(len(return_dates), n_cols),
+    )
+    for start in range(0, len(return_dates), block_rows):
+        out[start : start + block_rows] = raw_values[start : start + block_rows]
+    out.flush()
+    del out, raw_values
+    os.remove(raw_path)
+    np.save(os.path.join(directory, _RETURN_DATES), return_dates)
+    return last_valid, len(return_dates)
+
+
+def append_csv(path: str, csv_path: str) -> int:
+    """
+    Append the rows added to ``csv_path`` since ``path`` was written from it.
+
+    Only the bytes past the previously ingested size are parsed, and every
+    file grows in place (data first, then its .npy header, then meta.json as
+    the commit record), so the cost depends on the new rows alone.
+
+    Returns:
+        Number of price rows appended
+
+    Raises:
+        ValueError: if the CSV was not simply appended to (rewritten, new
+            columns, dates not after the last one); the caller should ingest
+            it from scratch
+    """
+    meta = _read_meta(path)
+    source = meta.get('source')
+    if meta.get('version') != FORMAT_VERSION or not source:
+        raise ValueError("Columnar copy cannot be appended to")
+    stat = os.stat(csv_path)
+    if stat.st_size < source['size']:
+        raise ValueError("Source file shrank")
+
+    with open(csv_path, 'rb') as f:
+        f.seek(max(source['size'] - _TAIL_BYTES, 0))
+        tail = f.read(min(source['size'], _TAIL_BYTES))
+        if hashlib.sha1(tail).hexdigest() != source.get('tail'):
+            raise ValueError("Source file was rewritten")
+        data = f.read()
+
+    frame = _parse_rows(data, meta['columns'])
+    if len(frame):
+        dates = np.load(os.path.join(path, _DATES), mmap_mode='r')
+        prices = np.load(os.path.join(path, _PRICES), mmap_mode='r')
+        if len(dates) and frame.index[0] <= pd.Timestamp(dates[-1]):
+            raise ValueError("New rows must come after the last stored date")
+        new_dates = frame.index.values.astype(dates.dtype)
+        block = frame.to_numpy(dtype=np.float64)
+        last_valid = _from_json(meta.get('last_valid'))
+        prev_row = np.array(prices[-1]) if len(prices) else None
+        del dates, prices
+
+        returns, keep = _block_returns(block, last_valid, prev_row)
+        _append_npy(os.path.join(path, _PRICES), block, meta['rows'])
+        _append_npy(os.path.join(path, _DATES), new_dates, meta['rows'])
+        _append_npy(os.path.join(path, _RETURNS), returns, meta['return_rows'])
+        _append_npy(
+            os.path.join(path, _RETURN_DATES), new_dates[keep], meta['return_rows']
+        )
+        meta['rows'] += len(block)
+        meta['return_rows'] += len(returns)
+        meta['last_valid'] = _to_json(_last_valid(block, last_valid))
+
+    meta['source'] = _source_meta(csv_path)
+    _write_meta(path, meta)
+    return len(frame)
+
+
+def sync(csv_path: str, path: Optional[str] = None) -> str:
+    """
+    Bring the columnar copy of ``csv_path`` up to date.
+
+    Rows appended to the CSV are added incrementally; any other change
+    rewrites the copy. Concurrent callers (e.g. several app workers) are
+    serialised with a lock file next to the copy.
+
+    Returns:
+        'fresh', 'appended' or 'written'
+    """
+    path = path or columnar_path(csv_path)
+    if is_fresh(path, csv_path):
+        return 'fresh'
+    with _locked(path):
+        if is_fresh(path, csv_path):
+            return 'fresh'
+        if is_columnar(path):
+            try:
+                append_csv(path, csv_path)
+                return 'appended'
+            except ValueError:
+                pass
+        ingest(csv_path, path)
+        return 'written'
+
+
+def _parse_rows(data: bytes, columns: List[str]) -> pd.DataFrame:
+    """Parse header-less CSV rows into a prepared price frame."""
+    from src.data.loader import PortfolioDataLoader
+
+    if not data.strip():
+        return pd.DataFrame(columns=columns, dtype=np.float64)
+    df = pd.read_csv(io.BytesIO(data), header=None)
+    if df.shape[1] != len(columns) + 1:
+        raise ValueError(
+            f"Expected {len(columns) + 1} fields per row, got {df.shape[1]}"
+        )
+    df.columns = ['Date'] + list(columns)
+    return PortfolioDataLoader.prepare_frame(df)
+
+
+def _append_npy(path: str, rows: np.ndarray, n_rows: int) -> None:
+    """
+    Grow a row-major .npy file from ``n_rows`` rows by ``rows`` in place.
+
+    Anything past ``n_rows`` (left by an interrupted append) is discarded
+    first. numpy pads headers so the row count can grow without moving the
+    data; if it cannot, ValueError is raised.
+    """
+    with open(path, 'r+b') as f:
+        version = np.lib.format.read_magic(f)
+        if version not in _NPY_HEADERS:
+            raise ValueError(f"{path} has an unsupported .npy version")
+        read_header, write_header = _NPY_HEADERS[version]
+        shape, fortran_order, dtype = read_header(f)
+        if fortran_order or len(shape) == 0:
+            raise ValueError(f"{path} cannot be appended to")
+        header_len = f.tell()
+        row_bytes = dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64))
+
+        header = io.BytesIO()
+        write_header(
+            header,
+            {
+                'descr': np.lib.format.dtype_to_descr(dtype),
+                'fortran_order': False,
+                'shape': (n_rows + len(rows),) + tuple(shape[1:]),
+            },
+        )
+        if len(header.getvalue()) != header_len:
+            raise ValueError(f"{path} header cannot grow in place")
+
+        f.truncate(header_len + n_rows * row_bytes)
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(rows, dtype=dtype).tobytes())
+        f.flush()
+        f.seek(0)
+        f.write(header.getvalue())
+
+
+def read_columnar(path: str, mmap: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Load (prices, returns) frames from a columnar directory.
+
+    With ``mmap`` the frames are read-only views over the files, so every
+    process mapping the same dataset shares one copy in the page cache.
+    """
+    meta = _read_meta(path)
+    if meta.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format version in {path}")
+    mode = 'r' if mmap else None
+    columns = pd.Index(meta['columns'])
+
+    def frame(values_file: str, dates_file: str) -> pd.DataFrame:
+        values = np.load(os.path.join(path, values_file), mmap_mode=mode)
+        dates = pd.DatetimeIndex(np.load(os.path.join(path, dates_file)), name='Date')
+        return pd.DataFrame(values, index=dates, columns=columns, copy=False)
+
+    return frame(_PRICES, _DATES), frame(_RETURNS, _RETURN_DATES)
+
+
+def ingest(csv_path: str, path: Optional[str] = None) -> str:
+    """Parse and validate a CSV once and write its columnar copy."""
+    from src.data.loader import PortfolioDataLoader
+
+    df = PortfolioDataLoader.prepare_frame(pd.read_csv(csv_path))
+    return write_columnar(df, path or columnar_path(csv_path), source=csv_path)
+
+
+def _read_meta(path: str) -> dict:
+    with open(os.path.join(path, _META)) as f:
+        return json.load(f)
+
+
+def _write_meta(path: str, meta: dict) -> None:
+    tmp_path = os.path.join(path, f'{_META}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(path, _META))
+
+
+def _source_meta(csv_path: str) -> dict:
+    """Size, mtime and a hash of the last bytes of the source CSV."""
+    stat = os.stat(csv_path)
+    with open(csv_path, 'rb') as f:
+        f.seek(max(stat.st_size - _TAIL_BYTES, 0))
+        tail = f.read(min(stat.st_size, _TAIL_BYTES))
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'tail': hashlib.sha1(tail).hexdigest(),
+    }
+
+
+def _to_json(values: Optional[np.ndarray]) -> Optional[list]:
+    if values is None:
+        return None
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def _from_json(values: Optional[list]) -> Optional[np.ndarray]:
+    if values is None:
+        return None
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+@contextlib.contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """Exclusive inter-process lock on ``<path>.lock``."""
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Convert portfolio CSVs to the columnar format, or append the rows "
+        "added since the last conversion."
+    )
+    parser.add_argument('csv', nargs='+', help="CSV files with a Date column")
+    parser.add_argument('-o', '--output', help="Output directory (single input only)")
+    args = parser.parse_args(argv)
+    if args.output and len(args.csv) > 1:
+        parser.error("--output can only be used with a single CSV")
+
+    for csv_path in args.csv:
+        path = args.output or columnar_path(csv_path)
+        print(f"{path}: {sync(csv_path, path)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,34 @@ import pandas as pd
 import numpy as np
 import io
 import base64
-from typing import Tuple, Dict, List, Optional, Union
+import hashlib
+from typing import Tuple, Dict, List, Mapping, Optional, Sequence
+
+from src.analytics.periods import asset_period_returns, portfolio_period_returns
+from src.data.columnar import (
+    columnar_path,
+    generation,
+    is_columnar,
+    read_columnar,
+    sync,
+)
+from src.data.pipeline import ReturnsPipeline, Weights
+from src.telemetry.registry import telemetry
+
+
+def decode_upload(contents: str, filename: str) -> Tuple[str, bytes]:
+    """
+    Decode a dcc.Upload payload once.
+
+    Returns:
+        Tuple of (sha256 digest of the decoded bytes, decoded bytes)
+    """
+    if not filename or not filename.endswith('.csv'):
+        raise ValueError("Please upload a CSV file")
+    content_type, content_string = contents.split(',', 1)
+    decoded = base64.b64decode(content_string)
+    return hashlib.sha256(decoded).hexdigest(), decoded
+
 
 class PortfolioDataLoader:
     def __init__(self, file_path: Optional[str] = None):
@@ -10,13 +37,39 @@ class PortfolioDataLoader:
         self.df = None
         self.returns = None
         self._weights = None
+        self._pipeline = None
+        self._columnar = None
+        self._generation = None
+        self._frame_nbytes = None
+
+    def __getstate__(self) -> dict:
+        # Memoized figures are cheap to rebuild and expensive to pickle
+        state = self.__dict__.copy()
+        state['_pipeline'] = None
+        if self._columnar is not None:
+            # Memory-mapped frames are re-mapped on unpickle instead of copied
+            state['df'] = state['returns'] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.__dict__.setdefault('_generation', None)
+        self.__dict__.setdefault('_frame_nbytes', None)
+        if self._columnar is not None and self.df is None:
+            try:
+                self.df, self.returns = read_columnar(self._columnar)
+            except (OSError, ValueError):
+                # Copy written by an older format: rebuild it from the source
+                if not self.file_path:
+                    raise
+                self.load_data()
 
     @property
-    def weights(self) -> List[float]:
+    def weights(self) -> Weights:
         """Get current portfolio weights."""
         return self._weights
 
-    def set_weights(self, weights: Optional[List[float]] = None) -> None:
+    def set_weights(self, weights: Optional[Weights] = None) -> None:
         """Set portfolio weights, validating they sum to 1."""
         if weights is None:
             # Default equal weights if none provided
@@ -24,10 +77,24 @@ class PortfolioDataLoader:
             n_assets = len(self.df.columns)
             self._weights = [1/n_assets] * n_assets
         else:
-            # Validate weights
-            if abs(sum(weights) - 1.0) > 1e-6:
-                raise ValueError("Weights must sum to 1")
-            self._weights = weights
+            self._weights = self.validate_weights(weights)
+
+    @staticmethod
+    def validate_weights(weights: Weights) -> Weights:
+        """
+        Validate that weights sum to 1 and return them as floats.
+
+        Sparse holdings ({asset: weight}) come back without their zero entries.
+        """
+        if isinstance(weights, Mapping):
+            weights = {name: float(w) for name, w in weights.items() if float(w) != 0}
+            total = sum(weights.values())
+        else:
+            weights = [float(w) for w in weights]
+            total = sum(weights)
+        if abs(total - 1.0) > 1e-6:
+            raise ValueError("Weights must sum to 1")
+        return weights
 
     def load_data(self, contents: Optional[str] = None, filename: Optional[str] = None) -> pd.DataFrame:
         """
@@ -40,52 +107,225 @@ class PortfolioDataLoader:
         try:
             if contents is not None:
                 # Handle uploaded file
-                content_type, content_string = contents.split(',')
-                decoded = base64.b64decode(content_string)
-                
-                if filename.endswith('.csv'):
-                    self.df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-                else:
-                    raise ValueError("Please upload a CSV file")
+                _, decoded = decode_upload(contents, filename)
+                return self.load_bytes(decoded)
             elif self.file_path:
-                # Load from file path
-                self.df = pd.read_csv(self.file_path)
+                # Load from file path, via its memory-mapped columnar copy
+                if is_columnar(self.file_path):
+                    return self.load_columnar(self.file_path)
+                path = columnar_path(self.file_path)
+                try:
+                    with telemetry.span('columnar_sync'):
+                        telemetry.count(
+                            'columnar_sync_total', result=sync(self.file_path, path)
+                        )
+                except OSError:
+                    # Read-only data directory: keep the parsed frame
+                    with telemetry.span('parse_csv', source='file'):
+                        df = self.prepare_frame(pd.read_csv(self.file_path))
+                    return self._set_frame(df)
+                return self.load_columnar(path)
             else:
                 raise ValueError("No data source provided")
-
-            # Process the data
-            if 'Date' not in self.df.columns:
-                raise ValueError("CSV must contain a 'Date' column")
-
-            self.df['Date'] = pd.to_datetime(self.df['Date'], format='%Y%m%d')
-            self.df.set_index(['Date'], inplace=True)
-            
-            # Set equal weights if not already set
-            if self._weights is None:
-                self.set_weights()
-                
-            return self.df
-            
         except Exception as e:
             raise ValueError(f"Error loading data: {str(e)}")
 
-    def calculate_returns(self) -> Tuple[pd.DataFrame, pd.Series]:
-        """Calculate portfolio returns and statistics."""
-        if self.df is None:
-            self.load_data()
-        
-        self.returns = self.df.pct_change().dropna()
-        weighted_returns = self.returns * self._weights
-        port_ret = weighted_returns.sum(axis=1)
-        
-        return self.returns, port_ret
+    def load_bytes(self, raw: bytes) -> pd.DataFrame:
+        """
+        Parse, validate and load raw CSV bytes in a single pass.
+
+        Raises:
+            ValueError: with a user-facing message if the CSV is invalid
+        """
+        # Parse straight from the bytes buffer so no decoded str copy is made
+        telemetry.observe('upload_bytes', len(raw))
+        with telemetry.span('parse_csv', source='upload'):
+            df = self.prepare_frame(pd.read_csv(io.BytesIO(raw)))
+        return self._set_frame(df)
+
+    def load_columnar(self, path: str) -> pd.DataFrame:
+        """Memory-map a dataset written by src.data.columnar (prices and returns)."""
+        write_id = generation(path)[0]
+        with telemetry.span('load_columnar'):
+            df, returns = read_columnar(path)
+        self._set_frame(df)
+        self.returns = returns
+        self._columnar = path
+        self._generation = write_id
+        return self.df
+
+    def refresh(self) -> int:
+        """
+        Pick up rows appended to the source since the data was loaded.
+
+        New CSV rows are appended to the columnar copy, and only those rows
+        are fed to the pipeline, so memoized products are extended rather
+        than rebuilt. A rewritten source is reloaded in full. Loaders not
+        backed by a columnar copy are left as they are.
+
+        Returns:
+            Number of new return rows (all of them after a full reload)
+        """
+        if self._columnar is None:
+            return 0
+        if self.file_path and not is_columnar(self.file_path):
+            with telemetry.span('columnar_sync'):
+                telemetry.count(
+                    'columnar_sync_total', result=sync(self.file_path, self._columnar)
+                )
+
+        write_id, n_rows = generation(self._columnar)
+        if write_id != self._generation:
+            self.load_columnar(self._columnar)
+            return len(self.returns)
+        n_old = len(self.returns)
+        if n_rows == n_old:
+            return 0
+
+        with telemetry.span('append_rows'):
+            self.df, self.returns = read_columnar(self._columnar)
+            if self._pipeline is not None:
+                # The re-mapped file becomes the matrix, so workers keep
+                # sharing it through the page cache rather than copying it
+                self._pipeline.append(
+                    self.returns.iloc[n_old:], self.returns.to_numpy()
+                )
+        telemetry.count('appended_rows_total', n_rows - n_old)
+        return n_rows - n_old
+
+    @staticmethod
+    def prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Validate a freshly parsed frame and index it by its typed Date column."""
+        if 'Date' not in df.columns:
+            raise ValueError("CSV must contain a 'Date' column")
+
+        try:
+            dates = pd.to_datetime(df['Date'], format='%Y%m%d')
+        except (ValueError, TypeError):
+            raise ValueError("Date column must be in YYYYMMDD format")
+
+        non_numeric = [
+            col
+            for col, dtype in df.dtypes.items()
+            if col != 'Date' and dtype.kind not in 'if'
+        ]
+        if non_numeric:
+            raise ValueError(f"Columns must be numeric: {', '.join(non_numeric)}")
+
+        return df.drop(columns='Date').set_index(pd.DatetimeIndex(dates, name='Date'))
+
+    def _set_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        self.df = df
+        self.returns = None
+        self._pipeline = None
+        self._columnar = None
+        self._generation = None
+        if self._weights is not None and len(self._weights) != len(self.df.columns):
+            self._weights = None
+
+        # Set equal weights if not already set
+        if self._weights is None:
+            self.set_weights()
+
+        return self.df
+
+    def calculate_returns(
+        self, weights: Optional[Weights] = None
+    ) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Calculate portfolio returns and statistics.
+
+        Args:
+            weights: Optional weights to use instead of the stored ones. They
+                are not persisted, so a shared loader can serve many sessions.
+        """
+        pipeline = self.pipeline
+        if weights is None:
+            weights = self._weights
+        return self.returns, pipeline.portfolio_returns(weights)
+
+    @property
+    def pipeline(self) -> ReturnsPipeline:
+        """Weight-only recomputation pipeline over the cached return matrix."""
+        if self._pipeline is None:
+            if self.df is None:
+                self.load_data()
+            if self.returns is None:
+                with telemetry.span('pct_change'):
+                    self.returns = self.df.pct_change().dropna()
+            self._pipeline = ReturnsPipeline(self.returns)
+        return self._pipeline
+
+    def period_returns(
+        self, freq: str, weights: Optional[Weights] = None
+    ) -> pd.DataFrame:
+        """
+        Portfolio and asset returns compounded per period.
+
+        The asset table for each frequency ('W', 'M', 'Q' or 'Y') is built
+        once per dataset and extended when rows are appended.
+        """
+        pipeline = self.pipeline
+        if weights is None:
+            weights = self._weights
+        return pd.concat(
+            [
+                portfolio_period_returns(pipeline, weights, freq),
+                asset_period_returns(pipeline, freq),
+            ],
+            axis=1,
+        )
+
+    def return_history(self, columns: Optional[Sequence[int]] = None) -> pd.DataFrame:
+        """
+        Returns over the whole price history of ``columns`` (every asset when None).
+
+        Unlike ``returns``, rows where some asset has no price yet are kept,
+        with NaN for that asset, so pairwise statistics can use each pair's
+        full overlap.
+        """
+        self.df = self.df if self.df is not None else self.load_data()
+        prices = self.df if columns is None else self.df.iloc[:, list(columns)]
+        returns = prices.pct_change().iloc[1:]
+        return returns[returns.notna().any(axis=1)]
 
     @property
     def portfolio_weights(self) -> Dict[str, float]:
         """Return portfolio weights as a dictionary."""
         self.df = self.df if self.df is not None else self.load_data()
+        if isinstance(self._weights, Mapping):
+            return dict(self._weights)
         return dict(zip(self.df.columns, self._weights))
 
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the frames, the return matrix and its products."""
+        frames = [frame for frame in (self.df, self.returns) if frame is not None]
+        key = tuple((id(frame), frame.shape) for frame in frames)
+        if self._frame_nbytes is None or self._frame_nbytes[0] != key:
+            # Columns are numeric, so dtype sizes are exact; measured once per
+            # frame, since the dataset store re-checks sizes on every read
+            size = sum(
+                len(frame) * sum(dtype.itemsize for dtype in frame.dtypes)
+                + frame.index.nbytes
+                for frame in frames
+            )
+            self._frame_nbytes = (key, size)
+        total = self._frame_nbytes[1]
+        if self._pipeline is not None:
+            total += self._pipeline.nbytes
+        return total
+
+    @property
+    def version(self) -> Tuple[Optional[str], int]:
+        """
+        Changes whenever the data does: the columnar write id and row count.
+
+        Rows appended by ``refresh`` change the count; a rewritten source
+        changes the write id.
+        """
+        return self._generation, 0 if self.df is None else len(self.df)
+
     @property
     def asset_names(self) -> List[str]:
         """Get list of asset names."""
@@ -100,29 +340,11 @@ class PortfolioDataLoader:
             Tuple of (is_valid, error_message)
         """
         try:
-            content_type, content_string = contents.split(',')
-            decoded = base64.b64decode(content_string)
-            
-            if not filename.endswith('.csv'):
-                return False, "Please upload a CSV file"
-                
-            df = pd.read_csv(io.StringIO(decoded.decode('utf-8')))
-            
-            if 'Date' not in df.columns:
-                return False, "CSV must contain a 'Date' column"
-                
-            # Try parsing dates
-            try:
-                pd.to_datetime(df['Date'], format='%Y%m%d')
-            except:
-                return False, "Date column must be in YYYYMMDD format"
-                
-            # Check for numeric columns (excluding Date)
-            non_numeric = df.drop('Date', axis=1).select_dtypes(exclude=['float64', 'int64']).columns
-            if len(non_numeric) > 0:
-                return False, f"Columns must be numeric: {', '.join(non_numeric)}"
-                
+            _, decoded = decode_upload(contents, filename)
+            with telemetry.span('validate_csv'):
+                self.prepare_frame(pd.read_csv(io.BytesIO(decoded)))
             return True, ""
-            
+        except ValueError as e:
+            return False, str(e)
         except Exception as e:
             return False, f"Error validating CSV: {str(e)}"
@@ -0,0 +1,342 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.telemetry.registry import telemetry
+
+# Extends a memoized product for appended rows: (value, new return rows) -> value
+Extender = Callable[[Any, np.ndarray], Any]
+
+# Dense weights (one per asset) or sparse holdings ({asset: weight}, zeros omitted)
+Weights = Union[Sequence[float], Mapping[str, float]]
+# Normalised holdings: ((column, weight), ...) for the non-zero weights
+WeightsKey = Tuple[Tuple[int, float], ...]
+
+# Figure trace properties holding per-point data, the bulk of a figure's size
+_TRACE_ARRAYS = ('x', 'y', 'z', 'text', 'customdata')
+
+
+class GrowableArray:
+    """Array with spare capacity along axis 0, so appends cost O(new rows) amortized."""
+
+    def __init__(self, values: np.ndarray):
+        # The initial array (possibly a read-only memory map) is only copied
+        # on the first append
+        self._buffer = values
+        self._size = len(values)
+        self._owned = False
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._buffer[: self._size]
+
+    def append(
+        self, rows: np.ndarray, values: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Append ``rows`` and return a view of every row.
+
+        ``values``, when given, already holds every row after the append
+        (e.g. a memory map re-opened after its file grew) and becomes the
+        buffer instead of a copy.
+        """
+        needed = self._size + len(rows)
+        if values is not None:
+            if len(values) != needed:
+                raise ValueError(f"Expected {needed} rows, got {len(values)}")
+            self._buffer, self._size, self._owned = values, needed, False
+            return self.values
+        if not self._owned or needed > len(self._buffer):
+            capacity = max(needed, 2 * len(self._buffer), 16)
+            buffer = np.empty(
+                (capacity,) + self._buffer.shape[1:], dtype=self._buffer.dtype
+            )
+            buffer[: self._size] = self._buffer[: self._size]
+            self._buffer, self._owned = buffer, True
+        # Views handed out earlier end at their own length, so they never see these rows
+        self._buffer[self._size : needed] = rows
+        self._size = needed
+        return self.values
+
+
+class ReturnsPipeline:
+    """
+    Weight-dependent stages on top of a dataset's cached asset return matrix.
+
+    The return matrix is computed once per dataset and kept as a contiguous
+    float64 array, so a weight change only costs one matrix-vector product.
+    Every downstream product (metrics, figures, ...) is memoized on
+    (stage, weights) and evicted least-recently-used past ``max_entries``.
+    Weights may be dense or sparse; either way only the held columns enter
+    the product, so a few holdings in a wide universe stay cheap.
+
+    New rows can be appended in place; products registered with an extender
+    are brought up to date from the new rows only, the rest are dropped and
+    rebuilt on their next use.
+    """
+
+    def __init__(self, returns: pd.DataFrame, max_entries: int = 128):
+        self.asset_names = list(returns.columns)
+        self._positions = {name: i for i, name in enumerate(self.asset_names)}
+        self._rows = GrowableArray(
+            np.ascontiguousarray(returns.to_numpy(dtype=np.float64))
+        )
+        self._dates = GrowableArray(returns.index.values)
+        self.index = returns.index
+        self.matrix = self._rows.values
+        self.max_entries = max_entries
+        self._memo: "OrderedDict[Tuple[Hashable, ...], Any]" = OrderedDict()
+        self._extenders: "dict[Tuple[Hashable, ...], Extender]" = {}
+        self._sizes: "dict[Tuple[Hashable, ...], int]" = {}
+        self._memo_nbytes = 0
+        self._version = 0
+        self._lock = threading.RLock()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the return matrix and the memoized products."""
+        return int(self.matrix.nbytes) + self._memo_nbytes
+
+    def weights_key(self, weights: Union[Weights, WeightsKey]) -> WeightsKey:
+        """Normalise dense or sparse weights (or an existing key) into a memo key."""
+        if isinstance(weights, tuple) and weights and isinstance(weights[0], tuple):
+            return weights
+        if isinstance(weights, Mapping):
+            unknown = [name for name in weights if name not in self._positions]
+            if unknown:
+                raise ValueError(f"Unknown assets: {', '.join(map(str, unknown[:5]))}")
+            pairs = ((self._positions[name], w) for name, w in weights.items())
+        else:
+            if len(weights) != self.matrix.shape[1]:
+                raise ValueError(
+                    f"Expected {self.matrix.shape[1]} weights, got {len(weights)}"
+                )
+            pairs = enumerate(weights)
+        rounded = ((i, round(float(w), 12)) for i, w in pairs)
+        return tuple(sorted((i, w) for i, w in rounded if w != 0))
+
+    def holdings(
+        self, weights: Union[Weights, WeightsKey]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(column positions, weights) of the non-zero holdings."""
+        key = self.weights_key(weights)
+        columns = np.fromiter((i for i, _ in key), dtype=np.int64, count=len(key))
+        return columns, np.fromiter(
+            (w for _, w in key), dtype=np.float64, count=len(key)
+        )
+
+    def dense_weights(self, weights: Union[Weights, WeightsKey]) -> np.ndarray:
+        """One weight per asset, zeros included."""
+        columns, w = self.holdings(weights)
+        dense = np.zeros(self.matrix.shape[1])
+        dense[columns] = w
+        return dense
+
+    def portfolio_returns(self, weights: Union[Weights, WeightsKey]) -> pd.Series:
+        """Weighted portfolio return series for ``weights``, from held columns only."""
+        key = self.weights_key(weights)
+        columns, w = self.holdings(key)
+        if len(columns) * 2 > self.matrix.shape[1]:
+            # Gathering the held columns only pays off for a sparse portfolio
+            w, columns = self.dense_weights(key), slice(None)
+        values = []
+
+        def build():
+            values.append(GrowableArray(self.matrix[:, columns] @ w))
+            return pd.Series(values[0].values, index=self.index, copy=False)
+
+        def extend(_, rows):
+            return pd.Series(
+                values[0].append(rows[:, columns] @ w), index=self.index, copy=False
+            )
+
+        return self._memoized(('port_ret', key), build, extend)
+
+    def asset_returns(self, name: str) -> pd.Series:
+        """Return series of a single asset column."""
+        return pd.Series(
+            self.matrix[:, self.asset_names.index(name)],
+            index=self.index,
+            name=name,
+            copy=False,
+        )
+
+    def memoize(
+        self,
+        stage: Hashable,
+        weights: Union[Weights, WeightsKey],
+        builder: Callable[[pd.Series], Any],
+        extend: Optional[Callable[[Any, pd.Series, int], Any]] = None,
+    ) -> Any:
+        """
+        Return the cached product of ``stage`` for ``weights``.
+
+        Args:
+            stage: Name of the downstream product (e.g. a chart title)
+            weights: Portfolio weights the product depends on
+            builder: Called with the portfolio return series on a miss
+            extend: Optional ``(value, port_ret, n_new) -> value`` that updates
+                the product after ``n_new`` rows were appended; without it
+                the product is dropped on append
+        """
+        key = self.weights_key(weights)
+        extender = (
+            None
+            if extend is None
+            else (
+                lambda value, rows: extend(
+                    value, self.portfolio_returns(key), len(rows)
+                )
+            )
+        )
+        return self._memoized(
+            (stage, key), lambda: builder(self.portfolio_returns(key)), extender
+        )
+
+    def cached(
+        self,
+        stage: Hashable,
+        builder: Callable[[], Any],
+        extend: Optional[Extender] = None,
+    ) -> Any:
+        """
+        Return a cached dataset-level product that does not depend on weights.
+
+        ``extend(value, rows)`` updates the product when return rows are
+        appended; without it the product is dropped on append.
+        """
+        return self._memoized((stage,), builder, extend)
+
+    def append(
+        self, returns: pd.DataFrame, matrix: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Append return rows dated after the current index.
+
+        The matrix grows in place and extendable products are updated from
+        the new rows, so the cost does not depend on the history length.
+        ``matrix`` may hold every row after the append, e.g. the re-mapped
+        columnar file the rows were appended to; it is then used as the
+        matrix instead of copying the old rows into a private buffer.
+        """
+        if list(returns.columns) != self.asset_names:
+            raise ValueError("Appended returns must have the same assets")
+        if not len(returns):
+            return
+        if len(self.index) and returns.index[0] <= self.index[-1]:
+            raise ValueError("Appended returns must come after the last date")
+        rows = np.ascontiguousarray(returns.to_numpy(dtype=np.float64))
+
+        if matrix is not None:
+            matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+            if matrix.shape[1:] != self.matrix.shape[1:]:
+                raise ValueError("Appended returns must have the same assets")
+            rows = matrix[len(self.matrix) :]
+
+        with self._lock:
+            self.matrix = self._rows.append(rows, matrix)
+            self.index = pd.DatetimeIndex(
+                self._dates.append(returns.index.values),
+                name=self.index.name,
+                copy=False,
+            )
+            self._version += 1
+            # Portfolio returns first: the other extenders read them
+            keys = sorted(self._memo, key=lambda k: k[0] != 'port_ret')
+            for key in keys:
+                if key not in self._memo:
+                    continue
+                extend = self._extenders.get(key)
+                if extend is None:
+                    self._drop(key)
+                else:
+                    self._store(key, extend(self._memo[key], rows))
+
+    def clear(self) -> None:
+        """Drop every memoized product."""
+        with self._lock:
+            self._memo.clear()
+            self._extenders.clear()
+            self._sizes.clear()
+            self._memo_nbytes = 0
+
+    def _store(self, key: Tuple[Hashable, ...], value: Any) -> None:
+        self._memo[key] = value
+        size = _estimate_nbytes(value)
+        self._memo_nbytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+
+    def _drop(self, key: Tuple[Hashable, ...]) -> None:
+        del self._memo[key]
+        self._extenders.pop(key, None)
+        self._memo_nbytes -= self._sizes.pop(key, 0)
+
+    def _memoized(
+        self,
+        key: Tuple[Hashable, ...],
+        build: Callable[[], Any],
+        extend: Optional[Extender] = None,
+    ) -> Any:
+        stage = key[0][0] if isinstance(key[0], tuple) else key[0]
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                telemetry.cache('pipeline', True, stage=str(stage))
+                return self._memo[key]
+            version = self._version
+        telemetry.cache('pipeline', False, stage=str(stage))
+        value = build()
+        with self._lock:
+            if version != self._version:
+                # Rows were appended while building; the value is already stale
+                return value
+            self._store(key, value)
+            if extend is not None:
+                self._extenders[key] = extend
+            while len(self._memo) > self.max_entries:
+                self._drop(next(iter(self._memo)))
+        return value
+
+
+def _estimate_nbytes(value: Any, depth: int = 4) -> int:
+    """
+    Best-effort memory held by a memoized product, counted from the arrays
+    it holds: frames and series, figure trace data, and the fields of
+    result objects and containers (``depth`` levels down).
+    """
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (pd.Series, pd.DataFrame, pd.Index)):
+        usage = value.memory_usage(deep=False)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if depth == 0 or value is None or callable(value):
+        return 0
+    if hasattr(value, 'to_plotly_json') and hasattr(value, 'data'):
+        # A plotly figure: the per-point trace arrays (table cells included)
+        total = 0
+        for trace in value.data:
+            for name in _TRACE_ARRAYS:
+                total += _estimate_nbytes(getattr(trace, name, None), depth - 1)
+            cells = getattr(trace, 'cells', None)
+            if cells is not None:
+                total += _estimate_nbytes(cells.values, depth - 1)
+        return total
+    if isinstance(value, Mapping):
+        return sum(_estimate_nbytes(v, depth - 1) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return sys.getsizeof(value)
+        if isinstance(value[0], (bool, int, float, str)):
+            # Scalars (e.g. figure data kept as a list): sized from the first
+            return sys.getsizeof(value) + len(value) * sys.getsizeof(value[0])
+        return sum(_estimate_nbytes(v, depth - 1) for v in value)
+    if hasattr(value, '__dict__') and not isinstance(value, ReturnsPipeline):
+        # Result objects (stats, attributions, rolling co-moments, ...)
+        return sum(_estimate_nbytes(v, depth - 1) for v in vars(value).values())
+    return 0
@@ -0,0 +1,246 @@
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from src.telemetry.registry import telemetry
+
+
+class DatasetStore:
+    """
+    Bounded, thread-safe store for parsed datasets keyed by session/upload hash.
+
+    Entries are evicted least-recently-used first once ``max_items`` or
+    ``max_bytes`` is exceeded, and expire ``ttl`` seconds after their last
+    access. Sizes are re-measured whenever an entry is read, since a loader
+    grows as products are memoized on its pipeline.
+
+    When ``spill_dir`` is set every entry is also pickled to disk so that
+    other worker processes sharing the directory can serve it; companion
+    files named ``<key>.*`` there (e.g. a columnar copy) expire with it.
+    Spilled entries outlive in-process eviction and are deleted once no
+    worker has read them for ``ttl`` seconds: on expiry, and by a sweep of
+    the directory whenever a new entry is spilled.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 32,
+        ttl: Optional[float] = 3600,
+        max_bytes: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+    ):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.RLock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            self._expire()
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire()
+            return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the in-process entries."""
+        return self._nbytes
+
+    def get(self, key: str) -> Any:
+        """Return the value stored under ``key`` or None if missing/expired."""
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['atime'] = time.monotonic()
+                if self._stale(entry['touched'], entry['atime']):
+                    # Keep the spill file fresh for the other workers' sweeps
+                    self._touch_spill(key)
+                    entry['touched'] = entry['atime']
+                self._entries.move_to_end(key)
+                size = _estimate_nbytes(entry['value'])
+                self._nbytes += size - entry['nbytes']
+                entry['nbytes'] = size
+                self._evict()
+                telemetry.cache('dataset_store', True, tier='memory')
+                return entry['value']
+
+        with telemetry.span('read_spill'):
+            value = self._read_spill(key)
+        telemetry.cache('dataset_store', value is not None, tier='spill')
+        if value is not None:
+            self.put(key, value, spill=False)
+        return value
+
+    def put(self, key: str, value: Any, spill: bool = True) -> None:
+        """Store ``value`` under ``key`` and evict entries over budget."""
+        size = _estimate_nbytes(value)
+        now = time.monotonic()
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = {
+                'value': value,
+                'nbytes': size,
+                'atime': now,
+                'touched': now,
+            }
+            self._nbytes += size
+            self._evict()
+        if spill:
+            self._write_spill(key, value)
+            self._sweep_spill()
+
+    def get_or_create(self, key: str, factory: Callable[[], Any]) -> Any:
+        """Return the value under ``key``, building it with ``factory`` on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def pop(self, key: str) -> Any:
+        """Remove ``key`` from memory and disk, returning its value if present."""
+        with self._lock:
+            entry = self._discard(key)
+        self._remove_spill(key)
+        return entry['value'] if entry else None
+
+    def clear(self) -> None:
+        """Drop every in-process entry (spilled files are left in place)."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def _discard(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._nbytes -= entry['nbytes']
+        return entry
+
+    def _expire(self) -> None:
+        if self.ttl is None:
+            return
+        cutoff = time.monotonic() - self.ttl
+        for key in [k for k, e in self._entries.items() if e['atime'] < cutoff]:
+            self._discard(key)
+            path = self._spill_path(key)
+            # Another worker may still be serving the entry from the same file
+            if path is not None and self._spill_expired(path):
+                self._remove_spill(key)
+
+    def _evict(self) -> None:
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_items
+            or (self.max_bytes is not None and self._nbytes > self.max_bytes)
+        ):
+            self._discard(next(iter(self._entries)))
+
+    def _stale(self, touched: float, now: float) -> bool:
+        return (
+            bool(self.spill_dir)
+            and self.ttl is not None
+            and now - touched > self.ttl / 2
+        )
+
+    def _spill_expired(self, path: str) -> bool:
+        try:
+            return time.time() - os.path.getmtime(path) > self.ttl
+        except OSError:
+            return False
+
+    def _spill_path(self, key: str) -> Optional[str]:
+        if not self.spill_dir:
+            return None
+        return os.path.join(self.spill_dir, f"{key}.pkl")
+
+    def _write_spill(self, key: str, value: Any) -> None:
+        path = self._spill_path(key)
+        if path is None:
+            return
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def _touch_spill(self, key: str) -> None:
+        try:
+            os.utime(self._spill_path(key))
+        except OSError:
+            pass
+
+    def _remove_spill(self, key: str) -> None:
+        if not self.spill_dir:
+            return
+        for name in os.listdir(self.spill_dir):
+            if name.startswith(f"{key}."):
+                path = os.path.join(self.spill_dir, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def _sweep_spill(self) -> None:
+        """Delete spilled entries, with their companions, not read for ``ttl``."""
+        if not self.spill_dir or self.ttl is None:
+            return
+        cutoff = time.time() - self.ttl
+        newest: Dict[str, float] = {}
+        spilled = set()
+        for name in os.listdir(self.spill_dir):
+            key, dot, suffix = name.partition('.')
+            if not dot:
+                continue
+            try:
+                mtime = os.path.getmtime(os.path.join(self.spill_dir, name))
+            except OSError:
+                continue
+            if suffix == 'pkl':
+                # The pickle's mtime is refreshed on every read
+                spilled.add(key)
+                newest[key] = mtime
+            elif key not in spilled:
+                # Companions without a pickle (e.g. an interrupted job)
+                newest[key] = max(mtime, newest.get(key, mtime))
+        for key, mtime in newest.items():
+            if mtime < cutoff:
+                self._remove_spill(key)
+
+    def _read_spill(self, key: str) -> Any:
+        path = self._spill_path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+            self._remove_spill(key)
+            return None
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+            return value
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+            return None
+
+
+def _estimate_nbytes(value: Any) -> int:
+    """Best-effort size of a stored value in bytes."""
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    return 0
@@ -0,0 +1,275 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.data.columnar import write_arrays
+from src.data.loader import PortfolioDataLoader
+
+_STATE = 'state.json'
+_TAIL = 'tail.bin'
+_DATES = 'dates.bin'
+_PRICES = 'prices.bin'
+
+
+class ChunkedUpload:
+    """
+    Incremental CSV ingestion into typed on-disk arrays.
+
+    Chunks of the raw CSV are appended in order; every complete line is
+    validated (Date in YYYYMMDD, numeric prices) and written as int64 dates
+    and row-major float64 prices, while the trailing partial line is carried
+    to the next chunk. All state lives in ``directory``, so consecutive
+    chunks may be handled by different worker processes, and memory use is
+    bounded by the chunk size rather than the file size. Disk use is bounded
+    by ``max_bytes`` per upload and ``max_pending`` uploads under one root.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._state: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def create(
+        cls,
+        root: str,
+        filename: str,
+        size: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ) -> 'ChunkedUpload':
+        """
+        Start a new upload in a fresh directory under ``root``.
+
+        Args:
+            root: Directory shared by the workers receiving chunks
+            filename: Name of the uploaded file
+            size: Declared file size in bytes; more data is refused
+            max_bytes: Largest accepted upload, checked against ``size`` here
+                and against the bytes received with every chunk
+            max_pending: Most uploads that may be in progress under ``root``
+        """
+        if not filename or not filename.endswith('.csv'):
+            raise ValueError("Please upload a CSV file")
+        if size is not None and (not isinstance(size, int) or size < 0):
+            raise ValueError("Invalid file size")
+        if max_bytes is not None and size is not None and size > max_bytes:
+            raise ValueError(_too_large(max_bytes))
+        if (
+            max_pending is not None
+            and os.path.isdir(root)
+            and len(os.listdir(root)) >= max_pending
+        ):
+            raise ValueError("Too many uploads in progress, please try again later")
+        upload = cls(os.path.join(root, uuid.uuid4().hex))
+        os.makedirs(upload.directory)
+        upload._save(
+            {
+                'filename': filename,
+                'columns': None,
+                'chunks': 0,
+                'rows': 0,
+                'bytes': 0,
+                'size': size,
+                'max_bytes': max_bytes,
+                'finished': False,
+            }
+        )
+        return upload
+
+    @classmethod
+    def open(cls, root: str, upload_id: str) -> 'ChunkedUpload':
+        """Reopen an upload started by any worker."""
+        if not upload_id.isalnum():
+            raise ValueError("Unknown upload")
+        upload = cls(os.path.join(root, upload_id))
+        if not os.path.isfile(os.path.join(upload.directory, _STATE)):
+            raise ValueError("Unknown or expired upload")
+        return upload
+
+    @property
+    def id(self) -> str:
+        return os.path.basename(self.directory)
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        if self._state is None:
+            with open(os.path.join(self.directory, _STATE)) as f:
+                self._state = json.load(f)
+        return self._state
+
+    @property
+    def filename(self) -> str:
+        return self.state['filename']
+
+    @property
+    def columns(self) -> List[str]:
+        return self.state['columns'] or []
+
+    @property
+    def rows(self) -> int:
+        return self.state['rows']
+
+    def append(self, index: int, data: bytes) -> int:
+        """
+        Parse and store chunk number ``index``; returns the total rows stored.
+
+        A repeated chunk (a client retry) is ignored; out-of-order chunks raise.
+        An upload growing past its declared size or ``max_bytes`` is removed.
+        """
+        state = self.state
+        if state['finished']:
+            raise ValueError("Upload is already complete")
+        if index == state['chunks'] - 1:
+            return state['rows']
+        if index != state['chunks']:
+            raise ValueError(f"Expected chunk {state['chunks']}, got {index}")
+        received = state.get('bytes', 0) + len(data)
+        if state.get('size') is not None and received > state['size']:
+            self.remove()
+            raise ValueError("Upload is larger than the declared file size")
+        if state.get('max_bytes') is not None and received > state['max_bytes']:
+            self.remove()
+            raise ValueError(_too_large(state['max_bytes']))
+
+        buffer = self._read_tail() + data
+        cut = buffer.rfind(b'\n') + 1
+        self._parse_lines(buffer[:cut])
+        self._write_tail(buffer[cut:])
+        state['chunks'] += 1
+        state['bytes'] = received
+        self._save(state)
+        return state['rows']
+
+    def finish(self) -> int:
+        """Parse the final unterminated line and check the upload has data."""
+        state = self.state
+        if not state['finished']:
+            self._parse_lines(self._read_tail())
+            self._write_tail(b'')
+            if state['columns'] is None:
+                raise ValueError("CSV must contain a 'Date' column")
+            if state['rows'] == 0:
+                raise ValueError("CSV contains no data rows")
+            state['finished'] = True
+            self._save(state)
+        return state['rows']
+
+    def digest(self, block_bytes: int = 1 << 24) -> str:
+        """Content hash of the parsed data, independent of how it was chunked."""
+        h = hashlib.sha256(json.dumps(self.columns).encode())
+        for name in (_DATES, _PRICES):
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                for block in iter(lambda: f.read(block_bytes), b''):
+                    h.update(block)
+        return h.hexdigest()
+
+    def write_columnar(self, path: str) -> str:
+        """Convert the stored arrays to the memory-mappable columnar format."""
+        if not self.state['finished']:
+            raise ValueError("Upload is not complete")
+        shape = (self.rows, len(self.columns) - 1)
+        dates = np.memmap(
+            os.path.join(self.directory, _DATES),
+            dtype='datetime64[ns]',
+            mode='r',
+            shape=(self.rows,),
+        )
+        prices = np.memmap(
+            os.path.join(self.directory, _PRICES),
+            dtype=np.float64,
+            mode='r',
+            shape=shape,
+        )
+        try:
+            return write_arrays(
+                dates, prices, [c for c in self.columns if c != 'Date'], path
+            )
+        finally:
+            del dates, prices
+
+    def remove(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @staticmethod
+    def cleanup(root: str, ttl: float) -> None:
+        """Delete uploads not touched for ``ttl`` seconds."""
+        if not os.path.isdir(root):
+            return
+        cutoff = time.time() - ttl
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(os.path.join(path, _STATE)) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+
+    def _parse_lines(self, lines: bytes) -> None:
+        state = self.state
+        if state['columns'] is None:
+            header_end = lines.find(b'\n')
+            if header_end < 0:
+                if not lines.strip():
+                    return
+                header_end = len(lines)
+            header = pd.read_csv(io.BytesIO(lines[: header_end + 1]), nrows=0).columns
+            if 'Date' not in header:
+                raise ValueError("CSV must contain a 'Date' column")
+            state['columns'] = [str(c) for c in header]
+            lines = lines[header_end + 1 :]
+        if not lines.strip():
+            return
+
+        try:
+            df = pd.read_csv(io.BytesIO(lines), header=None, names=state['columns'])
+            frame = PortfolioDataLoader.prepare_frame(df)
+        except ValueError as e:
+            first = state['rows'] + 2
+            last = first + lines.count(b'\n') - 1
+            raise ValueError(f"{e} (lines {first}-{last})")
+
+        # Drop bytes left by a chunk that failed before its state was saved
+        self._truncate(state['rows'])
+        with open(os.path.join(self.directory, _DATES), 'ab') as f:
+            f.write(frame.index.values.astype('datetime64[ns]').tobytes())
+        with open(os.path.join(self.directory, _PRICES), 'ab') as f:
+            f.write(np.ascontiguousarray(frame.to_numpy(dtype=np.float64)).tobytes())
+        state['rows'] += len(frame)
+
+    def _truncate(self, rows: int) -> None:
+        n_prices = len(self.state['columns']) - 1
+        for name, row_bytes in ((_DATES, 8), (_PRICES, 8 * n_prices)):
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path) and os.path.getsize(path) > rows * row_bytes:
+                os.truncate(path, rows * row_bytes)
+
+    def _read_tail(self) -> bytes:
+        path = os.path.join(self.directory, _TAIL)
+        if not os.path.exists(path):
+            return b''
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _write_tail(self, data: bytes) -> None:
+        with open(os.path.join(self.directory, _TAIL), 'wb') as f:
+            f.write(data)
+
+    def _save(self, state: Dict[str, Any]) -> None:
+        self._state = state
+        path = os.path.join(self.directory, _STATE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+
+def _too_large(max_bytes: int) -> str:
+    return f"File is too large (the limit is {max_bytes / 2**20:.0f} MB)"
@@ -0,0 +1,244 @@
+import hashlib
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import uuid
+from typing import Any, Optional
+
+
+class JobBackend:
+    """
+    Key-value store holding job state, shared with the worker processes.
+
+    Values are arbitrary picklable objects and expire ``ttl`` seconds after
+    they were last written.
+    """
+
+    def __init__(self, ttl: Optional[float] = 3600):
+        self.ttl = ttl
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: Any) -> bool:
+        """Atomically store ``value`` unless ``key`` is set; True if it was stored."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class LocalBackend(JobBackend):
+    """
+    In-memory stand-in served by a multiprocessing manager.
+
+    Visible to the process pool of the owning process only; use DiskBackend
+    or RedisBackend when several server workers must share jobs.
+    """
+
+    def __init__(self, ttl: Optional[float] = 3600):
+        super().__init__(ttl)
+        self._manager = None
+        self._data = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Workers only need the dict proxy, not the manager process handle
+        state = self.__dict__.copy()
+        state['_data'] = self._shared()
+        state['_manager'] = None
+        state['_lock'] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        entry = self._shared().get(key)
+        if entry is None:
+            return None
+        expires, value = entry[:2]
+        if expires is not None and expires < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        self._shared()[key] = (expires, value)
+
+    def add(self, key: str, value: Any) -> bool:
+        self.get(key)
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        # setdefault runs in the manager process, so it is atomic across workers;
+        # the token tells this caller's entry from an equal one stored first
+        token = uuid.uuid4().hex
+        return self._shared().setdefault(key, (expires, value, token))[2:] == (token,)
+
+    def delete(self, key: str) -> None:
+        self._shared().pop(key, None)
+
+    def _shared(self):
+        with self._lock:
+            if self._data is None:
+                self._manager = multiprocessing.Manager()
+                self._data = self._manager.dict()
+            return self._data
+
+
+class DiskBackend(JobBackend):
+    """One pickle file per key in a directory shared by every worker."""
+
+    def __init__(self, directory: str, ttl: Optional[float] = 3600):
+        super().__init__(ttl)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Any:
+        path = self._path(key)
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def add(self, key: str, value: Any) -> bool:
+        self.get(key)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            # link() fails if the key exists, and readers never see a partial file
+            os.link(tmp_path, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _path(self, key: str) -> str:
+        return os.path.join(
+            self.directory, hashlib.sha1(key.encode()).hexdigest() + '.pkl'
+        )
+
+
+class RedisBackend(JobBackend):
+    """
+    Backend for any client exposing Redis ``get``/``set(ex=, nx=)``/``delete``.
+
+    Pass ``url`` to connect with the optional ``redis`` package (the
+    connection is re-opened in each worker), or ``client`` to supply a
+    compatible object directly.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        client: Any = None,
+        ttl: Optional[float] = 3600,
+        prefix: str = 'markolabs:job:',
+    ):
+        super().__init__(ttl)
+        if url is None and client is None:
+            raise ValueError("RedisBackend needs a url or a client")
+        self.url = url
+        self.prefix = prefix
+        self._client = client
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        if self.url is not None:
+            state['_client'] = None
+        return state
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError(
+                    "The redis package is required for a redis:// JOB_BACKEND"
+                ) from e
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def get(self, key: str) -> Any:
+        data = self.client.get(self.prefix + key)
+        return pickle.loads(data) if data is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        ex = int(self.ttl) if self.ttl is not None else None
+        self.client.set(
+            self.prefix + key,
+            pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+            ex=ex,
+        )
+
+    def add(self, key: str, value: Any) -> bool:
+        ex = int(self.ttl) if self.ttl is not None else None
+        return bool(
+            self.client.set(
+                self.prefix + key,
+                pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                ex=ex,
+                nx=True,
+            )
+        )
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+
+def create_backend(
+    spec: str, directory: str, ttl: Optional[float] = 3600, server_workers: int = 1
+) -> JobBackend:
+    """
+    Build a backend from a JOB_BACKEND setting.
+
+    Args:
+        spec: 'local', 'disk' or a redis:// / rediss:// URL
+        directory: Directory used by the disk backend
+        ttl: Seconds job state is kept after its last update
+        server_workers: Server processes that must see the same jobs
+
+    Raises:
+        ValueError: for an unknown spec, or 'local' with several server workers
+    """
+    if spec == 'local':
+        if server_workers > 1:
+            # A job started by one worker would be lost to requests served by another
+            raise ValueError(
+                f"JOB_BACKEND 'local' is private to one process and cannot be "
+                f"shared by {server_workers} server workers; use 'disk' or a "
+                f"redis:// URL"
+            )
+        return LocalBackend(ttl)
+    if spec == 'disk':
+        return DiskBackend(directory, ttl)
+    if spec.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url=spec, ttl=ttl)
+    raise ValueError(f"Unknown job backend: {spec}")
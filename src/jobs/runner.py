@@ -0,0 +1,230 @@
+import hashlib
+import pickle
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from src.jobs.backends import JobBackend, LocalBackend
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+ACTIVE = (QUEUED, RUNNING)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once cancellation has been requested."""
+
+
+@dataclass(frozen=True)
+class JobState:
+    """Snapshot of a job as stored in the backend."""
+
+    id: str
+    status: str = QUEUED
+    progress: float = 0.0
+    message: str = ''
+    result: Any = None
+    error: Optional[str] = None
+    updated: float = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in ACTIVE
+
+
+class JobContext:
+    """Handle passed to a running job for progress reporting and cancellation."""
+
+    def __init__(self, job_id: str, backend: JobBackend):
+        self.job_id = job_id
+        self.backend = backend
+
+    def cancelled(self) -> bool:
+        return bool(self.backend.get(_cancel_key(self.job_id)))
+
+    def progress(self, fraction: float, message: str = '') -> None:
+        """Record progress in [0, 1]; raises JobCancelled if the job was cancelled."""
+        if self.cancelled():
+            raise JobCancelled(self.job_id)
+        state = self.backend.get(self.job_id) or JobState(self.job_id)
+        self.backend.set(
+            self.job_id,
+            replace(
+                state,
+                status=RUNNING,
+                progress=min(max(float(fraction), 0.0), 1.0),
+                message=message,
+                updated=time.time(),
+            ),
+        )
+
+
+class JobRunner:
+    """
+    Run heavy computations on a local process pool.
+
+    Jobs are identified by a key (by default a hash of the function and its
+    arguments), so submitting an identical job while one is queued, running
+    or finished within the backend TTL returns the existing job instead of
+    starting a new one, also across server workers sharing the backend.
+    Job functions must be importable module-level callables taking a
+    JobContext as their first argument.
+    """
+
+    def __init__(
+        self, backend: Optional[JobBackend] = None, workers: Optional[int] = None
+    ):
+        self.backend = backend if backend is not None else LocalBackend()
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.RLock()
+
+    def submit(
+        self, fn: Callable[..., Any], *args: Any, key: Optional[str] = None
+    ) -> str:
+        """
+        Queue ``fn(context, *args)`` and return its job id.
+
+        Args:
+            fn: Module-level job function
+            args: Picklable arguments
+            key: Optional job id; identical keys are de-duplicated
+        """
+        job_id = key or job_key(fn, *args)
+        with self._lock:
+            state = self.backend.get(job_id)
+            if state is not None and state.status in (QUEUED, RUNNING, DONE):
+                return job_id
+
+            # Claimed in the backend, so only one server worker starts the job
+            queued = JobState(job_id, updated=time.time())
+            if state is None:
+                claimed = self.backend.add(job_id, queued)
+            else:
+                # A failed or cancelled run is replaced by whoever claims it first
+                claimed = self.backend.add(_claim_key(job_id, state), True)
+                if claimed:
+                    self.backend.set(job_id, queued)
+            if not claimed:
+                return job_id
+
+            self.backend.delete(_cancel_key(job_id))
+            future = self._pool().submit(_run_job, job_id, self.backend, fn, args)
+            self._futures[job_id] = future
+        future.add_done_callback(partial(self._finalize, job_id))
+        return job_id
+
+    def status(self, job_id: str) -> Optional[JobState]:
+        """Current state of a job, or None if unknown or expired."""
+        return self.backend.get(job_id)
+
+    def result(
+        self, job_id: str, timeout: Optional[float] = None, poll: float = 0.1
+    ) -> Any:
+        """
+        Wait for a job and return its result.
+
+        Raises:
+            JobCancelled: If the job was cancelled
+            RuntimeError: If the job failed or is unknown
+            TimeoutError: If it did not finish within ``timeout`` seconds
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            state = self.status(job_id)
+            if state is None:
+                raise RuntimeError(f"Unknown job: {job_id}")
+            if state.status == DONE:
+                return state.result
+            if state.status == CANCELLED:
+                raise JobCancelled(job_id)
+            if state.status == FAILED:
+                raise RuntimeError(state.error)
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Job {job_id} did not finish in {timeout}s")
+            time.sleep(poll)
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation; returns False if the job had already finished."""
+        state = self.status(job_id)
+        if state is None or state.finished:
+            return False
+        self.backend.set(_cancel_key(job_id), True)
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            self.backend.set(
+                job_id, replace(state, status=CANCELLED, updated=time.time())
+            )
+        return True
+
+    def discard(self, job_id: str) -> None:
+        """Forget a finished job so the same key can run again."""
+        self.backend.delete(job_id)
+        self.backend.delete(_cancel_key(job_id))
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        # Joined outside the lock: the pool thread runs _finalize callbacks
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _finalize(self, job_id: str, future: Future) -> None:
+        with self._lock:
+            if self._futures.get(job_id) is future:
+                del self._futures[job_id]
+        state = self.status(job_id)
+        if state is None or state.finished:
+            return
+        # The worker never recorded an outcome (cancelled before start or pool died)
+        if future.cancelled():
+            state = replace(state, status=CANCELLED)
+        else:
+            state = replace(state, status=FAILED, error=str(future.exception()))
+        self.backend.set(job_id, replace(state, updated=time.time()))
+
+
+def job_key(fn: Callable[..., Any], *args: Any) -> str:
+    """Stable id for a job function and its arguments."""
+    payload = pickle.dumps(
+        (fn.__module__, fn.__qualname__, args), protocol=pickle.HIGHEST_PROTOCOL
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _cancel_key(job_id: str) -> str:
+    return f"{job_id}:cancel"
+
+
+def _claim_key(job_id: str, state: JobState) -> str:
+    return f"{job_id}:claim:{state.updated!r}"
+
+
+def _run_job(
+    job_id: str, backend: JobBackend, fn: Callable[..., Any], args: tuple
+) -> None:
+    context = JobContext(job_id, backend)
+    state = backend.get(job_id) or JobState(job_id)
+    try:
+        context.progress(0.0)
+        result = fn(context, *args)
+        state = replace(state, status=DONE, progress=1.0, result=result)
+    except JobCancelled:
+        state = replace(state, status=CANCELLED)
+    except Exception as e:
+        state = replace(state, status=FAILED, error=str(e))
+    backend.set(job_id, replace(state, message='', updated=time.time()))
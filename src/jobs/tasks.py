@@ -0,0 +1,162 @@
+import os
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from src.analytics.batch import BatchEvaluator, random_weights
+from src.analytics.optimizer import PortfolioOptimizer
+from src.data.columnar import SUFFIX, is_columnar
+from src.data.loader import PortfolioDataLoader
+from src.data.pipeline import ReturnsPipeline
+from src.data.store import DatasetStore
+from src.data.streaming import ChunkedUpload
+from src.jobs.runner import JobContext
+
+
+def candidate_stats(
+    pipeline: ReturnsPipeline,
+    n_portfolios: int,
+    max_bytes: int,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[float], None]] = None,
+) -> pd.DataFrame:
+    """Statistics for a fixed set of random candidate allocations."""
+    evaluator = BatchEvaluator(pipeline, max_bytes=max_bytes, workers=workers)
+    candidates = random_weights(len(pipeline.asset_names), n_portfolios)
+    return evaluator.evaluate(candidates, progress=progress).stats
+
+
+def frontier_stats(
+    pipeline: ReturnsPipeline,
+    n_points: int,
+    max_bytes: int,
+    max_assets: Optional[int] = None,
+    progress: Optional[Callable[[float], None]] = None,
+) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """
+    Statistics along the long-only efficient frontier.
+
+    Returns (statistics, None), or (None, the reason) if the frontier cannot
+    be traced or the dataset has more than ``max_assets`` assets (each point
+    is a dense QP in every asset), so the chart can say why it is missing.
+    ``progress`` is called with the fraction done after every point.
+    """
+    n_assets = len(pipeline.asset_names)
+    if max_assets is not None and n_assets > max_assets:
+        return None, (
+            f"Efficient frontier not traced for {n_assets} assets "
+            f"(FRONTIER_MAX_ASSETS is {max_assets})"
+        )
+    try:
+        frontier = PortfolioOptimizer(pipeline).efficient_frontier(n_points, progress)
+    except ValueError as e:
+        return None, f"Efficient frontier unavailable: {e}"
+    evaluator = BatchEvaluator(pipeline, max_bytes=max_bytes)
+    return evaluator.evaluate([point.weights for point in frontier]).stats, None
+
+
+def ingest_upload(
+    context: JobContext,
+    raw: bytes,
+    dataset_key: str,
+    spill_dir: str,
+    n_portfolios: int,
+    n_frontier: int,
+    max_bytes: int,
+    frontier_max_assets: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Parse an uploaded CSV and precompute its dataset-level analytics.
+
+    The loader is written to the shared dataset spill directory under
+    ``dataset_key``; the (small) candidate and frontier statistics are
+    returned so the caller can seed its pipeline cache.
+    """
+    context.progress(0.05, "Parsing CSV")
+    loader = PortfolioDataLoader()
+    loader.load_bytes(raw)
+
+    context.progress(0.3, "Calculating returns")
+    loader.calculate_returns()
+    return _store_and_analyse(
+        context,
+        loader,
+        dataset_key,
+        spill_dir,
+        n_portfolios,
+        n_frontier,
+        max_bytes,
+        frontier_max_assets,
+    )
+
+
+def finalize_upload(
+    context: JobContext,
+    upload_dir: str,
+    spill_dir: str,
+    n_portfolios: int,
+    n_frontier: int,
+    max_bytes: int,
+    frontier_max_assets: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Turn a completed ChunkedUpload into a memory-mapped dataset.
+
+    The columnar copy is written next to the dataset spill as
+    ``<dataset key>.columnar``, so identical uploads share one copy.
+    """
+    upload = ChunkedUpload(upload_dir)
+    context.progress(0.05, "Hashing data")
+    dataset_key = upload.digest()
+    path = os.path.join(spill_dir, dataset_key + SUFFIX)
+    if not is_columnar(path):
+        context.progress(0.1, "Writing dataset")
+        upload.write_columnar(path)
+    upload.remove()
+
+    loader = PortfolioDataLoader()
+    loader.load_columnar(path)
+    return _store_and_analyse(
+        context,
+        loader,
+        dataset_key,
+        spill_dir,
+        n_portfolios,
+        n_frontier,
+        max_bytes,
+        frontier_max_assets,
+    )
+
+
+def _store_and_analyse(
+    context: JobContext,
+    loader: PortfolioDataLoader,
+    dataset_key: str,
+    spill_dir: str,
+    n_portfolios: int,
+    n_frontier: int,
+    max_bytes: int,
+    frontier_max_assets: Optional[int] = None,
+) -> Dict[str, Any]:
+    DatasetStore(ttl=None, spill_dir=spill_dir).put(dataset_key, loader)
+
+    # Progress is recorded (and cancellation checked) after every chunk
+    message = "Evaluating candidate portfolios"
+    context.progress(0.5, message)
+    grid = candidate_stats(
+        loader.pipeline,
+        n_portfolios,
+        max_bytes,
+        progress=lambda done: context.progress(0.5 + 0.25 * done, message),
+    )
+
+    message = "Computing efficient frontier"
+    context.progress(0.75, message)
+    frontier = frontier_stats(
+        loader.pipeline,
+        n_frontier,
+        max_bytes,
+        frontier_max_assets,
+        progress=lambda done: context.progress(0.75 + 0.25 * done, message),
+    )
+    return {'dataset': dataset_key, 'grid_stats': grid, 'frontier_stats': frontier}
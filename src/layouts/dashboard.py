@@ -1,6 +1,6 @@
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 import plotly.graph_objects as go
 
 class DashboardLayout:
@@ -40,31 +40,45 @@ class DashboardLayout:
         
         return html.Div([first_row, second_row])
 
-    def create_chart_section(self, charts: Dict[str, go.Figure]) -> dbc.Row:
-        """Create charts section."""
+    def create_chart_section(
+        self, charts: Dict[str, go.Figure], controls: Optional[Dict[str, Any]] = None
+    ) -> dbc.Row:
+        """Create charts section, with optional controls shown above a chart."""
+        controls = controls or {}
         chart_components = []
         for i, (title, figure) in enumerate(charts.items()):
             chart_components.append(
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardHeader(title, className="text-center"),
-                        dbc.CardBody([
-                            dcc.Graph(
-                                id=f'chart-{i}',
-                                figure=figure
-                            )
-                        ])
-                    ])
-                ], width=12, className="mb-4")
+                dbc.Col(
+                    [
+                        dbc.Card(
+                            [
+                                dbc.CardHeader(title, className="text-center"),
+                                dbc.CardBody(
+                                    ([controls[title]] if title in controls else [])
+                                    + [dcc.Graph(id=f'chart-{i}', figure=figure)]
+                                ),
+                            ]
+                        )
+                    ],
+                    width=12,
+                    className="mb-4",
+                )
             )
         
         return dbc.Row(chart_components)
 
-    def create_layout(self, metric_cards: List[dbc.Card], 
-                     charts: Dict[str, go.Figure]) -> dbc.Container:
+    def create_layout(
+        self,
+        metric_cards: List[dbc.Card],
+        charts: Dict[str, go.Figure],
+        controls: Optional[Dict[str, Any]] = None,
+    ) -> dbc.Container:
         """Create main dashboard layout."""
-        return dbc.Container([
-            self.create_header(),
-            self.create_metrics_section(metric_cards),
-            self.create_chart_section(charts)
-        ], fluid=True)
+        return dbc.Container(
+            [
+                self.create_header(),
+                self.create_metrics_section(metric_cards),
+                self.create_chart_section(charts, controls),
+            ],
+            fluid=True,
+        )
@@ -0,0 +1,33 @@
+"""Command line entry point (the ``markolabs`` script)."""
+import argparse
+import sys
+from typing import Optional
+
+from src.data import columnar
+from src.reports import tearsheet
+
+COMMANDS = {
+    'report': (
+        tearsheet.main,
+        "Render static tearsheets for the portfolios of a manifest",
+    ),
+    'convert': (
+        columnar.main,
+        "Convert portfolio CSVs to the memory-mapped columnar format",
+    ),
+}
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(prog='markolabs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text, add_help=False)
+    argv = sys.argv[1:] if argv is None else argv
+    args, rest = parser.parse_known_args(argv[:1])
+    command = COMMANDS[args.command][0]
+    return command(argv[1:]) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,570 @@
+"""
+Headless batch export of portfolio tearsheets.
+
+A manifest lists the reports to build, one (dataset, weights) pair each:
+
+    {"reports": [
+        {"name": "client-001", "data": "data/myport2.csv",
+         "weights": {"AAPL": 0.6, "MSFT": 0.4}},
+        {"name": "client-002", "data": "data/myport2.csv"}
+    ]}
+
+Weights are a list (one per asset) or {asset: weight}; omitted means equal
+weights, and data paths are relative to the manifest. Every report is written
+to ``<output>/<name>/``: the dashboard charts as PNGs named like ``charts/``,
+a ``tearsheet.html`` and/or ``tearsheet.pdf``, and ``report.json`` with the
+metric values and the fingerprint of the inputs, so an unchanged report is
+skipped on the next run.
+
+Usage:
+    python -m src.reports.tearsheet manifest.json -o reports [--format html png pdf]
+                                    [--workers 4] [--force]
+"""
+import argparse
+import hashlib
+import html
+import json
+import logging
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs
+from plotly.subplots import make_subplots
+
+from src.analytics.kernel import RunningStats
+from src.analytics.periods import period_grids, portfolio_period_returns
+from src.analytics.rolling import rolling_stats
+from src.components.charts import PortfolioCharts
+from src.components.metrics import PortfolioMetrics
+from src.config import (
+    CHART_MAX_POINTS,
+    COLORS,
+    DEFAULT_ROLLING_WINDOW,
+    REPORT_FORMATS,
+    REPORT_WORKERS,
+)
+from src.data.columnar import generation, is_columnar
+from src.data.loader import PortfolioDataLoader
+from src.data.pipeline import Weights
+from src.telemetry.registry import telemetry
+
+try:
+    import kaleido  # noqa: F401 - static image export for plotly
+except ImportError:
+    kaleido = None
+
+# Bumped whenever the report content changes, so existing reports are rebuilt
+REPORT_VERSION = 1
+FORMATS = ('html', 'png', 'pdf')
+# Chart file stems, in tearsheet order (the names of the charts/ images)
+CHARTS = (
+    'cumulative_returns',
+    'drawdown',
+    'rolling_stats',
+    'risk_metrics',
+    'monthly_returns_heatmap',
+)
+# Pixel size of one chart image, and of one chart row of the PDF page
+IMAGE_SIZE = (1000, 500)
+PDF_ROW_HEIGHT = 420
+PLOTLYJS = 'plotly.min.js'
+MANIFEST = 'report.json'
+
+# Renderers already opened by this (worker) process, by (data path, window)
+_renderers: Dict[Tuple[str, int], 'TearsheetRenderer'] = {}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ReportSpec:
+    """One tearsheet to build: a portfolio of a dataset."""
+
+    name: str
+    data: str
+    weights: Optional[Weights] = None
+
+
+def load_manifest(path: str) -> List[ReportSpec]:
+    """Read the report list of a JSON manifest (a list, or {"reports": [...]})."""
+    with open(path) as f:
+        entries = json.load(f)
+    if isinstance(entries, Mapping):
+        entries = entries.get('reports', [])
+    base = os.path.dirname(os.path.abspath(path))
+    specs = []
+    for entry in entries:
+        if 'name' not in entry or 'data' not in entry:
+            raise ValueError("Every report needs a name and a data path")
+        name = str(entry['name'])
+        if (
+            not name
+            or name in ('.', '..')
+            or os.sep in name
+            or (os.altsep and os.altsep in name)
+        ):
+            raise ValueError(f"Invalid report name: {name!r}")
+        specs.append(
+            ReportSpec(name, os.path.join(base, entry['data']), entry.get('weights'))
+        )
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("Report names must be unique")
+    return specs
+
+
+def dataset_digest(path: str) -> str:
+    """Content digest of a CSV, or the write id and length of a columnar copy."""
+    digest = hashlib.sha256()
+    if is_columnar(path):
+        digest.update(repr(generation(path)).encode())
+    else:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(
+    spec: ReportSpec,
+    digest: str,
+    formats: Sequence[str],
+    window: int = DEFAULT_ROLLING_WINDOW,
+) -> str:
+    """Hash of everything a report depends on."""
+    if spec.weights is None:
+        weights = None
+    elif isinstance(spec.weights, Mapping):
+        weights = sorted(
+            (str(name), round(float(w), 12))
+            for name, w in spec.weights.items()
+            if float(w) != 0
+        )
+    else:
+        weights = [round(float(w), 12) for w in spec.weights]
+    inputs = [
+        REPORT_VERSION,
+        digest,
+        weights,
+        sorted(formats),
+        window,
+        CHART_MAX_POINTS,
+    ]
+    return hashlib.sha256(json.dumps(inputs).encode()).hexdigest()
+
+
+def is_current(directory: str, key: str) -> bool:
+    """True if ``directory`` holds a complete report of the inputs hashed as ``key``."""
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return report.get('fingerprint') == key and all(
+        os.path.isfile(os.path.join(directory, name))
+        for name in report.get('files', [])
+    )
+
+
+class TearsheetRenderer:
+    """
+    Tearsheet figures and files for portfolios of one dataset.
+
+    Everything is memoized on the dataset's ReturnsPipeline, so portfolios
+    rendered by the same renderer share the return matrix, the period
+    grids and, for repeated weights, the statistics and figures.
+    """
+
+    def __init__(
+        self, loader: PortfolioDataLoader, window: int = DEFAULT_ROLLING_WINDOW
+    ):
+        self.loader = loader
+        self.pipeline = loader.pipeline
+        self.window = window
+        self.charts = PortfolioCharts(COLORS, max_points=CHART_MAX_POINTS)
+        self.metrics = PortfolioMetrics(COLORS)
+
+    def weights(self, weights: Optional[Weights]) -> Weights:
+        """Validated weights; equal weights when omitted."""
+        if weights is None:
+            n_assets = len(self.pipeline.asset_names)
+            return [1.0 / n_assets] * n_assets
+        weights = self.loader.validate_weights(weights)
+        self.pipeline.weights_key(weights)
+        return weights
+
+    def stats(self, weights: Weights):
+        """Kernel statistics of the portfolio (metric values and the risk chart)."""
+        # Own stage: the dashboard memoizes a RunningStats under 'stats'
+        return self.pipeline.memoize(
+            'tearsheet_stats',
+            weights,
+            lambda port_ret: RunningStats.from_returns(port_ret).result(),
+        )
+
+    def metric_values(self, weights: Weights) -> Dict[str, str]:
+        """Metric card values by card title."""
+        values = self.metrics.metric_values(self.stats(weights))
+        return {card['title']: value for card, value in zip(self.metrics.CARDS, values)}
+
+    def figures(self, weights: Weights) -> Dict[str, go.Figure]:
+        """The tearsheet charts by file stem, in CHARTS order."""
+        pipeline = self.pipeline
+        grids = period_grids(pipeline)
+        benchmark = pipeline.asset_names[0]
+        builders = {
+            'cumulative_returns': lambda port_ret: (
+                self.charts.create_cumulative_returns_chart(port_ret, None, grids)
+            ),
+            'drawdown': lambda port_ret: self.charts.create_drawdown_chart(
+                port_ret, None, grids
+            ),
+            'rolling_stats': lambda port_ret: self.charts.create_rolling_stats_chart(
+                rolling_stats(port_ret, self.window, pipeline.asset_returns(benchmark)),
+                None,
+                grids,
+            ),
+            'risk_metrics': lambda port_ret: self.charts.create_risk_metrics_chart(
+                self.stats(weights)
+            ),
+            'monthly_returns_heatmap': lambda port_ret: (
+                self.charts.create_monthly_returns_heatmap(
+                    portfolio_period_returns(pipeline, weights, 'M')
+                )
+            ),
+        }
+        return {
+            name: pipeline.memoize(
+                ('tearsheet', name, self.window), weights, builders[name]
+            )
+            for name in CHARTS
+        }
+
+    def write(
+        self,
+        spec: ReportSpec,
+        directory: str,
+        formats: Sequence[str],
+        key: Optional[str] = None,
+    ) -> List[str]:
+        """Write the report files of ``spec`` into ``directory``; return their names."""
+        weights = self.weights(spec.weights)
+        figures = self.figures(weights)
+        values = self.metric_values(weights)
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        if 'png' in formats:
+            for name, figure in figures.items():
+                with telemetry.span('report_image', format='png'):
+                    figure.write_image(
+                        os.path.join(directory, name + '.png'),
+                        width=IMAGE_SIZE[0],
+                        height=IMAGE_SIZE[1],
+                    )
+                files.append(name + '.png')
+        if 'html' in formats:
+            with open(os.path.join(directory, 'tearsheet.html'), 'w') as f:
+                f.write(tearsheet_html(spec.name, figures, values))
+            files.append('tearsheet.html')
+        if 'pdf' in formats:
+            figure = tearsheet_figure(spec.name, figures, values)
+            with telemetry.span('report_image', format='pdf'):
+                figure.write_image(
+                    os.path.join(directory, 'tearsheet.pdf'),
+                    width=IMAGE_SIZE[0],
+                    height=PDF_ROW_HEIGHT * len(figures),
+                )
+            files.append('tearsheet.pdf')
+
+        # Written last: a report interrupted half way is rebuilt on the next run
+        with open(os.path.join(directory, MANIFEST), 'w') as f:
+            json.dump(
+                {
+                    'name': spec.name,
+                    'data': spec.data,
+                    'fingerprint': key,
+                    'metrics': values,
+                    'files': files,
+                },
+                f,
+                indent=2,
+            )
+        return files
+
+
+def tearsheet_html(
+    title: str, figures: Mapping[str, go.Figure], values: Mapping[str, str]
+) -> str:
+    """
+    Tearsheet page with the metric values and interactive charts.
+
+    plotly.js is loaded from the report root (see render_reports) instead
+    of being inlined into every report.
+    """
+    metrics = ''.join(
+        f'<div class="metric"><div>{html.escape(name)}</div>'
+        f'<strong>{html.escape(value)}</strong></div>'
+        for name, value in values.items()
+    )
+    charts = ''.join(
+        figure.to_html(
+            full_html=False, include_plotlyjs=False, default_height=IMAGE_SIZE[1]
+        )
+        for figure in figures.values()
+    )
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<script src="../{PLOTLYJS}"></script>
+<style>
+body {{font-family: sans-serif; color: {COLORS['primary']};
+       max-width: 1100px; margin: auto;}}
+.metrics {{display: flex; gap: 1rem; margin: 1rem 0;}}
+.metric {{flex: 1; text-align: center; padding: 0.75rem; border-radius: 10px;
+          box-shadow: 0 1px 3px rgba(0, 0, 0, 0.15);}}
+.metric strong {{font-size: 1.5rem;}}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<div class="metrics">{metrics}</div>
+{charts}
+</body>
+</html>
+"""
+
+
+def tearsheet_figure(
+    title: str, figures: Mapping[str, go.Figure], values: Mapping[str, str]
+) -> go.Figure:
+    """All charts stacked into one figure (one PDF page), metric values in the title."""
+    names = list(figures)
+    specs = [
+        [{'secondary_y': any(trace.yaxis == 'y2' for trace in figures[name].data)}]
+        for name in names
+    ]
+    page = make_subplots(
+        rows=len(names),
+        cols=1,
+        specs=specs,
+        vertical_spacing=0.06,
+        subplot_titles=[figures[name].layout.title.text for name in names],
+    )
+    for row, name in enumerate(names, start=1):
+        figure = figures[name]
+        for trace in figure.data:
+            page.add_trace(
+                trace, row=row, col=1, secondary_y=trace.yaxis == 'y2' or None
+            )
+        page.update_yaxes(
+            figure.layout.yaxis,
+            row=row,
+            col=1,
+            **({'secondary_y': False} if specs[row - 1][0]['secondary_y'] else {}),
+        )
+        if specs[row - 1][0]['secondary_y']:
+            # Keep the overlay wiring make_subplots set up for this row
+            secondary = figure.layout.yaxis2.to_plotly_json()
+            secondary.pop('overlaying', None)
+            page.update_yaxes(secondary, row=row, col=1, secondary_y=True)
+    # Colorbars span the whole page unless moved next to their own row
+    for trace in page.data:
+        if isinstance(trace, go.Heatmap):
+            low, high = page.layout[trace.yaxis.replace('y', 'yaxis')].domain
+            trace.colorbar.update(y=(low + high) / 2, len=high - low)
+    summary = ' · '.join(f'{name} {value}' for name, value in values.items())
+    page.update_layout(
+        title=f'{title}<br><sup>{summary}</sup>',
+        template='plotly_white',
+        legend=dict(orientation='h', y=-0.03),
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+    )
+    return page
+
+
+def render_reports(
+    specs: Sequence[ReportSpec],
+    output_dir: str,
+    formats: Sequence[str] = REPORT_FORMATS,
+    workers: Optional[int] = REPORT_WORKERS,
+    force: bool = False,
+    window: int = DEFAULT_ROLLING_WINDOW,
+) -> Dict[str, str]:
+    """
+    Build the tearsheets of ``specs`` under ``output_dir``.
+
+    Unchanged reports (same data, weights, formats and report version) are
+    skipped unless ``force``. The rest are grouped by dataset and split into
+    one batch per worker process, so each process opens a dataset once and
+    renders its portfolios from the shared return matrix.
+
+    Returns:
+        Status of every report by name: 'written', 'unchanged' or 'failed: <reason>'
+    """
+    formats = list(dict.fromkeys(formats))
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown report format: {', '.join(unknown)}")
+    if kaleido is None and {'png', 'pdf'} & set(formats):
+        raise ValueError(
+            "PNG and PDF reports need the kaleido package (pip install kaleido)"
+        )
+
+    statuses: Dict[str, str] = {}
+    pending: Dict[str, List[Tuple[ReportSpec, str]]] = {}
+    digests: Dict[str, str] = {}
+    for spec in specs:
+        try:
+            if spec.data not in digests:
+                digests[spec.data] = dataset_digest(spec.data)
+        except OSError as e:
+            statuses[spec.name] = f"failed: {e}"
+            continue
+        key = fingerprint(spec, digests[spec.data], formats, window)
+        if not force and is_current(os.path.join(output_dir, spec.name), key):
+            statuses[spec.name] = 'unchanged'
+        else:
+            pending.setdefault(spec.data, []).append((spec, key))
+
+    os.makedirs(output_dir, exist_ok=True)
+    if 'html' in formats and not os.path.isfile(os.path.join(output_dir, PLOTLYJS)):
+        with open(os.path.join(output_dir, PLOTLYJS), 'w') as f:
+            f.write(get_plotlyjs())
+
+    n_pending = sum(len(items) for items in pending.values())
+    workers = max(1, min(workers or 1, n_pending))
+    batches = []
+    for data, items in pending.items():
+        size = max(1, math.ceil(len(items) / workers))
+        batches += [(data, items[i : i + size]) for i in range(0, len(items), size)]
+
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_render_batch, data, items, output_dir, formats, window)
+                for data, items in batches
+            ]
+            for future in as_completed(futures):
+                statuses.update(future.result())
+    else:
+        for data, items in batches:
+            statuses.update(_render_batch(data, items, output_dir, formats, window))
+    return {spec.name: statuses[spec.name] for spec in specs}
+
+
+def _load_dataset(data: str) -> PortfolioDataLoader:
+    """
+    Load a manifest dataset without writing next to it.
+
+    CSVs are parsed from their bytes: going through PortfolioDataLoader(path)
+    would leave a columnar copy and its lock file in the input directory.
+    Columnar copies named in the manifest are memory-mapped read-only.
+    """
+    if is_columnar(data):
+        loader = PortfolioDataLoader(data)
+        loader.load_data()
+        return loader
+    loader = PortfolioDataLoader()
+    try:
+        with open(data, 'rb') as f:
+            loader.load_bytes(f.read())
+    except OSError as e:
+        raise ValueError(f"Error loading data: {e}")
+    return loader
+
+
+def _render_batch(
+    data: str,
+    items: Sequence[Tuple[ReportSpec, str]],
+    output_dir: str,
+    formats: Sequence[str],
+    window: int,
+) -> Dict[str, str]:
+    """Render reports of one dataset; failures are reported per report."""
+    try:
+        renderer = _renderers.get((data, window))
+        if renderer is None:
+            renderer = _renderers[data, window] = TearsheetRenderer(
+                _load_dataset(data), window
+            )
+    except ValueError as e:
+        return {spec.name: f"failed: {e}" for spec, _ in items}
+
+    statuses = {}
+    for spec, key in items:
+        try:
+            with telemetry.span('render_report'):
+                renderer.write(spec, os.path.join(output_dir, spec.name), formats, key)
+            statuses[spec.name] = 'written'
+        except ValueError as e:
+            statuses[spec.name] = f"failed: {e}"
+        except Exception as e:
+            # One broken report (e.g. an image export error) must not stop the batch
+            logger.exception("Rendering report %s failed", spec.name)
+            statuses[spec.name] = f"failed: {type(e).__name__}: {e}"
+    return statuses
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Render static tearsheets (HTML, PNG, PDF) for the portfolios"
+            " of a manifest."
+        )
+    )
+    parser.add_argument(
+        'manifest', help="JSON list of reports: name, data path and weights"
+    )
+    parser.add_argument('-o', '--output', default='reports', help="Output directory")
+    parser.add_argument(
+        '--format',
+        nargs='+',
+        choices=FORMATS,
+        default=list(REPORT_FORMATS),
+        help="Report formats; png and pdf need kaleido",
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=REPORT_WORKERS,
+        help="Worker processes (default: REPORT_WORKERS)",
+    )
+    parser.add_argument(
+        '--window',
+        type=int,
+        default=DEFAULT_ROLLING_WINDOW,
+        help="Rolling statistics window in trading days",
+    )
+    parser.add_argument(
+        '--force', action='store_true', help="Rebuild unchanged reports too"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        specs = load_manifest(args.manifest)
+        statuses = render_reports(
+            specs, args.output, args.format, args.workers, args.force, args.window
+        )
+    except (OSError, ValueError) as e:
+        parser.exit(2, f"error: {e}\n")
+
+    for name, status in statuses.items():
+        print(f"{name}: {status}")
+    counts = {
+        state: sum(status.split(':')[0] == state for status in statuses.values())
+        for state in ('written', 'unchanged', 'failed')
+    }
+    print(', '.join(f"{n} {state}" for state, n in counts.items()))
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+from flask import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content codings offered, preferred first; brotli only when installed
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+# Bodies smaller than this are sent as they are
+MIN_COMPRESS_BYTES = 1024
+_COMPRESSIBLE = ('application/json', 'application/javascript', 'image/svg+xml', 'text/')
+_GZIP_LEVEL = 6
+_BROTLI_QUALITY = 5
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """``body`` in the ``br`` or ``gzip`` content coding."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=_BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=_GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def negotiate(request: Request, size: int, mimetype: Optional[str]) -> Optional[str]:
+    """Encoding to send a body of ``size`` bytes in, None to send it as is."""
+    if (
+        size < MIN_COMPRESS_BYTES
+        or not mimetype
+        or not mimetype.startswith(_COMPRESSIBLE)
+    ):
+        return None
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+class Payload:
+    """
+    One serialized response body, with its ETag and compressed variants.
+
+    Each variant is compressed on first request and kept, so a payload
+    served many times is serialized and compressed once.
+    """
+
+    def __init__(self, body: bytes, mimetype: str):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self._encoded: Dict[str, bytes] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.body) + sum(len(data) for data in self._encoded.values())
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded[encoding] = compress(self.body, encoding)
+        return data
+
+    def respond(self, request: Request, compression: bool = True) -> Response:
+        """
+        Response for ``request``: compressed as the client accepts, with a
+        weak ETag (the same for every encoding), and a 304 for a GET whose
+        If-None-Match already has it.
+        """
+        encoding = (
+            negotiate(request, len(self.body), self.mimetype) if compression else None
+        )
+        response = Response(self.encoded(encoding), mimetype=self.mimetype)
+        if encoding is not None:
+            response.content_encoding = encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(self.etag, weak=True)
+        if request.method in ('GET', 'HEAD'):
+            response.make_conditional(request)
+        return response
+
+
+class PayloadCache:
+    """
+    Least-recently-used payloads under a byte budget (compressed variants included).
+
+    Keys are built by the caller from everything the payload depends on;
+    each server worker keeps its own cache.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, compression: bool = True):
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self._payloads: 'OrderedDict[Hashable, Payload]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(payload.nbytes for payload in self._payloads.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._payloads.clear()
+
+    def get(self, key: Hashable) -> Optional[Payload]:
+        with self._lock:
+            payload = self._payloads.get(key)
+            if payload is not None:
+                self._payloads.move_to_end(key)
+            return payload
+
+    def put(self, key: Hashable, body: bytes, mimetype: str) -> Payload:
+        payload = Payload(body, mimetype)
+        with self._lock:
+            self._payloads[key] = payload
+            self._evict()
+        return payload
+
+    def respond(self, key: Hashable, request: Request) -> Optional[Response]:
+        """Serve the cached payload for ``key``, None on a miss."""
+        payload = self.get(key)
+        return None if payload is None else self.serve(payload, request)
+
+    def serve(self, payload: Payload, request: Request) -> Response:
+        response = payload.respond(request, self.compression)
+        # Compressing a variant for the first time grows the entry
+        with self._lock:
+            self._evict()
+        return response
+
+    def _evict(self) -> None:
+        total = sum(payload.nbytes for payload in self._payloads.values())
+        while total > self.max_bytes and len(self._payloads) > 1:
+            _, evicted = self._payloads.popitem(last=False)
+            total -= evicted.nbytes
+
+
+def compress_response(response: Response, request: Request) -> Response:
+    """
+    Compress an uncached response in place when the client accepts it.
+
+    Successful GET responses also get a weak ETag of their body and are
+    answered with a 304 when the client already has it. Streamed and
+    file responses (e.g. static assets) are left alone.
+    """
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+    body = response.get_data()
+    if request.method in ('GET', 'HEAD') and not response.get_etag()[0]:
+        response.set_etag(hashlib.sha256(body).hexdigest()[:32], weak=True)
+    encoding = negotiate(request, len(body), response.mimetype)
+    if encoding is not None:
+        response.set_data(compress(body, encoding))
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    if request.method in ('GET', 'HEAD'):
+        response.make_conditional(request)
+    return response
@@ -0,0 +1,230 @@
+import functools
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+PREFIX = 'markolabs'
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Telemetry:
+    """
+    In-process timing spans, counters and size histograms.
+
+    Spans time a block of work (``with telemetry.span('parse_csv')``) into a
+    seconds histogram; counters track cache hits and misses; ``observe``
+    records payload sizes. Everything is rendered in the Prometheus text
+    format by ``render`` and, when a log is configured, every span is also
+    written as one JSON line. While disabled each call is a flag check and
+    returns a shared no-op.
+
+    Each worker process keeps its own registry, like any Prometheus client
+    without a multiprocess collector.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._log: Optional[logging.Logger] = None
+        self._counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+        self._histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool = True, log_path: Optional[str] = None) -> None:
+        """
+        Enable or disable collection.
+
+        Args:
+            enabled: Collect spans, counters and sizes
+            log_path: Also write spans as JSON lines to this file ('-' for stderr)
+        """
+        self.enabled = enabled
+        self._log = None
+        if enabled and log_path:
+            handler = (
+                logging.StreamHandler()
+                if log_path == '-'
+                else logging.FileHandler(log_path)
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            span_log = logging.getLogger('markolabs.telemetry.spans')
+            span_log.handlers = [handler]
+            span_log.setLevel(logging.INFO)
+            span_log.propagate = False
+            self._log = span_log
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    @contextmanager
+    def _span(self, name: str, labels: Dict[str, str]) -> Iterator[None]:
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe('span_seconds', elapsed, SECONDS_BUCKETS, span=name, **labels)
+            if error is not None:
+                self.count('span_errors_total', span=name, error=error)
+            if self._log is not None:
+                self._log.info(
+                    json.dumps(
+                        dict(
+                            labels,
+                            ts=time.time(),
+                            span=name,
+                            duration_ms=round(elapsed * 1e3, 3),
+                            error=error,
+                        )
+                    )
+                )
+
+    def span(self, name: str, **labels: str):
+        """Context manager timing a block of work as ``span_seconds{span=name}``."""
+        if not self.enabled:
+            return _NOOP
+        return self._span(name, labels)
+
+    def timed(self, name: Optional[str] = None, **labels: str) -> Callable:
+        """Decorator wrapping every call of a function in a span (default: its name)."""
+
+        def decorator(fn: Callable) -> Callable:
+            span_name = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self._span(span_name, labels):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def count(self, name: str, value: float = 1, **labels: str) -> None:
+        """Add ``value`` to a counter (e.g. ``cache_requests_total``)."""
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] += value
+
+    def cache(self, cache: str, hit: bool, **labels: str) -> None:
+        """Count one cache lookup as a hit or a miss."""
+        if self.enabled:
+            self.count(
+                'cache_requests_total',
+                cache=cache,
+                result='hit' if hit else 'miss',
+                **labels,
+            )
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Sequence[float] = BYTES_BUCKETS,
+        **labels: str,
+    ) -> None:
+        """Record ``value`` (a duration or a payload size) in a histogram."""
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (list(h.counts), h.sum, h.count, h.buckets))
+                for key, h in self._histograms.items()
+            )
+
+        lines: List[str] = []
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                lines.append(f'# TYPE {PREFIX}_{name} counter')
+                seen.add(name)
+            lines.append(f'{PREFIX}_{name}{_format(labels)} {value:g}')
+        for (name, labels), (counts, total, count, buckets) in histograms:
+            if name not in seen:
+                lines.append(f'# TYPE {PREFIX}_{name} histogram')
+                seen.add(name)
+            cumulative = 0
+            for bound, n in zip(list(buckets) + [float('inf')], counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(
+                    f"{PREFIX}_{name}_bucket"
+                    f'{_format(labels + (("le", le),))} {cumulative}'
+                )
+            lines.append(f'{PREFIX}_{name}_sum{_format(labels)} {total:.6g}')
+            lines.append(f'{PREFIX}_{name}_count{_format(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        k
+        + '="'
+        + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        + '"'
+        for k, v in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+# Shared by every module; the app enables it from its configuration
+telemetry = Telemetry()
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from src.data.loader import PortfolioDataLoader
+
+DATA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'myport2.csv'
+)
+
+
+@pytest.fixture(scope='session')
+def loader():
+    """The bundled dataset, parsed from bytes so no columnar copy is written."""
+    loader = PortfolioDataLoader()
+    with open(DATA_PATH, 'rb') as f:
+        loader.load_bytes(f.read())
+    loader.calculate_returns()
+    return loader
+
+
+@pytest.fixture(scope='session')
+def port_ret(loader):
+    """Default-weight portfolio returns of the bundled dataset."""
+    return loader.pipeline.portfolio_returns(loader.weights)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics.attribution import (
+    drawdown_attribution,
+    return_attribution,
+    risk_attribution,
+)
+from src.analytics.periods import FREQUENCIES, portfolio_period_returns
+
+WEIGHTS = [0.5, 0.2, 0.3]
+
+
+def test_risk_components_add_up(loader):
+    result = risk_attribution(loader.pipeline, WEIGHTS)
+    for measure, component in result.components.items():
+        assert component.sum() == pytest.approx(
+            result.totals[measure], rel=1e-10
+        ), measure
+    np.testing.assert_allclose(result.shares().sum(), 1.0, rtol=1e-10)
+
+
+def test_volatility_marginals_match_covariance(loader):
+    result = risk_attribution(loader.pipeline, WEIGHTS)
+    cov = np.cov(loader.returns.to_numpy(), rowvar=False)
+    w = np.asarray(WEIGHTS)
+    sigma = np.sqrt(w @ cov @ w)
+    np.testing.assert_allclose(
+        result.marginal['Volatility'], cov @ w / sigma * np.sqrt(252), rtol=1e-10
+    )
+    r = loader.pipeline.portfolio_returns(WEIGHTS)
+    assert result.totals['CVaR'] == pytest.approx(
+        r[r <= r.quantile(0.05)].mean(), rel=1e-12
+    )
+
+
+@pytest.mark.parametrize('freq', list(FREQUENCIES))
+def test_return_contributions_add_up(loader, freq):
+    table = return_attribution(loader.pipeline, WEIGHTS, freq)
+    expected = portfolio_period_returns(loader.pipeline, WEIGHTS, freq)
+    np.testing.assert_allclose(table.sum(axis=1), expected, rtol=1e-10, atol=1e-14)
+    pd.testing.assert_index_equal(table.index, expected.index)
+
+
+def test_drawdown_contributions_add_up(loader):
+    r = loader.pipeline.portfolio_returns(WEIGHTS)
+    wealth = (1.0 + r).cumprod()
+    drawdown = wealth / np.maximum(wealth.cummax(), 1.0) - 1.0
+
+    result = drawdown_attribution(loader.pipeline, WEIGHTS, 3)
+    periods = result.periods
+    assert len(periods) == 3
+    assert periods['depth'].iloc[0] == pytest.approx(drawdown.min(), rel=1e-12)
+    assert periods['trough'].iloc[0] == drawdown.idxmin()
+    assert periods['depth'].is_monotonic_increasing
+    np.testing.assert_allclose(
+        result.contributions.sum(axis=1), periods['depth'], rtol=1e-10
+    )
+    for _, period in periods.iterrows():
+        assert drawdown[period['trough']] == pytest.approx(period['depth'], rel=1e-12)
+        if pd.notna(period['recovery']):
+            assert drawdown[period['recovery']] == 0
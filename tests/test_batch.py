@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from src.analytics.batch import BatchEvaluator, random_weights
+
+
+def test_chunked_stats_match_one_chunk(loader):
+    weights = random_weights(len(loader.asset_names), 25)
+    whole = BatchEvaluator(loader.pipeline).evaluate(weights)
+    evaluator = BatchEvaluator(loader.pipeline, max_bytes=1)
+    assert evaluator.chunk_size() == 1
+    chunked = evaluator.evaluate(weights)
+    assert whole.paths is None and chunked.paths is None
+    pd.testing.assert_frame_equal(whole.stats, chunked.stats)
+
+
+def test_keep_paths_returns_every_candidate(loader):
+    weights = random_weights(len(loader.asset_names), 4)
+    result = BatchEvaluator(loader.pipeline, max_bytes=1).evaluate(
+        weights, keep_paths=True
+    )
+    assert result.paths.shape == (len(loader.pipeline.index), 4)
+    np.testing.assert_allclose(
+        result.paths[2], loader.pipeline.portfolio_returns(weights[2]), atol=1e-12
+    )
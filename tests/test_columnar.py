@@ -0,0 +1,100 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data import columnar
+from src.data.columnar import append_csv, generation, ingest, read_columnar, sync
+from test_pipeline import _is_mapped, _prices
+
+
+@pytest.fixture
+def prices():
+    prices = _prices(300)
+    # Missing prices in one asset, which some splits below cut through
+    prices.loc[198:201, 'A1'] = np.nan
+    return prices
+
+
+def _write(csv_path, prices, mode='w'):
+    prices.to_csv(csv_path, mode=mode, header=mode == 'w', index=False)
+
+
+def _assert_same(path, expected_path):
+    df, returns = read_columnar(path)
+    expected_df, expected_returns = read_columnar(expected_path, mmap=False)
+    pd.testing.assert_frame_equal(df, expected_df)
+    pd.testing.assert_frame_equal(returns, expected_returns)
+
+
+def test_round_trip_is_memory_mapped(tmp_path, prices):
+    csv_path = tmp_path / 'prices.csv'
+    _write(csv_path, prices)
+    path = ingest(str(csv_path))
+    assert path == str(tmp_path / 'prices.columnar')
+
+    df, returns = read_columnar(path)
+    assert _is_mapped(df.to_numpy()) and _is_mapped(returns.to_numpy())
+    assert list(df.columns) == ['A0', 'A1', 'A2']
+    np.testing.assert_allclose(df.to_numpy(), prices.iloc[:, 1:].to_numpy(), rtol=1e-14)
+    expected = df.pct_change().dropna()
+    np.testing.assert_allclose(returns.to_numpy(), expected.to_numpy(), rtol=1e-12)
+    assert generation(path)[1] == len(returns)
+
+
+@pytest.mark.parametrize('split', [150, 199, 299])
+def test_sync_appends_new_rows(tmp_path, prices, split):
+    csv_path = tmp_path / 'prices.csv'
+    _write(csv_path, prices.iloc[:split])
+    assert sync(str(csv_path)) == 'written'
+    assert sync(str(csv_path)) == 'fresh'
+    path = columnar.columnar_path(str(csv_path))
+    write_id, n_returns = generation(path)
+
+    _write(csv_path, prices.iloc[split:], mode='a')
+    assert sync(str(csv_path)) == 'appended'
+    assert generation(path)[0] == write_id
+    assert generation(path)[1] > n_returns
+
+    full_csv = tmp_path / 'full.csv'
+    _write(full_csv, prices)
+    _assert_same(path, ingest(str(full_csv)))
+
+
+def test_rewritten_source_is_ingested_again(tmp_path, prices):
+    csv_path = tmp_path / 'prices.csv'
+    _write(csv_path, prices.iloc[:200])
+    path = ingest(str(csv_path))
+    write_id = generation(path)[0]
+
+    _write(csv_path, prices.iloc[:100])
+    with pytest.raises(ValueError, match="shrank"):
+        append_csv(path, str(csv_path))
+    changed = prices.iloc[:200].copy()
+    changed.loc[199, 'A0'] += 1
+    _write(csv_path, changed)
+    with pytest.raises(ValueError, match="rewritten"):
+        append_csv(path, str(csv_path))
+    _write(csv_path, prices.iloc[:200])
+    _write(csv_path, prices.iloc[150:160], mode='a')
+    with pytest.raises(ValueError, match="after the last stored date"):
+        append_csv(path, str(csv_path))
+
+    assert sync(str(csv_path)) == 'written'
+    assert generation(path)[0] != write_id
+
+
+@pytest.mark.skipif(columnar.fcntl is None, reason="needs fcntl")
+def test_sync_waits_for_the_lock(tmp_path, prices):
+    csv_path = tmp_path / 'prices.csv'
+    _write(csv_path, prices)
+    path = columnar.columnar_path(str(csv_path))
+    results = []
+    worker = threading.Thread(target=lambda: results.append(sync(str(csv_path))))
+    with columnar._locked(path):
+        worker.start()
+        worker.join(0.2)
+        assert worker.is_alive() and not columnar.is_columnar(path)
+    worker.join(30)
+    assert results == ['written']
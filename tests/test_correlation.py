@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from src.analytics.correlation import cluster_order, correlation, ledoit_wolf
+from src.data.pipeline import ReturnsPipeline
+
+
+@pytest.mark.parametrize('window', [None, 252])
+def test_pairwise_matches_pandas(loader, window):
+    history = loader.return_history()
+    rows = history if window is None else history.iloc[-window:]
+    min_periods = 21 if window is None else window // 2
+    result = correlation(loader.pipeline, loader.return_history, window)
+
+    np.testing.assert_allclose(
+        result.correlation, rows.corr(min_periods=min_periods), rtol=1e-10, atol=1e-12
+    )
+    np.testing.assert_allclose(
+        result.covariance,
+        rows.cov(min_periods=min_periods) * 252,
+        rtol=1e-10,
+        atol=1e-14,
+    )
+    finite = rows.notna().astype(float)
+    np.testing.assert_array_equal(result.observations, finite.T @ finite)
+
+
+@pytest.mark.parametrize('window', [None, 252])
+def test_append_matches_full_rebuild(loader, window):
+    returns = loader.returns
+    pipeline = ReturnsPipeline(returns.iloc[:-300])
+    correlation(pipeline, window=window)
+    pipeline.append(returns.iloc[-300:])
+
+    extended = correlation(pipeline, window=window)
+    full = correlation(ReturnsPipeline(returns), window=window)
+    np.testing.assert_allclose(
+        extended.correlation, full.correlation, rtol=1e-9, atol=1e-12
+    )
+    np.testing.assert_allclose(
+        extended.covariance, full.covariance, rtol=1e-9, atol=1e-14
+    )
+    assert extended.end == full.end == returns.index[-1]
+
+
+def test_ledoit_wolf_matches_definition():
+    values = np.random.default_rng(0).normal(size=(200, 8)) @ np.diag(
+        np.arange(1.0, 9.0)
+    )
+    shrunk, shrinkage = ledoit_wolf(values)
+
+    n_rows, n_assets = values.shape
+    x = values - values.mean(axis=0)
+    sample = x.T @ x / n_rows
+    target = np.trace(sample) / n_assets * np.eye(n_assets)
+    delta = ((sample - target) ** 2).sum() / n_assets
+    # Per-row form of the fourth-moment term
+    beta = (
+        sum(((np.outer(row, row) - sample) ** 2).sum() for row in x)
+        / n_rows**2
+        / n_assets
+    )
+    expected = min(beta, delta) / delta
+    assert shrinkage == pytest.approx(expected, rel=1e-10)
+    np.testing.assert_allclose(
+        shrunk, expected * target + (1 - expected) * sample, rtol=1e-12
+    )
+
+
+def test_ledoit_wolf_matches_sklearn():
+    covariance = pytest.importorskip('sklearn.covariance')
+    values = np.random.default_rng(1).normal(size=(150, 20))
+    shrunk, shrinkage = ledoit_wolf(values)
+    expected, expected_shrinkage = covariance.ledoit_wolf(values)
+    assert shrinkage == pytest.approx(expected_shrinkage, rel=1e-9)
+    np.testing.assert_allclose(shrunk, expected, rtol=1e-9)
+
+
+def test_cluster_order_groups_correlated_assets():
+    rng = np.random.default_rng(2)
+    factors = rng.normal(size=(500, 2))
+    # Assets alternate between the two factors
+    values = factors[:, np.arange(8) % 2] + 0.3 * rng.normal(size=(500, 8))
+    order = cluster_order(np.corrcoef(values, rowvar=False))
+    assert sorted(order) == list(range(8))
+    groups = order % 2
+    assert (groups[:4] == groups[0]).all() and (groups[4:] != groups[0]).all()
@@ -0,0 +1,56 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.components.downsample import downsample, lttb_indices
+
+
+def _reference_lttb(x, y, n_out):
+    """Point-by-point Largest-Triangle-Three-Buckets as published by Steinarsson."""
+    n = len(x)
+    every = (n - 2) / (n_out - 2)
+    selected, a = [0], 0
+    for i in range(n_out - 2):
+        avg_start = math.floor((i + 1) * every) + 1
+        avg_end = min(math.floor((i + 2) * every) + 1, n)
+        avg_x = sum(x[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+        best, best_area = None, -1.0
+        for j in range(math.floor(i * every) + 1, math.floor((i + 1) * every) + 1):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    return selected + [n - 1]
+
+
+@pytest.mark.parametrize('n, n_out', [(1000, 100), (5867, 1200), (37, 5)])
+def test_lttb_matches_reference(n, n_out):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype=np.float64)
+    y = np.cumsum(rng.normal(size=n))
+    np.testing.assert_array_equal(
+        lttb_indices(x, y, n_out), _reference_lttb(x, y, n_out)
+    )
+
+
+def test_downsample_keeps_ends_and_shape(port_ret):
+    wealth = (1.0 + port_ret).cumprod()
+    reduced = downsample(wealth, 500)
+    assert len(reduced) == 500
+    assert reduced.index[0] == wealth.index[0] and reduced.index[-1] == wealth.index[-1]
+    assert reduced.max() == pytest.approx(wealth.max(), rel=0.02)
+    assert reduced.min() == pytest.approx(wealth.min(), rel=0.02)
+    assert reduced.index.is_monotonic_increasing
+    pd.testing.assert_series_equal(reduced, wealth.loc[reduced.index])
+
+
+def test_downsample_viewport(port_ret):
+    wealth = (1.0 + port_ret).cumprod()
+    start, end = wealth.index[1000], wealth.index[1200]
+    zoomed = downsample(wealth, 500, (start, end))
+    # Every point in the viewport, plus one neighbour on each side
+    pd.testing.assert_series_equal(zoomed, wealth.iloc[999:1202])
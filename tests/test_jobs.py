@@ -0,0 +1,169 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from src.jobs.backends import DiskBackend, LocalBackend, RedisBackend
+from src.jobs.runner import (
+    CANCELLED,
+    DONE,
+    FAILED,
+    JobCancelled,
+    JobContext,
+    JobRunner,
+    JobState,
+)
+from src.jobs.tasks import candidate_stats, frontier_stats
+
+
+class FakeRedis:
+    """The subset of the redis client API RedisBackend uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class StaleBackend(DiskBackend):
+    """A backend whose reads lag behind another worker's writes."""
+
+    def get(self, key):
+        return None
+
+
+def add(context, a, b):
+    return a + b
+
+
+def fail(context):
+    raise ValueError("boom")
+
+
+def wait(context, seconds):
+    for _ in range(int(seconds / 0.01)):
+        context.progress(0.5)
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def runner(tmp_path):
+    runner = JobRunner(DiskBackend(str(tmp_path)), workers=1)
+    yield runner
+    runner.shutdown()
+
+
+@pytest.mark.parametrize('kind', ['local', 'disk', 'redis'])
+def test_add_stores_only_missing_keys(tmp_path, kind):
+    backend = {
+        'local': lambda: LocalBackend(),
+        'disk': lambda: DiskBackend(str(tmp_path)),
+        'redis': lambda: RedisBackend(client=FakeRedis()),
+    }[kind]()
+    assert backend.add('job', 1)
+    assert not backend.add('job', 2)
+    assert backend.get('job') == 1
+    backend.delete('job')
+    assert backend.add('job', 3) and backend.get('job') == 3
+
+
+def test_disk_backend_expires_keys(tmp_path):
+    backend = DiskBackend(str(tmp_path), ttl=60)
+    backend.set('job', 1)
+    stale = time.time() - 120
+    os.utime(backend._path('job'), (stale, stale))
+    assert backend.add('job', 2)
+    assert backend.get('job') == 2
+    assert os.listdir(tmp_path) == [os.path.basename(backend._path('job'))]
+
+
+def test_identical_jobs_run_once(runner):
+    job_id = runner.submit(add, 1, 2)
+    assert runner.submit(add, 1, 2) == job_id
+    assert runner.submit(add, 2, 2) != job_id
+    assert runner.result(job_id, timeout=30) == 3
+    assert runner.status(job_id).status == DONE
+
+
+def test_job_is_claimed_once_across_workers(runner, tmp_path):
+    other = JobRunner(StaleBackend(str(tmp_path)), workers=1)
+    try:
+        job_id = runner.submit(wait, 0.5, key='shared')
+        # The other worker reads no state, but cannot claim the running job
+        assert other.submit(wait, 0.5, key='shared') == job_id
+        assert not other._futures
+    finally:
+        other.shutdown()
+    runner.result(job_id, timeout=30)
+
+
+def test_failed_job_is_replaced_once(runner, tmp_path):
+    job_id = runner.submit(fail, key='flaky')
+    with pytest.raises(RuntimeError, match="boom"):
+        runner.result(job_id, timeout=30)
+    assert runner.status(job_id).status == FAILED
+
+    failed = runner.status(job_id)
+    assert runner.submit(add, 1, 1, key='flaky') == job_id
+    assert runner.result(job_id, timeout=30) == 2
+
+    # A worker that still sees the failed run does not start it again
+    other = JobRunner(DiskBackend(str(tmp_path)), workers=1)
+    other.backend.get = lambda key: failed if key == job_id else None
+    try:
+        assert other.submit(add, 1, 1, key='flaky') == job_id
+        assert not other._futures
+    finally:
+        other.shutdown()
+
+
+def test_cancel_stops_a_running_job(runner):
+    job_id = runner.submit(wait, 30)
+    while runner.status(job_id).progress == 0:
+        time.sleep(0.01)
+    assert runner.cancel(job_id)
+    with pytest.raises(JobCancelled):
+        runner.result(job_id, timeout=30)
+    assert runner.status(job_id).status == CANCELLED
+    assert not runner.cancel(job_id)
+
+
+def _cancelling_context(tmp_path, after):
+    backend = DiskBackend(str(tmp_path))
+    backend.set('job', JobState('job'))
+    context = JobContext('job', backend)
+    calls = []
+
+    def progress(done):
+        calls.append(done)
+        if len(calls) == after:
+            JobRunner(backend).cancel('job')
+        context.progress(done)
+
+    return progress, calls
+
+
+def test_candidate_stats_checks_cancellation_between_chunks(loader, tmp_path):
+    progress, calls = _cancelling_context(tmp_path, after=2)
+    with pytest.raises(JobCancelled):
+        candidate_stats(loader.pipeline, 10, max_bytes=1, progress=progress)
+    assert calls == [0.1, 0.2]
+
+
+def test_frontier_stats_checks_cancellation_between_points(loader, tmp_path):
+    progress, calls = _cancelling_context(tmp_path, after=3)
+    with pytest.raises(JobCancelled):
+        frontier_stats(loader.pipeline, 20, max_bytes=1, progress=progress)
+    assert len(calls) == 3
+    np.testing.assert_allclose(calls, [0.1, 0.15, 0.2])
@@ -0,0 +1,64 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from src.analytics.kernel import (
+    RunningStats,
+    compute_portfolio_stats,
+    stats_arrays,
+    years_between,
+)
+
+QUANTSTATS_VERSION = '0.0.59'
+
+
+@pytest.fixture(scope='module')
+def qs():
+    quantstats = pytest.importorskip('quantstats')
+    if quantstats.__version__ != QUANTSTATS_VERSION:
+        pytest.skip(f"definitions are checked against quantstats {QUANTSTATS_VERSION}")
+    return quantstats
+
+
+def test_matches_quantstats(qs, port_ret):
+    stats = compute_portfolio_stats(port_ret)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = {
+            'sharpe': qs.stats.sharpe(port_ret),
+            'sortino': qs.stats.sortino(port_ret),
+            'cagr': qs.stats.cagr(port_ret),
+            'max_drawdown': qs.stats.max_drawdown(port_ret),
+            'win_rate': qs.stats.win_rate(port_ret),
+            'var': qs.stats.value_at_risk(port_ret),
+            'cvar': qs.stats.conditional_value_at_risk(port_ret),
+            'volatility': qs.stats.volatility(port_ret),
+        }
+    for name, value in expected.items():
+        assert getattr(stats, name) == pytest.approx(value, rel=1e-9), name
+
+
+def test_stats_arrays_is_column_wise(loader):
+    returns = loader.returns.iloc[:, :5]
+    years = years_between(returns.index)
+    values = stats_arrays(returns.to_numpy(), years)
+    for i, column in enumerate(returns.columns):
+        single = compute_portfolio_stats(returns[column]).to_dict()
+        for name, value in single.items():
+            assert values[name][i] == pytest.approx(value, rel=1e-12), (column, name)
+
+
+@pytest.mark.parametrize('chunks', [[1], [40], [250, 1, 17]])
+def test_running_stats_matches_full_recompute(port_ret, chunks):
+    n_new = sum(chunks)
+    running = RunningStats.from_returns(port_ret.iloc[:-n_new])
+    start = len(port_ret) - n_new
+    for size in chunks:
+        running = running.update(port_ret.iloc[start : start + size])
+        start += size
+
+    full = compute_portfolio_stats(port_ret).to_dict()
+    for name, value in running.result().to_dict().items():
+        assert value == pytest.approx(full[name], rel=1e-10), name
+    np.testing.assert_array_equal(running.sorted_returns, np.sort(port_ret.to_numpy()))
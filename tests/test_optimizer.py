@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics.optimizer import PortfolioOptimizer
+from src.data.pipeline import ReturnsPipeline
+from src.jobs.tasks import frontier_stats
+
+
+def _returns(n_rows, n_assets, seed=0):
+    """Daily returns with a few common factors, like a universe of equities."""
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0, 0.01, (n_rows, 3))
+    loadings = rng.normal(0.5, 0.3, (3, n_assets))
+    noise = rng.normal(0.0003, 0.015, (n_rows, n_assets))
+    return pd.DataFrame(
+        factors @ loadings + noise,
+        index=pd.bdate_range('2000-01-03', periods=n_rows),
+        columns=[f'A{i}' for i in range(n_assets)],
+    )
+
+
+def _assert_optimal(optimizer, weights, target=None, tol=1e-8):
+    """KKT conditions of min w'Cw under budget (and target return) rows, long-only."""
+    gradient = 2 * optimizer.cov @ weights
+    rows = (
+        np.ones((1, len(weights)))
+        if target is None
+        else np.vstack([np.ones(len(weights)), optimizer.mu])
+    )
+    held = weights > 1e-12
+    multipliers = np.linalg.lstsq(rows[:, held].T, -gradient[held], rcond=None)[0]
+    reduced = gradient + rows.T @ multipliers
+    scale = np.abs(gradient).max()
+    assert np.all(weights >= -1e-12)
+    assert weights.sum() == pytest.approx(1.0)
+    if target is not None:
+        assert optimizer.mu @ weights == pytest.approx(target, abs=1e-10)
+    assert np.abs(reduced[held]).max() <= tol * scale
+    assert reduced[~held].min() >= -tol * scale
+
+
+@pytest.fixture(scope='module', params=[200, 500])
+def optimizer(request):
+    return PortfolioOptimizer(ReturnsPipeline(_returns(2500, request.param)))
+
+
+def test_frontier_is_optimal(optimizer):
+    started = time.perf_counter()
+    frontier = optimizer.efficient_frontier(50)
+    assert time.perf_counter() - started < 30
+
+    assert len(frontier) == 50
+    _assert_optimal(optimizer, frontier[0].weights)
+    for point in frontier[1:-1]:
+        _assert_optimal(optimizer, point.weights, point.expected_return)
+    returns = [point.expected_return for point in frontier]
+    volatilities = [point.volatility for point in frontier]
+    assert np.all(np.diff(returns) > 0)
+    assert np.all(np.diff(volatilities) > -1e-12)
+
+
+def test_max_sharpe_beats_frontier(optimizer):
+    tangency = optimizer.max_sharpe()
+    _assert_optimal(optimizer, tangency.weights, tangency.expected_return)
+    assert (
+        tangency.sharpe
+        >= max(point.sharpe for point in optimizer.efficient_frontier(50)) - 1e-9
+    )
+
+
+def test_unattainable_target(optimizer):
+    with pytest.raises(ValueError, match='attainable range'):
+        optimizer.target_return(optimizer.mu.max() + 0.01)
+
+
+def test_frontier_stats_reports_skipped_universe():
+    stats, error = frontier_stats(
+        ReturnsPipeline(_returns(300, 20)), 10, 1 << 24, max_assets=10
+    )
+    assert stats is None
+    assert 'FRONTIER_MAX_ASSETS' in error
@@ -0,0 +1,105 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response
+
+from src.server import payloads
+from src.server.payloads import (
+    MIN_COMPRESS_BYTES,
+    PayloadCache,
+    compress_response,
+)
+
+BODY = json.dumps({'data': list(range(2000))}).encode()
+
+app = Flask(__name__)
+
+
+def _request(method='GET', **headers):
+    return app.test_request_context('/', method=method, headers=headers)
+
+
+def test_payload_is_compressed_as_accepted():
+    payload = PayloadCache().put('key', BODY, 'application/json')
+    with _request(**{'Accept-Encoding': 'gzip'}) as ctx:
+        response = payload.respond(ctx.request)
+    assert response.content_encoding == 'gzip'
+    assert gzip.decompress(response.get_data()) == BODY
+    assert 'Accept-Encoding' in response.vary
+
+    with _request() as ctx:
+        plain = payload.respond(ctx.request)
+    assert plain.content_encoding is None and plain.get_data() == BODY
+    # One weak ETag for every encoding of the same body
+    assert plain.get_etag() == response.get_etag() == (payload.etag, True)
+    with _request(**{'Accept-Encoding': 'gzip'}) as ctx:
+        assert payload.respond(ctx.request, compression=False).get_data() == BODY
+
+
+def test_small_and_binary_bodies_are_sent_as_they_are():
+    cache = PayloadCache()
+    small = cache.put('small', BODY[: MIN_COMPRESS_BYTES - 1], 'application/json')
+    binary = cache.put('binary', BODY, 'application/octet-stream')
+    with _request(**{'Accept-Encoding': 'gzip'}) as ctx:
+        assert small.respond(ctx.request).content_encoding is None
+        assert binary.respond(ctx.request).content_encoding is None
+
+
+@pytest.mark.skipif(payloads.brotli is None, reason="brotli is not installed")
+def test_brotli_is_preferred():
+    payload = PayloadCache().put('key', BODY, 'application/json')
+    with _request(**{'Accept-Encoding': 'gzip, br'}) as ctx:
+        response = payload.respond(ctx.request)
+    assert response.content_encoding == 'br'
+    assert payloads.brotli.decompress(response.get_data()) == BODY
+
+
+def test_matching_etag_gets_304_for_get_only():
+    payload = PayloadCache().put('key', BODY, 'application/json')
+    etag = f'W/"{payload.etag}"'
+    with _request(**{'If-None-Match': etag}) as ctx:
+        response = payload.respond(ctx.request)
+    assert response.status_code == 304
+    # Dash callbacks are POSTs: always answered with the body
+    with _request('POST', **{'If-None-Match': etag}) as ctx:
+        assert payload.respond(ctx.request).status_code == 200
+    with _request(**{'If-None-Match': 'W/"other"'}) as ctx:
+        assert payload.respond(ctx.request).status_code == 200
+
+
+def test_cache_evicts_least_recently_used_over_budget():
+    cache = PayloadCache(max_bytes=2 * len(BODY) + 100)
+    cache.put('a', BODY, 'application/json')
+    cache.put('b', BODY, 'application/json')
+    assert cache.get('a') is not None and len(cache) == 2
+
+    # Compressing a variant of 'a' grows it past the budget: 'b' goes
+    with _request(**{'Accept-Encoding': 'gzip'}) as ctx:
+        response = cache.respond('a', ctx.request)
+    assert response.content_encoding == 'gzip'
+    assert cache.get('b') is None and len(cache) == 1
+    assert cache.nbytes == len(BODY) + len(response.get_data())
+    with _request() as ctx:
+        assert cache.respond('b', ctx.request) is None
+
+
+def test_compress_response_adds_etag_and_compression():
+    with _request(**{'Accept-Encoding': 'gzip'}) as ctx:
+        response = compress_response(
+            Response(BODY, mimetype='application/json'), ctx.request
+        )
+    assert response.content_encoding == 'gzip'
+    assert gzip.decompress(response.get_data()) == BODY
+    etag, weak = response.get_etag()
+    assert weak and etag
+
+    with _request(**{'If-None-Match': f'W/"{etag}"'}) as ctx:
+        response = compress_response(
+            Response(BODY, mimetype='application/json'), ctx.request
+        )
+    assert response.status_code == 304
+
+    with _request(**{'Accept-Encoding': 'gzip'}) as ctx:
+        error = Response(BODY, status=500, mimetype='application/json')
+        assert compress_response(error, ctx.request).get_data() == BODY
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics.periods import (
+    FREQUENCIES,
+    asset_period_returns,
+    period_grid,
+    portfolio_period_returns,
+)
+from src.data.pipeline import ReturnsPipeline
+
+
+def _resampled(returns, freq):
+    """Compounded returns per calendar period, labelled by each period's last row."""
+    periods = returns.index.to_period(FREQUENCIES[freq])
+    table = (1.0 + returns).groupby(periods).prod() - 1.0
+    table.index = returns.index.to_series().groupby(periods).last().to_numpy()
+    return table
+
+
+@pytest.mark.parametrize('freq', list(FREQUENCIES))
+def test_matches_pandas_groupby(loader, port_ret, freq):
+    pipeline = loader.pipeline
+    expected = _resampled(loader.returns, freq)
+    table = asset_period_returns(pipeline, freq)
+    np.testing.assert_array_equal(table.index, expected.index)
+    np.testing.assert_allclose(
+        table.to_numpy(), expected.to_numpy(), rtol=1e-10, atol=1e-14
+    )
+
+    portfolio = portfolio_period_returns(pipeline, loader.weights, freq)
+    np.testing.assert_allclose(
+        portfolio.to_numpy(),
+        _resampled(port_ret, freq).to_numpy(),
+        rtol=1e-10,
+        atol=1e-14,
+    )
+
+
+@pytest.mark.parametrize('n_new', [1, 30, 400])
+@pytest.mark.parametrize('freq', list(FREQUENCIES))
+def test_append_matches_full_rebuild(loader, freq, n_new):
+    returns = loader.returns
+    weights = loader.weights
+    pipeline = ReturnsPipeline(returns.iloc[:-n_new])
+    # Build the cached tables before the rows arrive, so they are extended
+    asset_period_returns(pipeline, freq)
+    portfolio_period_returns(pipeline, weights, freq)
+    pipeline.append(returns.iloc[-n_new:])
+
+    full = ReturnsPipeline(returns)
+    grid, full_grid = period_grid(pipeline, freq), period_grid(full, freq)
+    np.testing.assert_array_equal(grid.starts, full_grid.starts)
+    assert grid.n_rows == full_grid.n_rows
+    pd.testing.assert_index_equal(grid.labels, full_grid.labels)
+    pd.testing.assert_frame_equal(
+        asset_period_returns(pipeline, freq),
+        asset_period_returns(full, freq),
+        rtol=1e-12,
+    )
+    pd.testing.assert_series_equal(
+        portfolio_period_returns(pipeline, weights, freq),
+        portfolio_period_returns(full, weights, freq),
+        rtol=1e-12,
+    )
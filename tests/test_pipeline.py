@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.loader import PortfolioDataLoader
+from src.data.pipeline import GrowableArray, ReturnsPipeline
+
+
+def _prices(n_rows, n_assets=3, seed=0):
+    """Price frame in the upload format (Date column first)."""
+    rng = np.random.default_rng(seed)
+    prices = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, (n_rows, n_assets)), axis=0)),
+        columns=[f'A{i}' for i in range(n_assets)],
+    )
+    prices.insert(
+        0, 'Date', pd.bdate_range('2015-01-02', periods=n_rows).strftime('%Y%m%d')
+    )
+    return prices
+
+
+def _is_mapped(values):
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = values.base
+    return False
+
+
+def test_growable_array_keeps_earlier_views():
+    array = GrowableArray(np.arange(3.0))
+    view = array.values
+    for i in range(40):
+        array.append(np.array([3.0 + i]))
+    np.testing.assert_array_equal(array.values, np.arange(43.0))
+    np.testing.assert_array_equal(view, np.arange(3.0))
+
+    remapped = np.arange(45.0)
+    assert array.append(remapped[43:], remapped) is not None
+    assert array.values.base is remapped
+    with pytest.raises(ValueError, match="Expected 46 rows"):
+        array.append(np.ones(1), np.ones(3))
+
+
+@pytest.mark.parametrize('n_new', [1, 250])
+def test_append_matches_full_rebuild(loader, n_new):
+    returns, weights = loader.returns, loader.weights
+    pipeline = ReturnsPipeline(returns.iloc[:-n_new])
+    pipeline.portfolio_returns(weights)
+    extended = pipeline.memoize(
+        'total', weights, lambda r: r.sum(), lambda _, r, n: r.sum()
+    )
+    dropped = pipeline.memoize('length', weights, len)
+    pipeline.append(returns.iloc[-n_new:])
+
+    full = ReturnsPipeline(returns)
+    np.testing.assert_array_equal(pipeline.matrix, full.matrix)
+    pd.testing.assert_index_equal(pipeline.index, full.index)
+    pd.testing.assert_series_equal(
+        pipeline.portfolio_returns(weights), full.portfolio_returns(weights)
+    )
+    assert pipeline.memoize('total', weights, None) != extended
+    assert pipeline.memoize('total', weights, None) == pytest.approx(
+        full.portfolio_returns(weights).sum(), rel=1e-12
+    )
+    assert pipeline.memoize('length', weights, len) == dropped + n_new
+    with pytest.raises(ValueError, match="after the last date"):
+        pipeline.append(returns.iloc[-1:])
+
+
+def test_refresh_keeps_the_matrix_mapped(tmp_path):
+    prices = _prices(400)
+    csv_path = tmp_path / 'prices.csv'
+    prices.iloc[:300].to_csv(csv_path, index=False)
+    loader = PortfolioDataLoader(str(csv_path))
+    loader.load_data()
+    pipeline = loader.pipeline
+    before = pipeline.portfolio_returns(loader.weights)
+
+    with open(csv_path, 'a') as f:
+        f.write(prices.iloc[300:].to_csv(index=False, header=False))
+    assert loader.refresh() == 100
+    assert _is_mapped(pipeline.matrix)
+
+    full = PortfolioDataLoader(str(csv_path))
+    full.load_bytes(csv_path.read_bytes())
+    np.testing.assert_allclose(pipeline.matrix, full.pipeline.matrix, rtol=1e-12)
+    np.testing.assert_allclose(
+        pipeline.portfolio_returns(loader.weights),
+        full.pipeline.portfolio_returns(full.weights),
+        rtol=1e-12,
+    )
+    # Series handed out before the refresh keep their length
+    assert len(before) == 299
+
+
+def test_nbytes_counts_memoized_products(loader):
+    pipeline = ReturnsPipeline(loader.returns, max_entries=3)
+    base = pipeline.nbytes
+    assert base == pipeline.matrix.nbytes
+
+    pipeline.cached('block', lambda: np.zeros(1000))
+    assert pipeline.nbytes == base + 8000
+    port_ret = pipeline.portfolio_returns(loader.weights)
+    with_returns = base + 8000 + port_ret.memory_usage()
+    assert pipeline.nbytes == with_returns
+    pipeline.memoize('stats', loader.weights, lambda r: {'values': np.ones(10)})
+    assert pipeline.nbytes == with_returns + 80
+
+    # The oldest product is evicted past max_entries, and its size with it
+    pipeline.cached('other', lambda: np.zeros(10))
+    assert pipeline.nbytes == with_returns - 8000 + 80 + 80
+    pipeline.clear()
+    assert pipeline.nbytes == base
+
+
+def test_dense_and_sparse_weights_share_one_memo_entry(loader):
+    pipeline = ReturnsPipeline(loader.returns)
+    names = pipeline.asset_names
+    dense = [0.0] * len(names)
+    dense[0], dense[2] = 0.25, 0.75
+    sparse = {names[2]: 0.75, names[0]: 0.25}
+    key = pipeline.weights_key(dense)
+    assert key == pipeline.weights_key(sparse) == ((0, 0.25), (2, 0.75))
+    assert pipeline.weights_key(key) is key
+
+    port_ret = pipeline.portfolio_returns(sparse)
+    assert pipeline.portfolio_returns(dense) is port_ret
+    np.testing.assert_allclose(
+        port_ret, pipeline.matrix @ np.array(dense), rtol=1e-12, atol=1e-15
+    )
+
+    with pytest.raises(ValueError, match="Unknown assets: nope"):
+        pipeline.weights_key({'nope': 1.0})
+    with pytest.raises(ValueError, match=f"Expected {len(names)} weights, got 1"):
+        pipeline.weights_key([1.0])
+
+
+def test_products_are_built_once_per_weights(loader):
+    pipeline = ReturnsPipeline(loader.returns, max_entries=4)
+    calls = []
+
+    def total(port_ret):
+        calls.append(len(port_ret))
+        return port_ret.sum()
+
+    equal = loader.weights
+    first = pipeline.asset_names[0]
+    assert pipeline.memoize('total', equal, total) == pytest.approx(
+        loader.pipeline.portfolio_returns(equal).sum()
+    )
+    pipeline.memoize('total', equal, total)
+    pipeline.memoize('total', {first: 1.0}, total)
+    assert pipeline.memoize('total', {first: 1.0}, total) == pytest.approx(
+        loader.returns[first].sum()
+    )
+    assert len(calls) == 2
+
+    # Four entries (two return series, two totals) fill the memo; the least
+    # recently used one makes room for the next
+    single = pipeline.portfolio_returns({first: 1.0})
+    port_ret = pipeline.portfolio_returns(equal)
+    pipeline.memoize('total', equal, total)
+    pipeline.memoize('total', {first: 1.0}, total)
+    pipeline.cached('block', lambda: np.zeros(3))
+    assert pipeline.portfolio_returns(equal) is port_ret
+    assert pipeline.portfolio_returns({first: 1.0}) is not single
+    assert len(calls) == 2
+    pipeline.clear()
+    pipeline.memoize('total', equal, total)
+    assert len(calls) == 3
+
+
+def test_products_built_across_an_append_are_not_kept(loader):
+    returns = loader.returns
+    pipeline = ReturnsPipeline(returns.iloc[:-1])
+    calls = []
+
+    def build(port_ret):
+        calls.append(len(port_ret))
+        if len(calls) == 1:
+            pipeline.append(returns.iloc[-1:])
+        return len(port_ret)
+
+    assert pipeline.memoize('length', loader.weights, build) == len(returns) - 1
+    assert pipeline.memoize('length', loader.weights, build) == len(returns)
+    assert calls == [len(returns) - 1, len(returns)]
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from src.analytics.rolling import extend_rolling, rolling_max_drawdown, rolling_stats
+
+
+def _max_drawdown(wealth):
+    return (wealth / np.maximum.accumulate(wealth)).min() - 1.0
+
+
+@pytest.mark.parametrize('window', [21, 252])
+def test_matches_pandas_rolling(port_ret, window):
+    stats = rolling_stats(port_ret, window)
+    wealth = (1.0 + port_ret).cumprod()
+    expected = wealth.rolling(window).apply(_max_drawdown, raw=True)
+    np.testing.assert_allclose(stats['Max Drawdown'], expected, atol=1e-12)
+    np.testing.assert_allclose(
+        stats['Volatility'], port_ret.rolling(window).std() * np.sqrt(252), rtol=1e-8
+    )
+    sharpe = (
+        port_ret.rolling(window).mean() / port_ret.rolling(window).std() * np.sqrt(252)
+    )
+    np.testing.assert_allclose(stats['Sharpe'], sharpe, rtol=1e-6)
+
+
+@pytest.mark.parametrize('window', [1, 7, 252, 1000])
+def test_max_drawdown_matches_brute_force(window):
+    wealth = np.cumprod(1.0 + np.random.default_rng(3).normal(0.0, 0.02, 1000))
+    result = rolling_max_drawdown(wealth, window)
+    assert np.isnan(result[: window - 1]).all()
+    expected = [
+        _max_drawdown(wealth[end - window + 1 : end + 1])
+        for end in range(window - 1, len(wealth))
+    ]
+    np.testing.assert_array_equal(result[window - 1 :], expected)
+    assert np.isnan(rolling_max_drawdown(wealth[:5], 6)).all()
+
+
+@pytest.mark.parametrize('window', [21, 252])
+def test_extend_matches_full_recompute(port_ret, window):
+    full = rolling_stats(port_ret, window)
+    extended = extend_rolling(
+        rolling_stats(port_ret.iloc[:-40], window), port_ret, window
+    )
+    np.testing.assert_allclose(
+        extended.to_numpy(), full.to_numpy(), rtol=1e-8, atol=1e-10
+    )
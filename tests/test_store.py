@@ -0,0 +1,91 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.data.loader import PortfolioDataLoader
+from src.data.store import DatasetStore
+
+
+def _loader(seed):
+    rng = np.random.default_rng(seed)
+    prices = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.01, (300, 4)), axis=0)),
+        columns=list('ABCD'),
+    )
+    prices.insert(
+        0, 'Date', pd.bdate_range('2020-01-01', periods=300).strftime('%Y%m%d')
+    )
+    loader = PortfolioDataLoader()
+    loader.load_bytes(prices.to_csv(index=False).encode())
+    loader.calculate_returns()
+    return loader
+
+
+def test_memoized_products_count_against_max_bytes():
+    first, second = _loader(0), _loader(1)
+    store = DatasetStore(max_bytes=first.nbytes + second.nbytes + 1024)
+    store.put('first', first, spill=False)
+    store.put('second', second, spill=False)
+    assert len(store) == 2
+
+    # Products memoized after the put are counted when the entry is next read
+    first.pipeline.cached('large', lambda: np.zeros(100_000))
+    assert store.get('first') is first
+    assert store.nbytes == first.nbytes
+    assert 'second' not in store
+
+
+def test_least_recently_used_entry_is_evicted():
+    store = DatasetStore(max_items=2, ttl=None)
+    store.put('a', np.zeros(1), spill=False)
+    store.put('b', np.zeros(2), spill=False)
+    store.get('a')
+    store.put('c', np.zeros(3), spill=False)
+    assert 'a' in store and 'c' in store and 'b' not in store
+    assert store.nbytes == 8 + 24
+    assert store.pop('a') is not None and store.nbytes == 24
+
+
+def test_spilled_entries_are_served_to_other_stores(tmp_path):
+    writer = DatasetStore(spill_dir=str(tmp_path))
+    writer.put('key', np.arange(5.0))
+    reader = DatasetStore(spill_dir=str(tmp_path))
+    np.testing.assert_array_equal(reader.get('key'), np.arange(5.0))
+    assert 'key' in reader
+
+    # In-process eviction keeps the spill for the other workers
+    writer.max_items = 1
+    writer.put('other', np.zeros(1))
+    assert 'key' not in writer
+    assert (tmp_path / 'key.pkl').exists()
+    assert writer.pop('key') is None and not (tmp_path / 'key.pkl').exists()
+
+
+def test_expired_entries_remove_their_spill_files(tmp_path):
+    store = DatasetStore(ttl=0.2, spill_dir=str(tmp_path))
+    store.put('key', np.zeros(1))
+    (tmp_path / 'key.columnar').mkdir()
+    (tmp_path / 'key.columnar.lock').touch()
+    (tmp_path / 'uploads').mkdir()
+    time.sleep(0.3)
+    assert store.get('key') is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['uploads']
+
+
+def test_put_sweeps_spill_files_not_read_within_ttl(tmp_path):
+    store = DatasetStore(ttl=60, spill_dir=str(tmp_path))
+    store.put('old', np.zeros(1))
+    (tmp_path / 'old.columnar').mkdir()
+    (tmp_path / 'orphan.columnar').mkdir()
+    (tmp_path / 'fresh.columnar').mkdir()
+    stale = time.time() - 120
+    for name in ('old.pkl', 'old.columnar', 'orphan.columnar'):
+        os.utime(tmp_path / name, (stale, stale))
+
+    store.put('new', np.zeros(1))
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        'fresh.columnar',
+        'new.pkl',
+    ]
@@ -0,0 +1,91 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from src.data.loader import PortfolioDataLoader
+from src.data.streaming import ChunkedUpload
+from test_pipeline import _prices
+
+
+def _upload(root, raw, chunk_bytes, **limits):
+    upload = ChunkedUpload.create(str(root), 'prices.csv', **limits)
+    for index, start in enumerate(range(0, len(raw), chunk_bytes)):
+        upload.append(index, raw[start : start + chunk_bytes])
+    upload.finish()
+    return upload
+
+
+@pytest.mark.parametrize('chunk_bytes', [7, 1000, 1 << 20])
+def test_chunked_upload_matches_a_single_parse(tmp_path, chunk_bytes):
+    raw = _prices(200).to_csv(index=False).encode()
+    upload = _upload(tmp_path / 'uploads', raw, chunk_bytes)
+    assert upload.rows == 200
+    assert upload.digest() == _upload(tmp_path / 'whole', raw, len(raw)).digest()
+
+    path = str(tmp_path / 'prices.columnar')
+    upload.write_columnar(path)
+    mapped = PortfolioDataLoader()
+    mapped.load_columnar(path)
+    parsed = PortfolioDataLoader()
+    parsed.load_bytes(raw)
+    pd.testing.assert_frame_equal(
+        mapped.df, parsed.df, check_index_type=False, check_freq=False
+    )
+
+
+def test_chunks_are_appended_in_order(tmp_path):
+    raw = _prices(20).to_csv(index=False).encode()
+    upload = ChunkedUpload.create(str(tmp_path), 'prices.csv')
+    rows = upload.append(0, raw[:300])
+    # A retried chunk is ignored, also by a worker reopening the upload
+    reopened = ChunkedUpload.open(str(tmp_path), upload.id)
+    assert reopened.append(0, raw[:300]) == rows
+    with pytest.raises(ValueError, match="Expected chunk 1, got 2"):
+        reopened.append(2, raw[300:])
+    reopened.append(1, raw[300:])
+    assert reopened.finish() == 20
+    with pytest.raises(ValueError, match="already complete"):
+        reopened.append(2, b'')
+
+
+def test_invalid_rows_report_their_lines(tmp_path):
+    upload = ChunkedUpload.create(str(tmp_path), 'prices.csv')
+    upload.append(0, b'Date,A\n20200102,1.0\n')
+    with pytest.raises(ValueError, match="lines 3-3"):
+        upload.append(1, b'not a date,2.0\n')
+    with pytest.raises(ValueError, match="Please upload a CSV"):
+        ChunkedUpload.create(str(tmp_path), 'prices.xlsx')
+    with pytest.raises(ValueError, match="Unknown or expired"):
+        ChunkedUpload.open(str(tmp_path), 'missing')
+
+
+def test_upload_size_is_limited(tmp_path):
+    raw = _prices(50).to_csv(index=False).encode()
+    with pytest.raises(ValueError, match="too large"):
+        ChunkedUpload.create(str(tmp_path), 'prices.csv', len(raw), len(raw) - 1)
+
+    # Undeclared or understated sizes are caught as the chunks arrive
+    for limits, message in (
+        ({'max_bytes': len(raw) - 1}, "too large"),
+        ({'size': 100, 'max_bytes': len(raw)}, "declared file size"),
+    ):
+        with pytest.raises(ValueError, match=message):
+            _upload(tmp_path, raw, 64, **limits)
+        assert os.listdir(tmp_path) == []
+    assert _upload(tmp_path, raw, 64, size=len(raw), max_bytes=len(raw)).rows == 50
+
+
+def test_pending_uploads_are_capped_and_expire(tmp_path):
+    for _ in range(2):
+        ChunkedUpload.create(str(tmp_path), 'prices.csv', max_pending=2)
+    with pytest.raises(ValueError, match="Too many uploads"):
+        ChunkedUpload.create(str(tmp_path), 'prices.csv', max_pending=2)
+
+    stale = time.time() - 120
+    for name in os.listdir(tmp_path):
+        os.utime(tmp_path / name / 'state.json', (stale, stale))
+    ChunkedUpload.cleanup(str(tmp_path), 60)
+    assert os.listdir(tmp_path) == []
+    assert ChunkedUpload.create(str(tmp_path), 'prices.csv', max_pending=2)
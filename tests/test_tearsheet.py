@@ -0,0 +1,38 @@
+import json
+import os
+import shutil
+
+from conftest import DATA_PATH
+from src.data.loader import PortfolioDataLoader
+from src.reports.tearsheet import TearsheetRenderer, load_manifest, render_reports
+
+
+def test_reports_leave_the_input_directory_untouched(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    shutil.copy(DATA_PATH, data_dir / 'prices.csv')
+    manifest = data_dir / 'manifest.json'
+    manifest.write_text(
+        json.dumps({'reports': [{'name': 'equal', 'data': 'prices.csv'}]})
+    )
+
+    specs = load_manifest(str(manifest))
+    output = tmp_path / 'reports'
+    assert render_reports(specs, str(output), ['html'], workers=None) == {
+        'equal': 'written'
+    }
+    assert sorted(os.listdir(data_dir)) == ['manifest.json', 'prices.csv']
+    assert (output / 'equal' / 'tearsheet.html').exists()
+
+
+def test_stats_do_not_collide_with_the_dashboard_stage():
+    loader = PortfolioDataLoader()
+    with open(DATA_PATH, 'rb') as f:
+        loader.load_bytes(f.read())
+    weights = [0.5] + [0.5 / (len(loader.asset_names) - 1)] * (
+        len(loader.asset_names) - 1
+    )
+    running = loader.pipeline.memoize('stats', weights, lambda port_ret: 'dashboard')
+    stats = TearsheetRenderer(loader).stats(weights)
+    assert running == 'dashboard' and stats != 'dashboard'
+    assert stats.sharpe is not None